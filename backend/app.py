@@ -1,9 +1,24 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from datetime import datetime
 import os
+import base64
+import io
+import json
 import logging
-import re
+import threading
+import time
+
+from intents import get_fallback_text
+from http_cache import HTTPCache
+from leaderboard import Leaderboard
+from membership import MemberSet
+from metrics import CHAT_REPLIES, CONTENT_TYPE as METRICS_CONTENT_TYPE, instrument_app, registry as metrics_registry
+from points_ledger import PointsLedger, LedgerWriter, LedgerError
+from repository import InMemoryRepository, SupabaseRepository
+from session_store import ConversationStore
+from waitlist_import import validate_waitlist_entry, build_waitlist_record, iter_rows, detect_format, import_waitlist
 
 # Import the Llama integration
 try:
@@ -15,14 +30,25 @@ except ImportError:
 
 # Import database functions
 try:
-    from database import init_database, get_user_by_email, create_user, add_to_waitlist, get_waitlist_count
+    from database import init_database, get_user_by_email, create_user, add_to_waitlist, join_waitlist_atomic, get_waitlist_count, check_database_health, record_ledger_entries, get_supabase_client
     DATABASE_AVAILABLE = True
 except ImportError as e:
     DATABASE_AVAILABLE = False
     logging.warning(f"Database integration not available - using mock data: {str(e)}")
 
+class ApiJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes MemberSets as plain id lists"""
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, MemberSet):
+            return o.to_list()
+        return DefaultJSONProvider.default(o)
+
 app = Flask(__name__)
+app.json = ApiJSONProvider(app)
 CORS(app)
+instrument_app(app)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -52,6 +78,50 @@ mock_users = [
             {"id": 2, "name": "Week Warrior", "icon": "🔥", "description": "7-day streak"},
             {"id": 3, "name": "Social Butterfly", "icon": "🦋", "description": "Joined 3+ organizations"}
         ]
+    },
+    {
+        "id": 2,
+        "name": "Sarah Chen",
+        "email": "sarah.chen@lmu.edu",
+        "avatar": "https://images.unsplash.com/photo-1494790108755-2616b612b786?w=150&h=150&fit=crop&crop=face",
+        "points": 2500,
+        "rank": 1,
+        "streak": 12,
+        "orgs": ["Greek Life"],
+        "badges": []
+    },
+    {
+        "id": 3,
+        "name": "Mike Rodriguez",
+        "email": "mike.rodriguez@lmu.edu",
+        "avatar": "https://images.unsplash.com/photo-1507003211169-0a1dd7228f2d?w=150&h=150&fit=crop&crop=face",
+        "points": 2200,
+        "rank": 2,
+        "streak": 5,
+        "orgs": ["Basketball Club"],
+        "badges": []
+    },
+    {
+        "id": 4,
+        "name": "Emma Wilson",
+        "email": "emma.wilson@lmu.edu",
+        "avatar": "https://images.unsplash.com/photo-1438761681033-6461ffad8d80?w=150&h=150&fit=crop&crop=face",
+        "points": 2000,
+        "rank": 3,
+        "streak": 3,
+        "orgs": ["Student Government", "Greek Life"],
+        "badges": []
+    },
+    {
+        "id": 5,
+        "name": "David Kim",
+        "email": "david.kim@lmu.edu",
+        "avatar": "https://images.unsplash.com/photo-1472099645785-5658abf4ff4e?w=150&h=150&fit=crop&crop=face",
+        "points": 1100,
+        "rank": 5,
+        "streak": 2,
+        "orgs": ["Basketball Club"],
+        "badges": []
     }
 ]
 
@@ -109,6 +179,81 @@ mock_prizes = [
     }
 ]
 
+# Data access - Supabase tables when DATA_BACKEND=supabase, otherwise the mock data above
+if DATABASE_AVAILABLE and os.environ.get('DATA_BACKEND') == 'supabase':
+    repository = SupabaseRepository()
+else:
+    repository = InMemoryRepository(users=mock_users, events=mock_events, prizes=mock_prizes)
+
+# Leaderboard - built from the users' point totals once, then updated on every point change
+leaderboard = Leaderboard()
+try:
+    leaderboard.rebuild(repository.list_users())
+except Exception as e:
+    logger.error(f"Failed to build leaderboard: {str(e)}")
+
+# Serialized, gzipped and ETagged responses for the polled read endpoints
+http_cache = HTTPCache(
+    max_entries=int(os.environ.get('HTTP_CACHE_MAX_ENTRIES', '512')),
+    default_ttl=float(os.environ.get('HTTP_CACHE_TTL', '30'))
+)
+
+# Chat history kept server-side per conversation, so clients send only the new message
+conversation_store = ConversationStore(
+    max_conversations=int(os.environ.get('CHAT_SESSION_MAX_CONVERSATIONS', '10000')),
+    max_messages=int(os.environ.get('CHAT_SESSION_MAX_MESSAGES', '20')),
+    max_bytes=int(os.environ.get('CHAT_SESSION_MAX_BYTES', str(32 * 1024 * 1024))),
+    idle_ttl=float(os.environ.get('CHAT_SESSION_IDLE_TTL', '1800'))
+)
+
+# Most user ids accepted by one batch check-in request
+CHECKIN_BATCH_LIMIT = int(os.environ.get('CHECKIN_BATCH_LIMIT', '1000'))
+
+# Points ledger - every balance change goes through here; entries are written
+# behind to the check_ins table when users and events live in Supabase (the
+# mock ids would break its foreign keys)
+points_ledger = PointsLedger(
+    repository,
+    writer=LedgerWriter(record_ledger_entries) if isinstance(repository, SupabaseRepository) and get_supabase_client() else None,
+    on_change=leaderboard.update
+)
+
+# Seconds between re-reads of every user's points. Each worker keeps its own
+# board, so with Supabase this is how changes made by other workers reach it;
+# the in-memory data is per worker, so there is nothing to reconcile (0 = off)
+LEADERBOARD_REFRESH_SECONDS = float(os.environ.get(
+    'LEADERBOARD_REFRESH_SECONDS', '60' if isinstance(repository, SupabaseRepository) else '0'
+))
+_leaderboard_refresh_lock = threading.Lock()
+
+def _rebuild_leaderboard():
+    try:
+        started_at = time.monotonic()
+        leaderboard.rebuild(repository.list_users(), started_at)
+        http_cache.invalidate('leaderboard')
+    except Exception as e:
+        logger.error(f"Failed to refresh leaderboard: {str(e)}")
+    finally:
+        _leaderboard_refresh_lock.release()
+
+def refresh_leaderboard_if_stale():
+    """
+    Start a background rebuild of the leaderboard once it is older than
+    LEADERBOARD_REFRESH_SECONDS
+
+    The current board keeps serving while the users are read, and only one
+    rebuild runs at a time per worker.
+    """
+    if LEADERBOARD_REFRESH_SECONDS <= 0:
+        return
+    
+    age = leaderboard.age()
+    if age is not None and age < LEADERBOARD_REFRESH_SECONDS:
+        return
+    
+    if _leaderboard_refresh_lock.acquire(blocking=False):
+        threading.Thread(target=_rebuild_leaderboard, name='leaderboard-refresh', daemon=True).start()
+
 @app.route('/')
 def home():
     return jsonify({
@@ -121,9 +266,10 @@ def home():
 # User endpoints
 @app.route('/api/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
-    user = next((u for u in mock_users if u["id"] == user_id), None)
+    refresh_leaderboard_if_stale()
+    user = repository.get_user(user_id)
     if user:
-        return jsonify(user)
+        return jsonify(dict(user, rank=leaderboard.rank(user_id) or user.get("rank")))
     return jsonify({"error": "User not found"}), 404
 
 @app.route('/api/users/<int:user_id>/points', methods=['POST'])
@@ -131,20 +277,64 @@ def update_points(user_id):
     data = request.get_json()
     points = data.get('points', 0)
     
-    user = next((u for u in mock_users if u["id"] == user_id), None)
-    if user:
-        user["points"] += points
-        return jsonify({"success": True, "newPoints": user["points"]})
-    return jsonify({"error": "User not found"}), 404
+    try:
+        entry = points_ledger.apply(user_id, points)
+    except LedgerError as e:
+        return jsonify({"error": str(e)}), e.status_code
+    
+    http_cache.invalidate('leaderboard')
+    return jsonify({"success": True, "newPoints": entry["balance"]})
 
 # Event endpoints
 @app.route('/api/events', methods=['GET'])
+@http_cache.cached('events')
 def get_events():
-    return jsonify(mock_events)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    tags = [tag for tag in request.args.get('tags', '').split(',') if tag]
+    start = request.args.get('start')
+    if request.args.get('upcoming') in ('1', 'true'):
+        start = max(start or '', datetime.now().isoformat(timespec='seconds'))
+    
+    after = None
+    if request.args.get('cursor'):
+        after = _decode_event_cursor(request.args['cursor'])
+        if after is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+    
+    events = repository.list_events(
+        event_type=request.args.get('type') or None,
+        start=start,
+        end=request.args.get('end'),
+        tags=tags,
+        after=after,
+        limit=limit + 1,
+        summary=request.args.get('view') != 'full'
+    )
+    
+    next_cursor = None
+    if len(events) > limit:
+        events = events[:limit]
+        next_cursor = _encode_event_cursor(events[-1])
+    
+    return jsonify({"events": events, "next_cursor": next_cursor})
+
+def _encode_event_cursor(event):
+    """Opaque cursor pointing just past an event in (date, id) order"""
+    key = json.dumps([event["date"], event["id"]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip('=')
+
+def _decode_event_cursor(cursor):
+    try:
+        date, event_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if isinstance(date, str) and isinstance(event_id, int):
+            return (date, event_id)
+    except (ValueError, TypeError):
+        pass
+    return None
 
 @app.route('/api/events/<int:event_id>', methods=['GET'])
 def get_event(event_id):
-    event = next((e for e in mock_events if e["id"] == event_id), None)
+    event = repository.get_event(event_id)
     if event:
         return jsonify(event)
     return jsonify({"error": "Event not found"}), 404
@@ -154,56 +344,125 @@ def rsvp_event(event_id):
     data = request.get_json()
     user_id = data.get('user_id')
     
-    event = next((e for e in mock_events if e["id"] == event_id), None)
-    if event:
-        if user_id in event["attendees"]:
-            event["attendees"].remove(user_id)
-            return jsonify({"success": True, "action": "removed"})
-        else:
-            event["attendees"].append(user_id)
-            return jsonify({"success": True, "action": "added"})
-    return jsonify({"error": "Event not found"}), 404
+    action = repository.toggle_attendee(event_id, user_id)
+    if action is None:
+        return jsonify({"error": "Event not found"}), 404
+    if action == "full":
+        return jsonify({"error": "Event is full"}), 400
+    http_cache.invalidate('events')
+    return jsonify({"success": True, "action": action})
 
 @app.route('/api/events/<int:event_id>/checkin', methods=['POST'])
 def checkin_event(event_id):
     data = request.get_json()
     user_id = data.get('user_id')
     
-    event = next((e for e in mock_events if e["id"] == event_id), None)
-    if event:
-        if user_id not in event["checkedIn"]:
-            event["checkedIn"].append(user_id)
-            return jsonify({"success": True, "points": event["points"]})
+    event = repository.get_event(event_id)
+    if not event:
+        return jsonify({"error": "Event not found"}), 404
+    
+    status = _check_in(event, [user_id])[0]["status"]
+    if status == "unknown":
+        return jsonify({"error": "User not found"}), 404
+    if status == "already_checked_in":
         return jsonify({"error": "Already checked in"}), 400
-    return jsonify({"error": "Event not found"}), 404
+    return jsonify({"success": True, "points": event["points"]})
+
+@app.route('/api/events/<int:event_id>/checkin/batch', methods=['POST'])
+def checkin_event_batch(event_id):
+    data = request.get_json(silent=True) or {}
+    user_ids = data.get('user_ids')
+    
+    if not isinstance(user_ids, list) or not user_ids:
+        return jsonify({"error": "user_ids must be a non-empty list"}), 400
+    if len(user_ids) > CHECKIN_BATCH_LIMIT:
+        return jsonify({"error": f"At most {CHECKIN_BATCH_LIMIT} user_ids per request"}), 400
+    
+    event = repository.get_event(event_id)
+    if not event:
+        return jsonify({"error": "Event not found"}), 404
+    
+    results = _check_in(event, user_ids)
+    summary = {"awarded": 0, "already_checked_in": 0, "unknown": 0}
+    for result in results:
+        summary[result["status"]] += 1
+    
+    return jsonify({
+        "success": True,
+        "event_id": event_id,
+        "points": event["points"],
+        **summary,
+        "results": results
+    })
+
+def _check_in(event, user_ids):
+    """
+    Check users in to an event and award its points
+    
+    Looks the users up in one call, records the check-ins with one atomic
+    append (so concurrent scanners can't overwrite each other's) and awards
+    the points in one ledger batch, to the users actually added. If the
+    award fails those check-ins are undone, so the users can scan again
+    instead of staying checked in with no points.
+    
+    Args:
+        event: Event record
+        user_ids: Users to check in, in scan order
+        
+    Returns:
+        One {"user_id", "status"} per id, where status is "awarded",
+        "already_checked_in" or "unknown"
+    """
+    valid_ids = [user_id for user_id in user_ids if _is_user_id(user_id)]
+    users = repository.get_users(valid_ids)
+    
+    known_ids = [user_id for user_id in dict.fromkeys(valid_ids) if user_id in users]
+    added = set(repository.add_check_ins(event["id"], known_ids)) if known_ids else set()
+    
+    results = []
+    awarded = []
+    for user_id in user_ids:
+        if not _is_user_id(user_id) or user_id not in users:
+            status = "unknown"
+        elif user_id in added:
+            status = "awarded"
+            added.discard(user_id)
+            awarded.append(user_id)
+        else:
+            status = "already_checked_in"
+        results.append({"user_id": user_id, "status": status})
+    
+    if awarded:
+        try:
+            points_ledger.apply_batch(awarded, event["points"], reason='check_in', event_id=event["id"])
+        except Exception:
+            repository.remove_check_ins(event["id"], awarded)
+            raise
+        http_cache.invalidate('events', 'leaderboard')
+    
+    return results
+
+def _is_user_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
 
 # Prize endpoints
 @app.route('/api/prizes', methods=['GET'])
+@http_cache.cached('prizes')
 def get_prizes():
-    return jsonify(mock_prizes)
+    return jsonify(repository.list_prizes())
 
 @app.route('/api/prizes/<int:prize_id>/claim', methods=['POST'])
 def claim_prize(prize_id):
     data = request.get_json()
     user_id = data.get('user_id')
     
-    prize = next((p for p in mock_prizes if p["id"] == prize_id), None)
-    user = next((u for u in mock_users if u["id"] == user_id), None)
-    
-    if not prize:
-        return jsonify({"error": "Prize not found"}), 404
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-    if prize["claimedBy"]:
-        return jsonify({"error": "Prize already claimed"}), 400
-    if user["points"] < prize["pointCost"]:
-        return jsonify({"error": "Insufficient points"}), 400
-    
-    prize["claimedBy"] = user_id
-    prize["status"] = "claimed"
-    user["points"] -= prize["pointCost"]
+    try:
+        entry = points_ledger.claim_prize(prize_id, user_id)
+    except LedgerError as e:
+        return jsonify({"error": str(e)}), e.status_code
     
-    return jsonify({"success": True, "remainingPoints": user["points"]})
+    http_cache.invalidate('prizes', 'leaderboard')
+    return jsonify({"success": True, "remainingPoints": entry["balance"]})
 
 # GenZ Buddy Chatbot endpoint with Llama integration
 @app.route('/api/genz-buddy', methods=['POST'])
@@ -211,26 +470,44 @@ def genz_buddy():
     try:
         data = request.get_json()
         message = data.get('message', '')
-        conversation_history = data.get('conversation_history', [])
         
         if not message:
             return jsonify({"error": "Message is required"}), 400
         
+        # History comes from the server-side store; a conversation_history
+        # sent by older clients only seeds a new conversation
+        conversation_id, conversation_history = conversation_store.open(
+            data.get('conversation_id'), data.get('conversation_history')
+        )
+        
+        # Clients can skip the response cache with no_cache or Cache-Control: no-cache
+        use_cache = not data.get('no_cache') and 'no-cache' not in request.headers.get('Cache-Control', '')
+        
+        # Stream tokens as Server-Sent Events when asked to
+        if request.args.get('stream') in ('1', 'true') or data.get('stream'):
+            return _stream_buddy_response(message, conversation_history, use_cache, conversation_id)
+        
         # Use Llama integration if available
         if LLAMA_AVAILABLE:
             logger.info(f"Generating Llama response for: {message[:50]}...")
-            result = llama_integration.generate_response(message, conversation_history)
-            
-            return jsonify({
-                "response": result['response'],
-                "model": result['model'],
-                "timestamp": result['timestamp'],
-                "success": result['success']
-            })
+            result = llama_integration.generate_response(
+                message, conversation_history, use_cache=use_cache, conversation_id=conversation_id
+            )
         else:
             # Fallback to mock responses
             logger.info("Using fallback responses - Llama not available")
-            return _get_mock_response(message)
+            result = _get_mock_response(message)
+        
+        conversation_store.append(conversation_id, message, result['response'])
+        CHAT_REPLIES.inc(model=result['model'])
+        
+        return jsonify({
+            "response": result['response'],
+            "model": result['model'],
+            "timestamp": result['timestamp'],
+            "success": result['success'],
+            "conversation_id": conversation_id
+        })
             
     except Exception as e:
         logger.error(f"Error in genz-buddy endpoint: {str(e)}")
@@ -239,36 +516,59 @@ def genz_buddy():
             "message": str(e)
         }), 500
 
-def _get_mock_response(message):
-    """Fallback mock responses when Llama is not available"""
-    message_lower = message.lower()
-    
-    # Smart keyword matching for better responses with authentic GenZ voice
-    if any(word in message_lower for word in ['food', 'eat', 'hungry', 'lair', 'den', 'pizza', 'cstore', 'c-store']):
-        response = "The Lair pizza hits different at 2am fr 🍕 fries are *chef's kiss* too. Den has fire chicken tenders if you're feeling that vibe. Pro tip: bring your student ID for the discount!"
-    elif any(word in message_lower for word in ['greek', 'sorority', 'fraternity', 'rush', 'mixer']):
-        response = "Greek life mixer this Friday at the Sunken Garden, should be lit 🔥 rush week in the spring is a whole vibe. each house has their own personality fr. my friend Sarah just joined Alpha Phi and she's living her best life. dm me if you want the tea on specific houses 👀"
-    elif any(word in message_lower for word in ['weekend', 'friday', 'saturday', 'sunday', 'tonight']):
-        response = "This weekend gonna be LIT! 🔥 Friday basketball game vs USC (wear your LMU gear!), Saturday Greek mixer at the Sunken Garden, Sunday study session at the library for finals prep. plus there's a campus spirit challenge going on - you can earn points and prizes! you going to any of these?"
-    elif any(word in message_lower for word in ['study', 'library', 'quiet', 'homework', 'exam', 'uhall', 'u-hall']):
-        response = "U-Hall 3rd floor has the best views and is usually quieter. Den has great vibes if you want background noise, new student center has these amazing pods perfect for group study sessions. my secret spot? rooftop of the business building - so aesthetic and peaceful! 📚"
-    elif any(word in message_lower for word in ['event', 'party', 'game', 'basketball', 'gersten']):
-        response = "Check the Events tab in the app! always something going on - basketball games, Greek mixers, study sessions. plus you can earn points for attending events and climb the leaderboard! what kind of vibe you looking for? 🎉"
-    elif any(word in message_lower for word in ['point', 'score', 'rank', 'leaderboard']):
-        response = "You can earn points by attending events, completing daily challenges, checking in at game days, and participating in campus activities! more you engage, more points you get. use them to claim prizes like LMU merch and game tickets! 🏆"
-    elif any(word in message_lower for word in ['basketball', 'gersten', 'game']):
-        response = "Basketball games at Gersten are LIT! 🦁🔥 wear your LMU gear, the energy is unmatched. student section goes crazy fr. check the schedule on the athletics site or ASLMU Insta"
-    elif any(word in message_lower for word in ['library', 'hannon', 'study']):
-        response = "William H. Hannon Library is the classic choice, but here's the real tea: 🫖 3rd floor has the best views and is usually quieter. Den has great vibes if you want background noise, and the new student center has these amazing pods that are perfect for group study sessions. my secret spot? rooftop of the business building - so aesthetic and peaceful! 📚"
+def _stream_buddy_response(message, conversation_history, use_cache=True, conversation_id=None):
+    """Stream a GenZ Buddy reply as Server-Sent Events"""
+    if LLAMA_AVAILABLE:
+        logger.info(f"Streaming Llama response for: {message[:50]}...")
+        events = llama_integration.stream_response(
+            message, conversation_history, use_cache=use_cache, conversation_id=conversation_id
+        )
     else:
-        response = "That's a great question! 🤔 honestly, I'm still learning about everything on campus, but I'd recommend checking the student activities page or asking around! LMU community is super helpful fr. what else can I help you with? 💫"
+        logger.info("Streaming fallback response - Llama not available")
+        events = _get_mock_stream(message)
     
-    return jsonify({
-        "response": response,
+    def generate():
+        reply = []
+        for event in events:
+            name = event.pop('event')
+            if name == 'token':
+                reply.append(event['token'])
+            elif name == 'fallback':
+                reply = [event['response']]
+            elif name == 'done':
+                # The turn is kept once the whole reply has been sent
+                conversation_store.append(conversation_id, message, ''.join(reply))
+                CHAT_REPLIES.inc(model=event.get('model'))
+                event['conversation_id'] = conversation_id
+            yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+def _get_mock_stream(message):
+    """Mock responses in the same event shape as a streamed Llama reply"""
+    yield {'event': 'token', 'token': get_fallback_text(message)}
+    yield {
+        'event': 'done',
+        'success': True,
+        'model': 'fallback',
+        'timestamp': datetime.now().isoformat()
+    }
+
+def _get_mock_response(message):
+    """Fallback mock responses when Llama is not available"""
+    return {
+        "response": get_fallback_text(message),
         "model": "fallback",
         "timestamp": datetime.now().isoformat(),
         "success": True
-    })
+    }
 
 # Llama model status endpoint
 @app.route('/api/llama/status', methods=['GET'])
@@ -282,13 +582,22 @@ def llama_status():
         })
     
     try:
-        test_result = llama_integration.test_connection()
+        # Served from the background prober; polling this never calls the model
+        health = llama_integration.get_health()
         return jsonify({
             "available": True,
-            "status": test_result['status'],
-            "model_endpoint": test_result['model_endpoint'],
-            "test_response": test_result.get('test_response', ''),
-            "error": test_result.get('error', None)
+            "status": health['status'],
+            "model_endpoint": health['model_endpoint'],
+            "error": health.get('error'),
+            "health": health,
+            "connection_pool": llama_integration.get_connection_stats(),
+            "circuit_breaker": llama_integration.circuit_breaker.get_status(),
+            "response_cache": llama_integration.response_cache.get_stats(),
+            "request_coalescing": llama_integration.singleflight.stats.get_stats(),
+            "batching": llama_integration.batcher.get_stats() if llama_integration.batcher else None,
+            "context": llama_integration.context_builder.get_stats(),
+            "ollama_contexts": llama_integration.ollama_contexts.get_stats(),
+            "conversations": conversation_store.get_stats()
         })
     except Exception as e:
         return jsonify({
@@ -297,18 +606,49 @@ def llama_status():
             "error": str(e)
         })
 
-# Leaderboard endpoint
+# Prometheus metrics endpoint
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Request, model and database metrics in the Prometheus text format"""
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+# Database status endpoint
+@app.route('/api/database/status', methods=['GET'])
+def database_status():
+    """Check the shared Supabase connection with a cheap query"""
+    if not DATABASE_AVAILABLE:
+        return jsonify({
+            "available": False,
+            "status": "not_configured",
+            "message": "Database integration module not available"
+        })
+    
+    health = check_database_health()
+    health["points_ledger"] = points_ledger.get_stats()
+    return jsonify(health)
+
+# Leaderboard endpoints
 @app.route('/api/leaderboard', methods=['GET'])
+@http_cache.cached('leaderboard')
 def get_leaderboard():
-    # Mock leaderboard data
-    leaderboard = [
-        {"rank": 1, "name": "Sarah Chen", "points": 2500, "avatar": "https://images.unsplash.com/photo-1494790108755-2616b612b786?w=50&h=50&fit=crop&crop=face"},
-        {"rank": 2, "name": "Mike Rodriguez", "points": 2200, "avatar": "https://images.unsplash.com/photo-1507003211169-0a1dd7228f2d?w=50&h=50&fit=crop&crop=face"},
-        {"rank": 3, "name": "Emma Wilson", "points": 2000, "avatar": "https://images.unsplash.com/photo-1438761681033-6461ffad8d80?w=50&h=50&fit=crop&crop=face"},
-        {"rank": 4, "name": "Alex Johnson", "points": 1250, "avatar": "https://images.unsplash.com/photo-1494790108755-2616b612b786?w=50&h=50&fit=crop&crop=face"},
-        {"rank": 5, "name": "David Kim", "points": 1100, "avatar": "https://images.unsplash.com/photo-1472099645785-5658abf4ff4e?w=50&h=50&fit=crop&crop=face"}
-    ]
-    return jsonify(leaderboard)
+    refresh_leaderboard_if_stale()
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    org = request.args.get('org') or None
+    
+    return jsonify(leaderboard.top(offset, limit, org))
+
+@app.route('/api/leaderboard/users/<int:user_id>', methods=['GET'])
+@http_cache.cached('leaderboard')
+def get_leaderboard_position(user_id):
+    refresh_leaderboard_if_stale()
+    radius = min(max(request.args.get('radius', 2, type=int), 0), 25)
+    org = request.args.get('org') or None
+    
+    position = leaderboard.around(user_id, radius, org)
+    if position:
+        return jsonify(position)
+    return jsonify({"error": "User not on leaderboard"}), 404
 
 # Waitlist endpoints
 @app.route('/api/waitlist', methods=['POST'])
@@ -317,48 +657,31 @@ def join_waitlist():
     try:
         data = request.get_json()
         
-        # Validate required fields
-        required_fields = ['email', 'name', 'student_id']
-        for field in required_fields:
-            if not data.get(field):
-                return jsonify({"error": f"Missing required field: {field}"}), 400
-        
-        # Validate student ID format (8 digits)
-        if not re.match(r'^\d{8}$', data.get('student_id', '')):
-            return jsonify({"error": "Student ID must be 8 digits"}), 400
-        
-        # Check if already on waitlist
-        if DATABASE_AVAILABLE:
-            existing_user = get_user_by_email(data['email'])
-            if existing_user:
-                return jsonify({"error": "Email already registered"}), 409
+        # Validate required fields and student ID format (8 digits)
+        error = validate_waitlist_entry(data)
+        if error:
+            return jsonify({"error": error}), 400
         
         # Prepare waitlist data
-        waitlist_data = {
-            'email': data['email'],
-            'name': data['name'],
-            'student_id': data['student_id'],
-            'phone': data.get('phone', ''),
-            'graduation_year': data.get('graduation_year'),
-            'major': data.get('major', ''),
-            'interests': data.get('interests', []),
-            'referral_source': data.get('referral_source', 'website'),
-            'status': 'pending'
-        }
+        waitlist_data = build_waitlist_record(data)
         
-        # Add to database if available
+        # Add to database if available - duplicates are caught by the insert itself
         if DATABASE_AVAILABLE:
-            result = add_to_waitlist(waitlist_data)
-            if result:
-                waitlist_count = get_waitlist_count()
-                return jsonify({
-                    "success": True,
-                    "message": "Successfully joined the waitlist!",
-                    "waitlist_position": waitlist_count,
-                    "user_id": result['id']
-                })
-            else:
+            result = join_waitlist_atomic(waitlist_data)
+            if not result:
                 return jsonify({"error": "Failed to add to waitlist"}), 500
+            if result['conflict'] == 'email':
+                return jsonify({"error": "Email already registered"}), 409
+            if result['conflict'] == 'student_id':
+                return jsonify({"error": "Student ID already registered"}), 409
+            
+            http_cache.invalidate('waitlist_count')
+            return jsonify({
+                "success": True,
+                "message": "Successfully joined the waitlist!",
+                "waitlist_position": result['position'],
+                "user_id": result['id']
+            })
         else:
             # Mock response
             return jsonify({
@@ -372,7 +695,51 @@ def join_waitlist():
         logger.error(f"Error in waitlist endpoint: {str(e)}")
         return jsonify({"error": "Failed to join waitlist"}), 500
 
+@app.route('/api/waitlist/import', methods=['POST'])
+def import_waitlist_endpoint():
+    """Bulk import waitlist signups from a CSV or NDJSON upload"""
+    import_token = os.environ.get('WAITLIST_IMPORT_TOKEN')
+    if not import_token:
+        return jsonify({"error": "Waitlist import is not enabled"}), 403
+    if request.headers.get('Authorization') != f"Bearer {import_token}":
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    if not DATABASE_AVAILABLE:
+        return jsonify({"error": "Database not available"}), 503
+    
+    try:
+        batch_size = min(max(int(request.args.get('batch_size', 500)), 1), 5000)
+    except ValueError:
+        return jsonify({"error": "batch_size must be an integer"}), 400
+    
+    try:
+        # Accept a multipart upload or the file as the raw request body
+        upload = request.files.get('file')
+        if upload:
+            file_format = request.args.get('format') or detect_format(upload.filename or '', upload.mimetype or '')
+            raw_stream = upload.stream
+        else:
+            file_format = request.args.get('format') or detect_format('', request.mimetype or '')
+            raw_stream = request.stream
+        
+        stream = io.TextIOWrapper(raw_stream, encoding='utf-8-sig', newline='')
+        
+        report = import_waitlist(
+            iter_rows(stream, file_format),
+            batch_size=batch_size,
+            dry_run=request.args.get('dry_run') in ('1', 'true'),
+            referral_source=request.args.get('referral_source', 'import')
+        )
+        if report['inserted'] and not report['dry_run']:
+            http_cache.invalidate('waitlist_count')
+        return jsonify(report)
+        
+    except Exception as e:
+        logger.error(f"Error importing waitlist: {str(e)}")
+        return jsonify({"error": "Failed to import waitlist"}), 500
+
 @app.route('/api/waitlist/count', methods=['GET'])
+@http_cache.cached('waitlist_count')
 def get_waitlist_count_endpoint():
     """Get waitlist count"""
     try:
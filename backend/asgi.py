@@ -0,0 +1,260 @@
+"""
+ASGI entry point
+
+Serves POST /api/genz-buddy natively on the event loop, so a chat request
+waiting on the model costs a coroutine instead of a worker thread. Every
+other route is handed to the Flask app through asgiref's WSGI adapter,
+running on a pool of FLASK_THREADS threads per worker.
+
+Run with:
+    gunicorn asgi:application -k uvicorn.workers.UvicornWorker
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+from app import app, conversation_store
+from intents import get_fallback_text
+from metrics import CHAT_REPLIES, HTTP_IN_FLIGHT, observe_request
+
+try:
+    from async_llama import async_llama_integration
+    LLAMA_AVAILABLE = True
+except ImportError:
+    LLAMA_AVAILABLE = False
+    logging.warning("Llama integration not available - using fallback responses")
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1024 * 1024
+
+# Threads per worker running Flask requests. gunicorn's --threads has no
+# effect on uvicorn workers, so this is the only setting that applies
+FLASK_THREADS = int(os.getenv('FLASK_THREADS', '10'))
+flask_executor = ThreadPoolExecutor(max_workers=FLASK_THREADS, thread_name_prefix='flask')
+
+class _PooledWsgiToAsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs the app thread_sensitive, i.e. every request on one
+    # shared thread; run it on the Flask pool instead
+    run_wsgi_app = sync_to_async(
+        WsgiToAsgiInstance.__dict__['run_wsgi_app'].func, thread_sensitive=False, executor=flask_executor
+    )
+
+class PooledWsgiToAsgi(WsgiToAsgi):
+    """asgiref's WSGI adapter, running requests concurrently on flask_executor"""
+
+    async def __call__(self, scope, receive, send):
+        await _PooledWsgiToAsgiInstance(self.wsgi_application)(scope, receive, send)
+
+flask_application = PooledWsgiToAsgi(app)
+
+async def application(scope, receive, send):
+    """ASGI application: the chat route natively, everything else through Flask"""
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+    elif scope['type'] == 'http' and scope['path'] == '/api/genz-buddy' and scope['method'] == 'POST':
+        await _instrumented(genz_buddy, scope, receive, send)
+    else:
+        await flask_application(scope, receive, send)
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if LLAMA_AVAILABLE:
+                await async_llama_integration.aclose()
+            flask_executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def _instrumented(handler, scope, receive, send):
+    """Record request metrics for a native route, as the Flask hooks do for the rest"""
+    start_time = time.perf_counter()
+
+    async def send_and_record(message):
+        if message['type'] == 'http.response.start':
+            # Timed to the response start, like Flask, so streams count their first byte
+            observe_request(scope['method'], scope['path'], message['status'], time.perf_counter() - start_time)
+        await send(message)
+
+    HTTP_IN_FLIGHT.inc()
+    try:
+        await handler(scope, receive, send_and_record)
+    finally:
+        HTTP_IN_FLIGHT.dec()
+
+async def genz_buddy(scope, receive, send):
+    """Async version of the Flask genz_buddy view, with the same request and response shapes"""
+    headers = {key.decode('latin-1').lower(): value.decode('latin-1') for key, value in scope['headers']}
+    # Same CORS answer Flask-CORS gives the rest of the API
+    cors = {'access-control-allow-origin': headers['origin'], 'vary': 'Origin'} if 'origin' in headers else {}
+
+    body = await _read_body(receive)
+    if body is None:
+        await _send_json(send, 413, {"error": "Request body too large"}, cors)
+        return
+
+    try:
+        data = json.loads(body or b'{}')
+        if not isinstance(data, dict):
+            raise ValueError("Request body must be a JSON object")
+    except ValueError:
+        await _send_json(send, 400, {"error": "Invalid JSON body"}, cors)
+        return
+
+    message = data.get('message', '')
+    if not message:
+        await _send_json(send, 400, {"error": "Message is required"}, cors)
+        return
+
+    conversation_id, conversation_history = conversation_store.open(
+        data.get('conversation_id'), data.get('conversation_history')
+    )
+
+    # Clients can skip the response cache with no_cache or Cache-Control: no-cache
+    use_cache = not data.get('no_cache') and 'no-cache' not in headers.get('cache-control', '')
+
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    if query.get('stream', [''])[0] in ('1', 'true') or data.get('stream'):
+        await _stream_response(receive, send, message, conversation_history, use_cache, conversation_id, cors)
+        return
+
+    try:
+        if LLAMA_AVAILABLE:
+            logger.info(f"Generating Llama response for: {message[:50]}...")
+            result = await async_llama_integration.generate_response(
+                message, conversation_history, use_cache=use_cache, conversation_id=conversation_id
+            )
+        else:
+            logger.info("Using fallback responses - Llama not available")
+            result = {
+                "response": get_fallback_text(message),
+                "model": "fallback",
+                "timestamp": datetime.now().isoformat(),
+                "success": True
+            }
+
+        conversation_store.append(conversation_id, message, result['response'])
+        CHAT_REPLIES.inc(model=result['model'])
+
+        await _send_json(send, 200, {
+            "response": result['response'],
+            "model": result['model'],
+            "timestamp": result['timestamp'],
+            "success": result['success'],
+            "conversation_id": conversation_id
+        }, cors)
+    except Exception as e:
+        logger.error(f"Error in genz-buddy endpoint: {str(e)}")
+        await _send_json(send, 500, {
+            "error": "Failed to generate response",
+            "message": str(e)
+        }, cors)
+
+async def _stream_response(receive, send, message, conversation_history, use_cache, conversation_id, cors):
+    """Stream a GenZ Buddy reply as Server-Sent Events, stopping if the client disconnects"""
+    if LLAMA_AVAILABLE:
+        logger.info(f"Streaming Llama response for: {message[:50]}...")
+        events = async_llama_integration.stream_response(
+            message, conversation_history, use_cache=use_cache, conversation_id=conversation_id
+        )
+    else:
+        logger.info("Streaming fallback response - Llama not available")
+        events = _mock_stream(message)
+
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': _encode_headers({
+                'content-type': 'text/event-stream; charset=utf-8',
+                'cache-control': 'no-cache',
+                'x-accel-buffering': 'no',
+                **cors
+            })
+        })
+
+        reply = []
+        async for event in events:
+            if disconnected.is_set():
+                break
+            name = event.pop('event')
+            if name == 'token':
+                reply.append(event['token'])
+            elif name == 'fallback':
+                reply = [event['response']]
+            elif name == 'done':
+                conversation_store.append(conversation_id, message, ''.join(reply))
+                CHAT_REPLIES.inc(model=event.get('model'))
+                event['conversation_id'] = conversation_id
+            chunk = f"event: {name}\ndata: {json.dumps(event)}\n\n"
+            await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+
+        if not disconnected.is_set():
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    finally:
+        watcher.cancel()
+        if hasattr(events, 'aclose'):
+            await events.aclose()
+
+async def _mock_stream(message):
+    """Mock responses in the same event shape as a streamed Llama reply"""
+    yield {'event': 'token', 'token': get_fallback_text(message)}
+    yield {
+        'event': 'done',
+        'success': True,
+        'model': 'fallback',
+        'timestamp': datetime.now().isoformat()
+    }
+
+async def _read_body(receive):
+    """Read the whole request body, or None if it's over MAX_BODY_BYTES"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+async def _send_json(send, status, payload, extra_headers=None):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': _encode_headers({
+            'content-type': 'application/json',
+            'content-length': str(len(body)),
+            **(extra_headers or {})
+        })
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+def _encode_headers(headers):
+    return [(key.encode('latin-1'), value.encode('latin-1')) for key, value in headers.items()]
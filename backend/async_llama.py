@@ -0,0 +1,449 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+from circuit_breaker import CircuitOpenError
+from context_builder import estimate_tokens
+from llama_integration import LlamaIntegration, llama_integration
+from metrics import MODEL_CALLS, MODEL_FIRST_TOKEN, MODEL_IN_FLIGHT, MODEL_LATENCY
+from singleflight import AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Statuses a model server sends when it's busy, retried like the sync session does
+RETRY_STATUSES = (429, 503)
+
+class RetryingTransport(httpx.AsyncBaseTransport):
+    """
+    Transport that retries 429 and 503 responses
+    
+    The async counterpart of the sync session's urllib3 Retry: the wait is
+    the server's Retry-After when it sends one, otherwise an exponential
+    backoff. Both happen before any of the reply is read, so streamed and
+    plain calls are retried alike.
+    """
+    
+    def __init__(self, transport: httpx.AsyncBaseTransport, retries: int, backoff_factor: float,
+                 max_wait: float):
+        """
+        Initialize the transport
+        
+        Args:
+            transport: Transport that sends the requests
+            retries: Most retries of one request
+            backoff_factor: Seconds before the first retry without Retry-After, doubled after each
+            max_wait: Longest wait before a retry, whatever Retry-After asks for
+        """
+        self.transport = transport
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_wait = max_wait
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            response = await self.transport.handle_async_request(request)
+            if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                return response
+            
+            wait = _retry_after_seconds(response.headers.get('Retry-After'))
+            if wait is None:
+                wait = self.backoff_factor * (2 ** attempt)
+            await response.aclose()
+            
+            attempt += 1
+            logger.info(f"Model returned {response.status_code}, retry {attempt} in {min(wait, self.max_wait):.1f}s")
+            await asyncio.sleep(min(wait, self.max_wait))
+    
+    async def aclose(self):
+        await self.transport.aclose()
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (seconds or an HTTP date), or None if absent or unreadable"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class AsyncLlamaIntegration:
+    """
+    Awaitable front end to the Llama model for the async chat route
+    
+    Model calls go through an httpx.AsyncClient, so a worker waiting on the
+    model holds a coroutine rather than a thread and one process can keep
+    hundreds of chat requests in flight. Everything apart from the transport
+    - prompt, cache, circuit breaker, request payloads and fallbacks - is
+    shared with the synchronous LlamaIntegration it wraps, so both paths
+    see the same cache entries and trip the same breaker.
+    """
+    
+    def __init__(self, integration: LlamaIntegration):
+        """
+        Initialize the async integration
+        
+        Args:
+            integration: Synchronous integration whose configuration and state are shared
+        """
+        self.integration = integration
+        self.max_connections = int(os.getenv('LLAMA_ASYNC_MAX_CONNECTIONS', '200'))
+        self._client = None
+        self._client_loop = None
+        
+        # Coalescing counters are shared with the sync path so status reports both
+        self.singleflight = AsyncSingleFlight(stats=integration.singleflight.stats)
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Get the pooled client for the running event loop
+        
+        An AsyncClient is tied to the loop it was first used on, so a new one
+        is created if the loop changes (e.g. in a fresh worker).
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=self.integration.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                # Like the sync session: connection failures and 429/503 are retried, read errors aren't
+                transport=RetryingTransport(
+                    httpx.AsyncHTTPTransport(retries=self.integration.max_retries),
+                    retries=self.integration.max_retries,
+                    backoff_factor=self.integration.retry_backoff,
+                    max_wait=self.integration.timeout
+                )
+            )
+            self._client_loop = loop
+        return self._client
+    
+    async def aclose(self):
+        """Close the pooled client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
+    
+    async def generate_response(self, user_message: str, conversation_history: list = None,
+                                use_cache: bool = True, conversation_id: str = None) -> Dict[str, Any]:
+        """
+        Generate a response using the Llama model
+        
+        Args:
+            user_message: The user's input message
+            conversation_history: List of previous messages for context
+            use_cache: Set to False to bypass the response cache
+            conversation_id: Identifies the conversation, for Ollama context reuse
+            
+        Returns:
+            Dictionary containing the response and metadata, in the same
+            shape as LlamaIntegration.generate_response
+        """
+        integration = self.integration
+        
+        try:
+            messages = integration._prepare_messages(user_message, conversation_history)
+            
+            cache_key = integration._get_cache_key(user_message, messages) if use_cache else None
+            if cache_key:
+                cached = integration.response_cache.get(cache_key)
+                if cached is not None:
+                    return {
+                        'success': True,
+                        'response': cached,
+                        'model': 'llama-genz-buddy',
+                        'timestamp': integration._get_timestamp(),
+                        'cached': True
+                    }
+            
+            response, _ = await self.singleflight.do(
+                integration._get_flight_key(user_message, messages, conversation_id),
+                lambda: self._call_if_allowed(messages, conversation_id)
+            )
+            
+            if cache_key and response:
+                integration.response_cache.set(cache_key, response)
+            
+            return {
+                'success': True,
+                'response': response,
+                'model': 'llama-genz-buddy',
+                'timestamp': integration._get_timestamp(),
+                'cached': False
+            }
+        
+        except CircuitOpenError:
+            return integration._get_fallback_response(user_message)
+        except Exception as e:
+            logger.error(f"Error generating Llama response: {str(e)}")
+            return integration._get_fallback_response(user_message)
+    
+    async def stream_response(self, user_message: str, conversation_history: list = None,
+                              use_cache: bool = True, conversation_id: str = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a response from the Llama model as tokens arrive
+        
+        Yields the same 'token', 'fallback' and 'done' events as
+        LlamaIntegration.stream_response.
+        
+        Args:
+            user_message: The user's input message
+            conversation_history: List of previous messages for context
+            use_cache: Set to False to bypass the response cache
+            conversation_id: Identifies the conversation, for Ollama context reuse
+            
+        Yields:
+            Event dictionaries with an 'event' key of 'token', 'fallback' or 'done'
+        """
+        integration = self.integration
+        model = 'llama-genz-buddy'
+        
+        try:
+            messages = integration._prepare_messages(user_message, conversation_history)
+            
+            cache_key = integration._get_cache_key(user_message, messages) if use_cache else None
+            cached = integration.response_cache.get(cache_key) if cache_key else None
+            
+            if cached is not None:
+                yield {'event': 'token', 'token': cached}
+            else:
+                tokens = []
+                stream = self.singleflight.stream(
+                    integration._get_flight_key(user_message, messages, conversation_id),
+                    lambda: self._stream_if_allowed(messages, conversation_id)
+                )
+                async for token in stream:
+                    tokens.append(token)
+                    yield {'event': 'token', 'token': token}
+                
+                if cache_key and tokens:
+                    integration.response_cache.set(cache_key, ''.join(tokens))
+        
+        except CircuitOpenError:
+            fallback = integration._get_fallback_response(user_message)
+            model = fallback['model']
+            yield {'event': 'fallback', 'response': fallback['response']}
+        except Exception as e:
+            logger.error(f"Error streaming Llama response: {str(e)}")
+            fallback = integration._get_fallback_response(user_message)
+            model = fallback['model']
+            yield {'event': 'fallback', 'response': fallback['response']}
+        
+        yield {
+            'event': 'done',
+            'success': True,
+            'model': model,
+            'timestamp': integration._get_timestamp()
+        }
+    
+    async def _call_if_allowed(self, messages: list, conversation_id: str = None) -> str:
+        """Call the model unless the circuit breaker is open, raising CircuitOpenError if it is"""
+        if not self.integration.circuit_breaker.allow_request():
+            raise CircuitOpenError(self.integration.circuit_breaker.name)
+        return await self._call_with_breaker(messages, conversation_id)
+    
+    async def _stream_if_allowed(self, messages: list, conversation_id: str = None) -> AsyncIterator[str]:
+        """Stream from the model unless the circuit breaker is open, raising CircuitOpenError if it is"""
+        if not self.integration.circuit_breaker.allow_request():
+            raise CircuitOpenError(self.integration.circuit_breaker.name)
+        async for token in self._stream_with_breaker(messages, conversation_id):
+            yield token
+    
+    async def _call_with_breaker(self, messages: list, conversation_id: str = None) -> str:
+        """Call the model and report the outcome to the circuit breaker"""
+        breaker = self.integration.circuit_breaker
+        start_time = time.monotonic()
+        MODEL_IN_FLIGHT.inc()
+        
+        try:
+            response = await self._call_llama_model(messages, conversation_id)
+        except asyncio.CancelledError:
+            breaker.record_cancelled()
+            MODEL_CALLS.inc(kind='call', outcome='abandoned')
+            raise
+        except Exception as e:
+            breaker.record_failure(time.monotonic() - start_time, e)
+            MODEL_CALLS.inc(kind='call', outcome='error')
+            raise
+        finally:
+            MODEL_IN_FLIGHT.dec()
+            MODEL_LATENCY.observe(time.monotonic() - start_time, kind='call')
+        
+        breaker.record_success(time.monotonic() - start_time)
+        MODEL_CALLS.inc(kind='call', outcome='ok')
+        return response
+    
+    async def _stream_with_breaker(self, messages: list, conversation_id: str = None) -> AsyncIterator[str]:
+        """
+        Stream from the model and report the outcome to the circuit breaker
+        
+        Latency is measured to the first token, as in the sync path.
+        """
+        breaker = self.integration.circuit_breaker
+        start_time = time.monotonic()
+        first_token_latency = None
+        MODEL_IN_FLIGHT.inc()
+        
+        try:
+            async for token in self._stream_llama_model(messages, conversation_id):
+                if not token:
+                    continue
+                if first_token_latency is None:
+                    first_token_latency = time.monotonic() - start_time
+                    MODEL_FIRST_TOKEN.observe(first_token_latency)
+                yield token
+        except (GeneratorExit, asyncio.CancelledError):
+            # The client went away. Once tokens were flowing the model was healthy;
+            # before that, the call says nothing either way
+            if first_token_latency is not None:
+                breaker.record_success(first_token_latency)
+            else:
+                breaker.record_cancelled()
+            MODEL_CALLS.inc(kind='stream', outcome='abandoned')
+            raise
+        except Exception as e:
+            breaker.record_failure(time.monotonic() - start_time, e)
+            MODEL_CALLS.inc(kind='stream', outcome='error')
+            raise
+        finally:
+            MODEL_IN_FLIGHT.dec()
+            MODEL_LATENCY.observe(time.monotonic() - start_time, kind='stream')
+        
+        if first_token_latency is None:
+            first_token_latency = time.monotonic() - start_time
+        breaker.record_success(first_token_latency)
+        MODEL_CALLS.inc(kind='stream', outcome='ok')
+    
+    def _build_request(self, messages: list, stream: bool, context: list = None) -> tuple:
+        integration = self.integration
+        if integration._is_ollama():
+            return integration._build_ollama_request(messages, stream, context=context)
+        return integration._build_standard_request(messages, stream)
+    
+    def _get_ollama_context(self, messages: list, conversation_id: str = None) -> Optional[list]:
+        """The conversation's stored Ollama context, if it can be continued from"""
+        integration = self.integration
+        if conversation_id and integration._is_ollama():
+            return integration.ollama_contexts.get(conversation_id, messages)
+        return None
+    
+    async def _call_llama_model(self, messages: list, conversation_id: str = None) -> str:
+        """
+        Make API call to the Llama model
+        
+        Args:
+            messages: Formatted messages for the model
+            conversation_id: Conversation the call belongs to, if known
+            
+        Returns:
+            Generated response text
+        """
+        context = self._get_ollama_context(messages, conversation_id)
+        payload, headers = self._build_request(messages, stream=False, context=context)
+        
+        response = await self._get_client().post(
+            self.integration.model_endpoint,
+            json=payload,
+            headers=headers
+        )
+        
+        if response.status_code != 200:
+            raise Exception(f"Model API error: {response.status_code} - {response.text}")
+        
+        result = response.json()
+        if self.integration._is_ollama():
+            text = result.get('response', '')
+            self.integration._record_token_usage(result.get('prompt_eval_count'), result.get('eval_count'))
+            if conversation_id:
+                self.integration.ollama_contexts.store(conversation_id, messages, text, result.get('context'))
+            return text
+        usage = result.get('usage') or {}
+        self.integration._record_token_usage(usage.get('prompt_tokens'), usage.get('completion_tokens'))
+        return result.get('choices', [{}])[0].get('message', {}).get('content', '')
+    
+    async def _stream_llama_model(self, messages: list, conversation_id: str = None) -> AsyncIterator[str]:
+        """
+        Make a streaming API call to the Llama model
+        
+        Reads Ollama's NDJSON chunks or an OpenAI-style SSE stream, as the
+        sync path does.
+        
+        Args:
+            messages: Formatted messages for the model
+            conversation_id: Conversation the call belongs to, if known
+            
+        Yields:
+            Generated text fragments in order
+        """
+        is_ollama = self.integration._is_ollama()
+        context = self._get_ollama_context(messages, conversation_id)
+        payload, headers = self._build_request(messages, stream=True, context=context)
+        tokens = []
+        usage = None
+        
+        async with self._get_client().stream(
+            'POST',
+            self.integration.model_endpoint,
+            json=payload,
+            headers=headers
+        ) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                raise Exception(f"Model API error: {response.status_code} - {body.decode('utf-8', 'replace')}")
+            
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                
+                if is_ollama:
+                    chunk = json.loads(line)
+                    if chunk.get('error'):
+                        raise Exception(f"Ollama API error: {chunk['error']}")
+                    tokens.append(chunk.get('response', ''))
+                    yield tokens[-1]
+                    if chunk.get('done'):
+                        self.integration._record_token_usage(chunk.get('prompt_eval_count'), chunk.get('eval_count'))
+                        if conversation_id:
+                            self.integration.ollama_contexts.store(
+                                conversation_id, messages, ''.join(tokens), chunk.get('context')
+                            )
+                        break
+                    continue
+                
+                if not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                chunk = json.loads(data)
+                usage = chunk.get('usage') or usage
+                choices = chunk.get('choices') or [{}]
+                tokens.append(choices[0].get('delta', {}).get('content') or '')
+                yield tokens[-1]
+        
+        if is_ollama:
+            return
+        # Most servers only report usage in a stream when asked to; estimate it otherwise
+        if usage:
+            self.integration._record_token_usage(usage.get('prompt_tokens'), usage.get('completion_tokens'))
+        else:
+            self.integration._record_token_usage(
+                sum(estimate_tokens(message['content']) for message in messages),
+                estimate_tokens(''.join(tokens))
+            )
+
+# Global instance sharing state with the sync integration
+async_llama_integration = AsyncLlamaIntegration(llama_integration)
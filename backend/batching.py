@@ -0,0 +1,142 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    Collects concurrent requests into small batches for one dispatch
+
+    Callers block in submit() while a collector thread waits up to
+    max_wait_ms after the first queued item for up to max_batch_size items,
+    then hands the batch to dispatch. Several batches can be in dispatch at
+    once (max_concurrent_batches), so a slow batch doesn't hold up the
+    queue. dispatch returns one result per item, in order; an Exception in
+    the list is raised to that item's caller only.
+    """
+
+    def __init__(self, dispatch: Callable[[List[Any]], List[Any]], max_batch_size: int = 8,
+                 max_wait_ms: float = 10.0, max_concurrent_batches: int = 4, name: str = 'batcher'):
+        """
+        Initialize the batcher
+
+        Args:
+            dispatch: Processes a list of items, returning a result or Exception per item
+            max_batch_size: Most items per dispatch
+            max_wait_ms: Longest the first item of a batch waits for company
+            max_concurrent_batches: Batches that may be in dispatch at once
+            name: Name used for threads and logs
+        """
+        self.dispatch = dispatch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_concurrent_batches = max_concurrent_batches
+        self.name = name
+
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._thread_pid = None
+        self._executor = None
+
+        self._batches = 0
+        self._items = 0
+        self._max_queue_depth = 0
+        self._total_wait = 0.0
+        self._batch_sizes = {}
+
+    def submit(self, item: Any, timeout: float = None) -> Any:
+        """
+        Queue an item and wait for its result
+
+        Args:
+            item: Item for dispatch
+            timeout: Seconds to wait for the result
+
+        Returns:
+            The item's result
+
+        Raises:
+            The item's exception from dispatch, or TimeoutError
+        """
+        future = Future()
+        with self._condition:
+            self._ensure_threads()
+            self._queue.append((item, future, time.monotonic()))
+            self._max_queue_depth = max(self._max_queue_depth, len(self._queue))
+            self._condition.notify()
+        return future.result(timeout)
+
+    def _ensure_threads(self):
+        """Start the collector and dispatch pool, again in a forked worker"""
+        if self._thread_pid == os.getpid():
+            return
+        self._thread_pid = os.getpid()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent_batches,
+            thread_name_prefix=f'{self.name}-dispatch'
+        )
+        threading.Thread(target=self._collect, name=f'{self.name}-collector', daemon=True).start()
+
+    def _collect(self):
+        slots = threading.Semaphore(self.max_concurrent_batches)
+        while True:
+            slots.acquire()
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+
+                # Give the first item's batch up to max_wait to fill
+                deadline = self._queue[0][2] + self.max_wait
+                while len(self._queue) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                batch = [self._queue.popleft() for _ in range(min(self.max_batch_size, len(self._queue)))]
+
+            self._executor.submit(self._run_batch, batch, slots)
+
+    def _run_batch(self, batch: list, slots: threading.Semaphore):
+        now = time.monotonic()
+        with self._condition:
+            self._batches += 1
+            self._items += len(batch)
+            self._total_wait += sum(now - queued_at for _, _, queued_at in batch)
+            self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+
+        try:
+            results = self.dispatch([item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"dispatch returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            logger.error(f"Batch dispatch failed in {self.name}: {str(e)}")
+            results = [e] * len(batch)
+        finally:
+            slots.release()
+
+        for (_, future, _), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth and batch size counters"""
+        with self._condition:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+                'queue_depth': len(self._queue),
+                'max_queue_depth': self._max_queue_depth,
+                'batches': self._batches,
+                'items': self._items,
+                'avg_batch_size': round(self._items / self._batches, 2) if self._batches else 0.0,
+                'avg_queue_wait_ms': round(self._total_wait / self._items * 1000, 3) if self._items else 0.0,
+                'batch_sizes': dict(sorted(self._batch_sizes.items()))
+            }
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the fallback intent classifier
+
+Compares the word-set lookup in intents.py with the sequential
+any(word in message) scans it replaced, over a corpus of chat messages.
+
+Usage:
+    python bench_intents.py [--repeat N]
+"""
+
+import argparse
+import json
+import random
+import timeit
+
+from intents import classify_intent
+
+CORPUS_SEEDS = [
+    "What's the best late-night food on campus?",
+    "How do I join Greek life?",
+    "What's happening this weekend?",
+    "Where's the best study spot?",
+    "Tell me about LMU basketball games",
+    "is the library open late during finals",
+    "how do points and the leaderboard work",
+    "any parties tonight?",
+    "where can i get pizza near the bluff",
+    "what time does the c-store close",
+    "is rush week in the spring or fall",
+    "how loud is gersten during games",
+    "Hi! Can you tell me about LMU?",
+    "what should i do my first week as a new student",
+    "lowkey stressed about my econ exam, any tips",
+    "ok thanks bestie that's great",
+]
+
+LEGACY_INTENTS = [
+    ("food", ['food', 'eat', 'hungry', 'lair', 'den', 'pizza', 'cstore', 'c-store']),
+    ("greek", ['greek', 'sorority', 'fraternity', 'rush', 'mixer']),
+    ("weekend", ['weekend', 'friday', 'saturday', 'sunday', 'tonight']),
+    ("study", ['study', 'library', 'quiet', 'homework', 'exam', 'uhall', 'u-hall']),
+    ("event", ['event', 'party', 'game', 'basketball', 'gersten']),
+    ("points", ['point', 'score', 'rank', 'leaderboard']),
+    ("basketball", ['basketball', 'gersten', 'game']),
+    ("library", ['library', 'hannon', 'study']),
+]
+
+def legacy_classify(message):
+    """The original chain of sequential substring scans"""
+    message_lower = message.lower()
+    for intent, words in LEGACY_INTENTS:
+        if any(word in message_lower for word in words):
+            return intent
+    return "default"
+
+def build_corpus(size, seed=42):
+    """Mix seed messages with padded variants of realistic chat lengths"""
+    rng = random.Random(seed)
+    filler = "fr idk tbh lowkey vibes ngl honestly so like um".split()
+    corpus = []
+    for _ in range(size):
+        message = rng.choice(CORPUS_SEEDS)
+        padding = " ".join(rng.choice(filler) for _ in range(rng.randint(0, 30)))
+        corpus.append(f"{padding} {message}" if rng.random() < 0.5 else f"{message} {padding}")
+    return corpus
+
+def run(repeat):
+    corpus = build_corpus(1000)
+    results = {}
+
+    for name, classify in (("lookup", classify_intent), ("legacy", legacy_classify)):
+        timings = timeit.repeat(lambda: [classify(m) for m in corpus], number=1, repeat=repeat)
+        results[name] = {
+            "messages": len(corpus),
+            "best_us_per_message": round(min(timings) / len(corpus) * 1e6, 3),
+        }
+
+    results["speedup"] = round(
+        results["legacy"]["best_us_per_message"] / results["lookup"]["best_us_per_message"], 2
+    )
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="timing repetitions (best is reported)")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.repeat), indent=2))
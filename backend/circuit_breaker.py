@@ -0,0 +1,244 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """Raised in place of a call the breaker refused"""
+
+class CircuitBreaker:
+    """
+    Circuit breaker that stops calls to a failing dependency
+
+    Outcomes and latencies of recent calls are kept in a rolling window. When
+    the error rate or the slow-call rate crosses its threshold the breaker
+    opens and callers should go straight to their fallback. While open, a
+    background thread probes the dependency after each cooldown; a successful
+    probe moves the breaker to half-open, where a few live trial calls decide
+    whether it closes again or reopens.
+    """
+
+    def __init__(self, name: str, probe: Optional[Callable[[], Any]] = None,
+                 window_size: int = 20, min_calls: int = 5,
+                 error_rate_threshold: float = 0.5,
+                 slow_call_seconds: float = 10.0,
+                 slow_call_rate_threshold: float = 0.8,
+                 open_seconds: float = 15.0,
+                 half_open_max_calls: int = 3):
+        """
+        Initialize the circuit breaker
+
+        Args:
+            name: Name of the protected dependency, used in logs
+            probe: Callable that raises if the dependency is still down
+            window_size: Number of recent calls used to compute rates
+            min_calls: Calls needed in the window before the breaker can open
+            error_rate_threshold: Fraction of failed calls that opens the breaker
+            slow_call_seconds: Latency above which a call counts as slow
+            slow_call_rate_threshold: Fraction of slow calls that opens the breaker
+            open_seconds: Cooldown between background probes while open
+            half_open_max_calls: Successful trial calls needed to close again
+        """
+        self.name = name
+        self.probe = probe
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._window = deque(maxlen=window_size)
+        self._opened_at = None
+        self._half_open_permits = 0
+        self._half_open_successes = 0
+        self._probing = False
+        self._short_circuited = 0
+        self._times_opened = 0
+        self._last_error = None
+
+    @property
+    def state(self) -> str:
+        """Current breaker state: closed, open or half_open"""
+        return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call to the dependency should be attempted
+
+        Returns:
+            True if the caller should make the call, False to fall back
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+
+            if self._state == HALF_OPEN and self._half_open_permits > 0:
+                self._half_open_permits -= 1
+                return True
+
+            self._short_circuited += 1
+            return False
+
+    def record_success(self, latency: Optional[float]):
+        """
+        Record a call that completed
+
+        Args:
+            latency: Call duration in seconds, or None if unknown (never slow)
+        """
+        slow = latency is not None and latency >= self.slow_call_seconds
+
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if slow:
+                    self._trip("slow trial call")
+                    return
+                self._half_open_successes += 1
+                if self._half_open_successes >= self.half_open_max_calls:
+                    self._close()
+                return
+
+            self._window.append((False, slow))
+            self._evaluate()
+
+    def record_cancelled(self):
+        """
+        Record a call abandoned before it showed whether the dependency works
+
+        Nothing is added to the window. A half-open trial call hands its
+        permit back, so the trial isn't stuck waiting on a call that will
+        never report.
+        """
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._half_open_permits += 1
+
+    def record_failure(self, latency: float, error: Optional[Exception] = None):
+        """
+        Record a call that failed
+
+        Args:
+            latency: Call duration in seconds
+            error: The exception raised by the call, if any
+        """
+        slow = latency >= self.slow_call_seconds
+
+        with self._lock:
+            if error is not None:
+                self._last_error = str(error)
+
+            if self._state == HALF_OPEN:
+                self._trip("failed trial call")
+                return
+
+            self._window.append((True, slow))
+            self._evaluate()
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Report the breaker state and recent rates
+
+        Returns:
+            Dictionary describing the breaker
+        """
+        with self._lock:
+            error_rate, slow_rate = self._rates()
+            return {
+                'state': self._state,
+                'error_rate': round(error_rate, 3),
+                'slow_call_rate': round(slow_rate, 3),
+                'window_calls': len(self._window),
+                'times_opened': self._times_opened,
+                'short_circuited': self._short_circuited,
+                'opened_at': self._opened_at,
+                'last_error': self._last_error
+            }
+
+    def _rates(self) -> tuple:
+        """Error rate and slow-call rate over the window (lock held)"""
+        if not self._window:
+            return 0.0, 0.0
+
+        failures = sum(1 for failed, _ in self._window if failed)
+        slow = sum(1 for _, was_slow in self._window if was_slow)
+        return failures / len(self._window), slow / len(self._window)
+
+    def _evaluate(self):
+        """Open the breaker if the window crosses a threshold (lock held)"""
+        if self._state != CLOSED or len(self._window) < self.min_calls:
+            return
+
+        error_rate, slow_rate = self._rates()
+        if error_rate >= self.error_rate_threshold:
+            self._trip(f"error rate {error_rate:.0%}")
+        elif slow_rate >= self.slow_call_rate_threshold:
+            self._trip(f"slow call rate {slow_rate:.0%}")
+
+    def _trip(self, reason: str):
+        """Move to the open state and start probing (lock held)"""
+        logger.warning(f"Circuit breaker '{self.name}' opened: {reason}")
+
+        self._state = OPEN
+        self._opened_at = time.time()
+        self._times_opened += 1
+        self._window.clear()
+        self._half_open_permits = 0
+        self._half_open_successes = 0
+
+        if not self._probing:
+            self._probing = True
+            threading.Thread(
+                target=self._probe_loop,
+                name=f"{self.name}-breaker-probe",
+                daemon=True
+            ).start()
+
+    def _close(self):
+        """Move back to the closed state (lock held)"""
+        logger.info(f"Circuit breaker '{self.name}' closed")
+
+        self._state = CLOSED
+        self._opened_at = None
+        self._window.clear()
+        self._half_open_permits = 0
+        self._half_open_successes = 0
+
+    def _probe_loop(self):
+        """Probe the dependency after each cooldown until it recovers"""
+        while True:
+            time.sleep(self.open_seconds)
+
+            with self._lock:
+                if self._state != OPEN:
+                    self._probing = False
+                    return
+
+            try:
+                if self.probe is not None:
+                    self.probe()
+            except Exception as e:
+                with self._lock:
+                    self._last_error = str(e)
+                    self._opened_at = time.time()
+                logger.info(f"Circuit breaker '{self.name}' probe failed: {str(e)}")
+                continue
+
+            with self._lock:
+                self._probing = False
+                if self._state != OPEN:
+                    return
+                logger.info(f"Circuit breaker '{self.name}' half-open after successful probe")
+                self._state = HALF_OPEN
+                self._half_open_permits = self.half_open_max_calls
+                self._half_open_successes = 0
+            return
@@ -0,0 +1,159 @@
+import math
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List
+
+# Words, numbers and single punctuation marks or symbols
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Role marker and separators each message adds to the prompt
+MESSAGE_OVERHEAD_TOKENS = 4
+
+TRUNCATION_MARKER = " …"
+
+# Subword tokenizers split long words, roughly every four characters
+CHARS_PER_TOKEN = 4
+
+def _piece_tokens(piece: str) -> int:
+    return max(1, math.ceil(len(piece) / CHARS_PER_TOKEN))
+
+@lru_cache(maxsize=4096)
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate how many tokens a piece of text costs
+
+    A fast approximation of a Llama tokenizer's count: every word, number
+    or symbol is at least one token, and long words cost one per four
+    characters. Results are cached, so history resent on every turn is
+    only counted once.
+
+    Args:
+        text: Text to count
+
+    Returns:
+        Estimated token count
+    """
+    return sum(_piece_tokens(match.group()) for match in _TOKEN_RE.finditer(text))
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut text down to about max_tokens, keeping the start
+
+    Cuts between words where it can. A word too long for what is left of
+    the budget (e.g. a pasted URL or a run without spaces) is cut by
+    characters instead, so some of it survives.
+
+    Args:
+        text: Text to shorten
+        max_tokens: Token budget for the result
+
+    Returns:
+        The text unchanged if it fits, otherwise its start with a marker
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    used = 0
+    end = 0
+    for match in _TOKEN_RE.finditer(text):
+        tokens = _piece_tokens(match.group())
+        if used + tokens > max_tokens:
+            remaining = max_tokens - used
+            if remaining > 0 and tokens > 1:
+                end = match.start() + remaining * CHARS_PER_TOKEN
+            break
+        used += tokens
+        end = match.end()
+    return text[:end].rstrip() + TRUNCATION_MARKER
+
+class ContextBuilder:
+    """
+    Builds the model's message list within a prompt token budget
+
+    The system prompt is counted once, up front. The current message
+    always goes in (cut down if it alone would overflow the budget), then
+    conversation history is added newest-first until the budget runs out,
+    so short chats keep more context and one pasted essay can't crowd out
+    everything else. History messages longer than max_message_tokens are
+    truncated rather than dropped.
+    """
+
+    def __init__(self, system_prompt: str, max_prompt_tokens: int = 1536, max_message_tokens: int = 400):
+        """
+        Initialize the builder
+
+        Args:
+            system_prompt: Prompt that opens every conversation
+            max_prompt_tokens: Budget for the whole prompt, system prompt included
+            max_message_tokens: Longest a single history message may be
+        """
+        self.system_prompt = system_prompt
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_message_tokens = max_message_tokens
+        self.system_prompt_tokens = estimate_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+
+        self._lock = threading.Lock()
+        self._builds = 0
+        self._prompt_tokens = 0
+        self._truncated = 0
+        self._dropped = 0
+
+    def build(self, user_message: str, conversation_history: list = None) -> List[Dict[str, str]]:
+        """
+        Build the messages for one model call
+
+        Args:
+            user_message: Current user message
+            conversation_history: Previous messages, oldest first, as
+                {"type": "user" | "bot", "content": ...} dicts
+
+        Returns:
+            System message, the history that fits, then the user message
+        """
+        truncated = 0
+        budget = self.max_prompt_tokens - self.system_prompt_tokens
+
+        user_budget = max(budget - MESSAGE_OVERHEAD_TOKENS, 1)
+        content = truncate_to_tokens(user_message, user_budget)
+        if content is not user_message:
+            truncated += 1
+        budget -= estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+        history = []
+        kept = 0
+        for msg in reversed(conversation_history or []):
+            text = truncate_to_tokens(msg["content"], self.max_message_tokens)
+            cost = estimate_tokens(text) + MESSAGE_OVERHEAD_TOKENS
+            if cost > budget:
+                break
+            if text is not msg["content"]:
+                truncated += 1
+            budget -= cost
+            kept += 1
+            history.append({
+                "role": "user" if msg["type"] == "user" else "assistant",
+                "content": text
+            })
+        history.reverse()
+
+        with self._lock:
+            self._builds += 1
+            self._prompt_tokens += self.max_prompt_tokens - budget
+            self._truncated += truncated
+            self._dropped += len(conversation_history or []) - kept
+
+        return [{"role": "system", "content": self.system_prompt}] + history + [{"role": "user", "content": content}]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Budget settings and counters for built prompts"""
+        with self._lock:
+            return {
+                'max_prompt_tokens': self.max_prompt_tokens,
+                'max_message_tokens': self.max_message_tokens,
+                'system_prompt_tokens': self.system_prompt_tokens,
+                'builds': self._builds,
+                'avg_prompt_tokens': round(self._prompt_tokens / self._builds, 1) if self._builds else 0.0,
+                'truncated_messages': self._truncated,
+                'dropped_messages': self._dropped
+            }
@@ -1,12 +1,63 @@
 import os
+import threading
+import time
+import httpx
+from postgrest.exceptions import APIError
 from supabase import create_client, Client
 from flask import current_app
 import logging
 
+from metrics import record_call_error, supabase_call
+from points_ledger import EntriesRejected
+
 logger = logging.getLogger(__name__)
 
+# Process-wide Supabase client, created lazily and shared by every call so
+# requests reuse its HTTP connection pool instead of building a new one
+_client = None
+_client_pid = None
+_client_checked_at = 0.0
+_client_lock = threading.Lock()
+
+# How long to wait before retrying after the client couldn't be created
+RECONNECT_INTERVAL = float(os.environ.get('SUPABASE_RECONNECT_INTERVAL', '30'))
+
+# Waitlist size served from memory. Inserts in this process bump it and an
+# exact COUNT reconciles it (and picks up other workers' inserts) once the
+# cached value is older than WAITLIST_COUNT_TTL seconds
+WAITLIST_COUNT_TTL = float(os.environ.get('WAITLIST_COUNT_TTL', '30'))
+_waitlist_count = None
+_waitlist_count_at = 0.0
+_waitlist_count_refreshing = False
+_waitlist_count_lock = threading.Lock()
+
+# Postgres error classes caused by the rows themselves - invalid data (22)
+# and constraint violations (23) - which fail the same way on every retry
+REJECTED_SQLSTATE_CLASSES = ('22', '23')
+
 def get_supabase_client() -> Client:
-    """Get Supabase client instance"""
+    """Get the shared Supabase client instance, creating it on first use"""
+    global _client, _client_pid, _client_checked_at
+    
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+    
+    with _client_lock:
+        # Forked workers must not share the parent's connections
+        if _client_pid != pid:
+            _client = None
+            _client_pid = pid
+            _client_checked_at = 0.0
+        
+        if _client is None and time.monotonic() - _client_checked_at >= RECONNECT_INTERVAL:
+            _client = _create_supabase_client()
+            _client_checked_at = time.monotonic()
+        
+        return _client
+
+def _create_supabase_client() -> Client:
+    """Create a new Supabase client from the environment"""
     try:
         supabase_url = os.environ.get('SUPABASE_URL')
         supabase_key = os.environ.get('SUPABASE_ANON_KEY')
@@ -20,6 +71,45 @@ def get_supabase_client() -> Client:
         logger.error(f"Failed to create Supabase client: {str(e)}")
         return None
 
+def reset_supabase_client():
+    """Drop the shared client so the next call reconnects"""
+    global _client, _client_checked_at
+    
+    with _client_lock:
+        _client = None
+        _client_checked_at = 0.0
+
+def _handle_client_error(error: Exception):
+    """Reconnect on transport failures; query errors leave the client usable"""
+    record_call_error()
+    if isinstance(error, httpx.TransportError):
+        logger.warning(f"Resetting Supabase client after error: {str(error)}")
+        reset_supabase_client()
+
+@supabase_call
+def check_database_health() -> dict:
+    """Run a cheap query to check Supabase is reachable"""
+    client = get_supabase_client()
+    if not client:
+        return {"available": False, "status": "not_configured"}
+    
+    start_time = time.monotonic()
+    try:
+        client.table('waitlist').select('id').limit(1).execute()
+        return {
+            "available": True,
+            "status": "connected",
+            "latency_ms": round((time.monotonic() - start_time) * 1000, 1)
+        }
+    except Exception as e:
+        _handle_client_error(e)
+        return {
+            "available": True,
+            "status": "error",
+            "latency_ms": round((time.monotonic() - start_time) * 1000, 1),
+            "error": str(e)
+        }
+
 def init_database():
     """Initialize database tables if they don't exist"""
     client = get_supabase_client()
@@ -43,6 +133,13 @@ def init_database():
             );
             """,
             """
+            -- Org memberships feed the per-org leaderboards. rank is no longer
+            -- written: ranks come from the in-process leaderboard
+            ALTER TABLE users
+                ADD COLUMN IF NOT EXISTS orgs TEXT[] DEFAULT '{}',
+                ADD COLUMN IF NOT EXISTS badges JSONB DEFAULT '[]';
+            """,
+            """
             CREATE TABLE IF NOT EXISTS events (
                 id SERIAL PRIMARY KEY,
                 title VARCHAR(255) NOT NULL,
@@ -58,6 +155,95 @@ def init_database():
             );
             """,
             """
+            ALTER TABLE events
+                ADD COLUMN IF NOT EXISTS attendees INTEGER[] DEFAULT '{}',
+                ADD COLUMN IF NOT EXISTS checked_in INTEGER[] DEFAULT '{}',
+                ADD COLUMN IF NOT EXISTS tags TEXT[] DEFAULT '{}';
+            """,
+            """
+            -- Event listings page through (date, id), optionally within a type,
+            -- filter on tags, and read attendee counts without the arrays
+            ALTER TABLE events
+                ADD COLUMN IF NOT EXISTS attendee_count INTEGER
+                    GENERATED ALWAYS AS (COALESCE(cardinality(attendees), 0)) STORED,
+                ADD COLUMN IF NOT EXISTS checked_in_count INTEGER
+                    GENERATED ALWAYS AS (COALESCE(cardinality(checked_in), 0)) STORED;
+
+            CREATE INDEX IF NOT EXISTS idx_events_date_id ON events (date, id);
+            CREATE INDEX IF NOT EXISTS idx_events_type_date_id ON events (type, date, id);
+            CREATE INDEX IF NOT EXISTS idx_events_tags ON events USING GIN (tags);
+            """,
+            """
+            -- RSVPs and check-ins change the arrays under the event's row lock, so
+            -- concurrent requests (from any worker) add to them instead of one
+            -- overwriting the other's read-modify-write
+            CREATE OR REPLACE FUNCTION toggle_event_rsvp(p_event_id INTEGER, p_user_id INTEGER)
+            RETURNS TEXT
+            LANGUAGE plpgsql
+            SECURITY DEFINER
+            SET search_path = public
+            AS $$
+            DECLARE
+                current_ids INTEGER[];
+                capacity INTEGER;
+            BEGIN
+                SELECT COALESCE(attendees, '{}'), max_capacity INTO current_ids, capacity
+                FROM events WHERE id = p_event_id FOR UPDATE;
+                IF NOT FOUND THEN
+                    RETURN NULL;
+                END IF;
+
+                IF p_user_id = ANY (current_ids) THEN
+                    UPDATE events SET attendees = array_remove(current_ids, p_user_id) WHERE id = p_event_id;
+                    RETURN 'removed';
+                END IF;
+                IF capacity IS NOT NULL AND cardinality(current_ids) >= capacity THEN
+                    RETURN 'full';
+                END IF;
+                UPDATE events SET attendees = array_append(current_ids, p_user_id) WHERE id = p_event_id;
+                RETURN 'added';
+            END;
+            $$;
+
+            -- Check users in and return the ones that weren't checked in already
+            CREATE OR REPLACE FUNCTION check_in_users(p_event_id INTEGER, p_user_ids INTEGER[])
+            RETURNS TABLE (checked_in_user_id INTEGER)
+            LANGUAGE plpgsql
+            SECURITY DEFINER
+            SET search_path = public
+            AS $$
+            DECLARE
+                current_ids INTEGER[];
+                new_ids INTEGER[];
+            BEGIN
+                SELECT COALESCE(checked_in, '{}') INTO current_ids
+                FROM events WHERE id = p_event_id FOR UPDATE;
+                IF NOT FOUND THEN
+                    RETURN;
+                END IF;
+
+                SELECT COALESCE(array_agg(DISTINCT u), '{}') INTO new_ids
+                FROM unnest(p_user_ids) AS u
+                WHERE u <> ALL (current_ids);
+
+                UPDATE events SET checked_in = current_ids || new_ids WHERE id = p_event_id;
+                RETURN QUERY SELECT unnest(new_ids);
+            END;
+            $$;
+
+            -- Take users back off the check-in list when awarding their points failed
+            CREATE OR REPLACE FUNCTION remove_check_ins(p_event_id INTEGER, p_user_ids INTEGER[])
+            RETURNS VOID
+            LANGUAGE sql
+            SECURITY DEFINER
+            SET search_path = public
+            AS $$
+                UPDATE events
+                SET checked_in = ARRAY(SELECT u FROM unnest(checked_in) AS u WHERE u <> ALL (p_user_ids))
+                WHERE id = p_event_id;
+            $$;
+            """,
+            """
             CREATE TABLE IF NOT EXISTS check_ins (
                 id SERIAL PRIMARY KEY,
                 user_id INTEGER REFERENCES users(id),
@@ -67,6 +253,14 @@ def init_database():
             );
             """,
             """
+            -- check_ins doubles as the points ledger: every balance change is a row,
+            -- and entry_id makes retried write-behind batches idempotent
+            ALTER TABLE check_ins
+                ADD COLUMN IF NOT EXISTS entry_id VARCHAR(32) UNIQUE,
+                ADD COLUMN IF NOT EXISTS reason VARCHAR(30) DEFAULT 'check_in',
+                ADD COLUMN IF NOT EXISTS balance INTEGER;
+            """,
+            """
             CREATE TABLE IF NOT EXISTS waitlist (
                 id SERIAL PRIMARY KEY,
                 email VARCHAR(255) UNIQUE NOT NULL,
@@ -92,6 +286,133 @@ def init_database():
                 status VARCHAR(20) DEFAULT 'available',
                 created_at TIMESTAMP DEFAULT NOW()
             );
+            """,
+            """
+            -- Balances and prize claims only change through these functions, so
+            -- concurrent changes from any worker apply one after the other instead of
+            -- one overwriting the other's read-modify-write
+
+            -- Add (or deduct) points, refusing a deduction that would leave less than
+            -- p_min_balance; returns the updated user, or no row if refused
+            CREATE OR REPLACE FUNCTION add_user_points(p_user_id INTEGER, p_points INTEGER, p_min_balance INTEGER DEFAULT NULL)
+            RETURNS SETOF users
+            LANGUAGE sql
+            SECURITY DEFINER
+            SET search_path = public
+            AS $$
+                UPDATE users SET points = COALESCE(points, 0) + p_points
+                WHERE id = p_user_id
+                  AND (p_min_balance IS NULL OR p_points >= 0 OR COALESCE(points, 0) + p_points >= p_min_balance)
+                RETURNING *;
+            $$;
+
+            -- Add the same points to many users, locking their rows in id order so
+            -- concurrent batches can't deadlock
+            CREATE OR REPLACE FUNCTION add_points_to_users(p_user_ids INTEGER[], p_points INTEGER)
+            RETURNS SETOF users
+            LANGUAGE sql
+            SECURITY DEFINER
+            SET search_path = public
+            AS $$
+                UPDATE users SET points = COALESCE(users.points, 0) + p_points
+                FROM (SELECT id FROM users WHERE id = ANY (p_user_ids) ORDER BY id FOR UPDATE) AS locked
+                WHERE users.id = locked.id
+                RETURNING users.*;
+            $$;
+
+            -- Claim an unclaimed prize and deduct its cost in one transaction; returns
+            -- the updated user, or no row if the prize is taken or the user can't afford it
+            CREATE OR REPLACE FUNCTION claim_prize(p_prize_id INTEGER, p_user_id INTEGER)
+            RETURNS SETOF users
+            LANGUAGE plpgsql
+            SECURITY DEFINER
+            SET search_path = public
+            AS $$
+            DECLARE
+                prize_cost INTEGER;
+            BEGIN
+                UPDATE prizes SET claimed_by = p_user_id, status = 'claimed'
+                WHERE id = p_prize_id AND claimed_by IS NULL
+                RETURNING point_cost INTO prize_cost;
+                IF NOT FOUND THEN
+                    RETURN;
+                END IF;
+
+                UPDATE users SET points = points - prize_cost
+                WHERE id = p_user_id AND COALESCE(points, 0) >= prize_cost;
+                IF NOT FOUND THEN
+                    UPDATE prizes SET claimed_by = NULL, status = 'available' WHERE id = p_prize_id;
+                    RETURN;
+                END IF;
+
+                RETURN QUERY SELECT * FROM users WHERE id = p_user_id;
+            END;
+            $$;
+            """,
+            """
+            CREATE SEQUENCE IF NOT EXISTS waitlist_position_seq;
+
+            -- A signup that hits a UNIQUE conflict still draws a number, so positions
+            -- can skip after a rejected duplicate
+            ALTER TABLE waitlist
+                ADD COLUMN IF NOT EXISTS position BIGINT DEFAULT nextval('waitlist_position_seq');
+
+            -- Insert a signup and return its position, or which UNIQUE column it
+            -- collided with, in a single round trip
+            CREATE OR REPLACE FUNCTION join_waitlist(
+                p_email TEXT,
+                p_name TEXT,
+                p_student_id TEXT,
+                p_phone TEXT,
+                p_graduation_year INTEGER,
+                p_major TEXT,
+                p_interests TEXT[],
+                p_referral_source TEXT,
+                p_status TEXT
+            )
+            RETURNS TABLE (waitlist_id INTEGER, waitlist_position BIGINT, conflict_field TEXT)
+            LANGUAGE plpgsql
+            SECURITY DEFINER
+            SET search_path = public
+            AS $$
+            DECLARE
+                new_id INTEGER;
+                new_position BIGINT;
+            BEGIN
+                INSERT INTO waitlist (email, name, student_id, phone, graduation_year,
+                                      major, interests, referral_source, status)
+                VALUES (p_email, p_name, p_student_id, p_phone, p_graduation_year,
+                        p_major, p_interests, p_referral_source, p_status)
+                ON CONFLICT DO NOTHING
+                RETURNING waitlist.id, waitlist.position INTO new_id, new_position;
+
+                IF new_id IS NULL THEN
+                    RETURN QUERY SELECT NULL::INTEGER, NULL::BIGINT,
+                        CASE WHEN EXISTS (SELECT 1 FROM waitlist w WHERE w.email = p_email)
+                             THEN 'email' ELSE 'student_id' END;
+                ELSE
+                    RETURN QUERY SELECT new_id, new_position, NULL::TEXT;
+                END IF;
+            END;
+            $$;
+            """,
+            """
+            -- Insert a batch of signups, skipping any that hit a UNIQUE constraint,
+            -- and return the emails that made it in
+            CREATE OR REPLACE FUNCTION bulk_join_waitlist(p_rows JSONB)
+            RETURNS TABLE (inserted_email TEXT)
+            LANGUAGE sql
+            SECURITY DEFINER
+            SET search_path = public
+            AS $$
+                INSERT INTO waitlist (email, name, student_id, phone, graduation_year,
+                                      major, interests, referral_source, status)
+                SELECT r.email, r.name, r.student_id, r.phone, r.graduation_year,
+                       r.major, r.interests, r.referral_source, r.status
+                FROM jsonb_populate_recordset(NULL::waitlist, p_rows) AS r
+                ON CONFLICT DO NOTHING
+                RETURNING waitlist.email::TEXT;
+            $$;
             """
         ]
         
@@ -102,7 +423,9 @@ def init_database():
         
     except Exception as e:
         logger.error(f"Failed to initialize database: {str(e)}")
+        _handle_client_error(e)
 
+@supabase_call
 def get_user_by_email(email: str):
     """Get user by email"""
     client = get_supabase_client()
@@ -114,8 +437,10 @@ def get_user_by_email(email: str):
         return response.data[0] if response.data else None
     except Exception as e:
         logger.error(f"Error getting user by email: {str(e)}")
+        _handle_client_error(e)
         return None
 
+@supabase_call
 def create_user(user_data: dict):
     """Create a new user"""
     client = get_supabase_client()
@@ -127,8 +452,10 @@ def create_user(user_data: dict):
         return response.data[0] if response.data else None
     except Exception as e:
         logger.error(f"Error creating user: {str(e)}")
+        _handle_client_error(e)
         return None
 
+@supabase_call
 def add_to_waitlist(waitlist_data: dict):
     """Add user to waitlist"""
     client = get_supabase_client()
@@ -137,20 +464,156 @@ def add_to_waitlist(waitlist_data: dict):
     
     try:
         response = client.table('waitlist').insert(waitlist_data).execute()
-        return response.data[0] if response.data else None
+        if not response.data:
+            return None
+        
+        _increment_waitlist_count(1)
+        return response.data[0]
     except Exception as e:
         logger.error(f"Error adding to waitlist: {str(e)}")
+        _handle_client_error(e)
+        return None
+
+@supabase_call
+def join_waitlist_atomic(waitlist_data: dict):
+    """
+    Add user to waitlist and get their position in one round trip
+    
+    Relies on the table's UNIQUE constraints instead of a separate lookup,
+    so concurrent signups with the same email can't both get in.
+    
+    Returns a dict with 'id', 'position' and 'conflict' ('email' or
+    'student_id' when already registered), or None on failure.
+    """
+    client = get_supabase_client()
+    if not client:
+        return None
+    
+    try:
+        params = {f"p_{field}": value for field, value in waitlist_data.items()}
+        response = client.rpc('join_waitlist', params).execute()
+        row = response.data[0] if response.data else None
+        if not row:
+            return None
+        
+        if row['conflict_field']:
+            return {'id': None, 'position': None, 'conflict': row['conflict_field']}
+        
+        _increment_waitlist_count(1)
+        return {'id': row['waitlist_id'], 'position': row['waitlist_position'], 'conflict': None}
+    except Exception as e:
+        logger.error(f"Error joining waitlist: {str(e)}")
+        _handle_client_error(e)
+        return None
+
+@supabase_call
+def bulk_add_to_waitlist(waitlist_rows: list):
+    """
+    Add a batch of users to the waitlist in one round trip
+    
+    Rows that collide with an existing email or student ID are skipped by
+    the insert itself. Returns the list of emails that were inserted, or
+    None if the batch failed.
+    """
+    client = get_supabase_client()
+    if not client:
+        return None
+    
+    try:
+        response = client.rpc('bulk_join_waitlist', {'p_rows': waitlist_rows}).execute()
+        inserted = [row['inserted_email'] for row in response.data or []]
+        _increment_waitlist_count(len(inserted))
+        return inserted
+    except Exception as e:
+        logger.error(f"Error bulk adding to waitlist: {str(e)}")
+        _handle_client_error(e)
         return None
 
+@supabase_call
+def record_ledger_entries(entries: list) -> bool:
+    """
+    Persist a batch of points ledger entries to check_ins
+    
+    Entries already written (same entry_id) are skipped, so a batch can be
+    retried safely after an ambiguous failure.
+    
+    Returns:
+        True once written, False if the write failed but may succeed later
+    
+    Raises:
+        EntriesRejected: The database refused the rows themselves
+    """
+    client = get_supabase_client()
+    if not client:
+        return False
+    
+    rows = [{
+        'entry_id': entry['entry_id'],
+        'user_id': entry['user_id'],
+        'event_id': entry['event_id'],
+        'points_earned': entry['points'],
+        'balance': entry['balance'],
+        'reason': entry['reason'],
+        'timestamp': entry['timestamp']
+    } for entry in entries]
+    
+    try:
+        client.table('check_ins').upsert(
+            rows, on_conflict='entry_id', ignore_duplicates=True, returning='minimal'
+        ).execute()
+        return True
+    except APIError as e:
+        _handle_client_error(e)
+        if str(e.code or '')[:2] in REJECTED_SQLSTATE_CLASSES:
+            raise EntriesRejected(str(e)) from e
+        logger.error(f"Error recording ledger entries: {str(e)}")
+        return False
+    except Exception as e:
+        logger.error(f"Error recording ledger entries: {str(e)}")
+        _handle_client_error(e)
+        return False
+
 def get_waitlist_count():
-    """Get total waitlist count"""
+    """Get total waitlist count, served from memory between reconciles"""
+    global _waitlist_count, _waitlist_count_at, _waitlist_count_refreshing
+    
+    with _waitlist_count_lock:
+        fresh = time.monotonic() - _waitlist_count_at < WAITLIST_COUNT_TTL
+        if _waitlist_count is not None and (fresh or _waitlist_count_refreshing):
+            # Serve the cached value, even if stale, while another thread reconciles
+            return _waitlist_count
+        _waitlist_count_refreshing = True
+    
+    count = _count_waitlist_rows()
+    
+    with _waitlist_count_lock:
+        _waitlist_count_refreshing = False
+        if count is None:
+            return _waitlist_count or 0
+        _waitlist_count = count
+        _waitlist_count_at = time.monotonic()
+        return count
+
+def _increment_waitlist_count(added: int):
+    """Account for rows this process just inserted"""
+    global _waitlist_count
+    
+    with _waitlist_count_lock:
+        if _waitlist_count is not None:
+            _waitlist_count += added
+
+@supabase_call
+def _count_waitlist_rows():
+    """Run an exact COUNT over the waitlist table, or None on failure"""
     client = get_supabase_client()
     if not client:
-        return 0
+        return None
     
     try:
-        response = client.table('waitlist').select('id', count='exact').execute()
+        # The total comes back in Content-Range; one row keeps the body tiny
+        response = client.table('waitlist').select('id', count='exact').limit(1).execute()
         return response.count or 0
     except Exception as e:
         logger.error(f"Error getting waitlist count: {str(e)}")
-        return 0
\ No newline at end of file
+        _handle_client_error(e)
+        return None
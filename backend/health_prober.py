@@ -0,0 +1,111 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+class HealthProber:
+    """
+    Background liveness checks for a dependency, served from memory
+
+    A daemon thread runs a cheap probe every interval seconds and keeps the
+    outcome of the last window probes. Status reads never touch the
+    dependency, so health checks and dashboards can poll as often as they
+    like. The thread is started by the first status read, and again in a
+    forked worker.
+    """
+
+    def __init__(self, probe: Callable[[], Any], interval: float = 15.0, window: int = 20, name: str = 'health'):
+        """
+        Initialize the prober
+
+        Args:
+            probe: Callable that raises if the dependency is unhealthy
+            interval: Seconds between probes
+            window: Number of recent probes used for the error rate
+            name: Name used for the thread and logs
+        """
+        self.probe = probe
+        self.interval = interval
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._results = deque(maxlen=window)
+        self._thread_pid = None
+
+        self._checked_at = None
+        self._latency = None
+        self._last_error = None
+        self._consecutive_failures = 0
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._thread_pid = os.getpid()
+        threading.Thread(target=self._run, name=f'{self.name}-prober', daemon=True).start()
+
+    def _run(self):
+        while True:
+            self.check()
+            time.sleep(self.interval)
+
+    def check(self) -> bool:
+        """
+        Run the probe once and record the outcome
+
+        Returns:
+            Whether the probe succeeded
+        """
+        start_time = time.monotonic()
+        error = None
+        try:
+            self.probe()
+        except Exception as e:
+            error = str(e)
+            logger.info(f"Health probe '{self.name}' failed: {error}")
+        latency = time.monotonic() - start_time
+
+        with self._lock:
+            self._results.append(error is None)
+            self._checked_at = datetime.now()
+            self._latency = latency
+            if error is None:
+                self._consecutive_failures = 0
+            else:
+                self._last_error = error
+                self._consecutive_failures += 1
+        return error is None
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Latest probe result and recent error rate
+
+        Returns:
+            Status of 'starting' until the first probe finishes, then
+            'connected' or 'error' from the latest probe
+        """
+        self._ensure_thread()
+
+        with self._lock:
+            if self._checked_at is None:
+                return {'status': 'starting', 'interval_seconds': self.interval}
+
+            healthy = self._results[-1]
+            failures = self._results.count(False)
+            return {
+                'status': 'connected' if healthy else 'error',
+                'checked_at': self._checked_at.isoformat(),
+                'age_seconds': round((datetime.now() - self._checked_at).total_seconds(), 1),
+                'latency_ms': round(self._latency * 1000, 1),
+                'error': None if healthy else self._last_error,
+                'last_error': self._last_error,
+                'consecutive_failures': self._consecutive_failures,
+                'error_rate': round(failures / len(self._results), 3),
+                'window': len(self._results),
+                'interval_seconds': self.interval
+            }
@@ -0,0 +1,148 @@
+import functools
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from flask import Response, current_app, request
+
+class HTTPCache:
+    """
+    Cache of serialized GET responses with ETags and gzip
+
+    Each cached view belongs to a named resource ("events", "prizes", ...).
+    Responses are stored once as bytes, plus a gzip-compressed copy, keyed
+    by the full request path and tagged with the resource's version at the
+    time they were rendered. Mutating routes call invalidate() to bump the
+    version, which makes every stored response for that resource stale.
+
+    Clients that send If-None-Match with a current ETag get a bodyless 304.
+    Entries also expire after a TTL, which bounds how stale a worker can be
+    when another process changed the data.
+    """
+
+    def __init__(self, max_entries: int = 512, default_ttl: float = 30.0, min_gzip_bytes: int = 512):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum number of stored responses (least recently used go first)
+            default_ttl: Seconds a response is served before it's rendered again
+            min_gzip_bytes: Smaller bodies are sent uncompressed
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.min_gzip_bytes = min_gzip_bytes
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._versions = {}
+
+        self._hits = 0
+        self._misses = 0
+        self._not_modified = 0
+
+    def invalidate(self, *resources: str):
+        """Mark every stored response for these resources as stale"""
+        with self._lock:
+            for resource in resources:
+                self._versions[resource] = self._versions.get(resource, 0) + 1
+
+    def cached(self, resource: str, ttl: Optional[float] = None):
+        """
+        Decorator that serves a GET view from the cache
+
+        Only 200 responses are stored; anything else passes through.
+
+        Args:
+            resource: Resource name the view's output depends on
+            ttl: Seconds to serve a stored response, defaults to default_ttl
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                key = request.full_path
+                entry = self._get(key, resource)
+                if entry is None:
+                    with self._lock:
+                        version = self._versions.get(resource, 0)
+                        self._misses += 1
+
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+
+                    entry = self._build_entry(response.get_data(), response.mimetype, resource, version, ttl)
+                    self._set(key, entry)
+                else:
+                    with self._lock:
+                        self._hits += 1
+
+                return self._respond(entry)
+            return wrapper
+        return decorator
+
+    def _get(self, key: str, resource: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["version"] != self._versions.get(resource, 0) or time.monotonic() >= entry["expires_at"]:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _set(self, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _build_entry(self, body: bytes, mimetype: str, resource: str, version: int, ttl: float) -> Dict[str, Any]:
+        digest = hashlib.sha1(body).hexdigest()[:20]
+        gzip_body = gzip.compress(body, compresslevel=6) if len(body) >= self.min_gzip_bytes else None
+        return {
+            "body": body,
+            "gzip_body": gzip_body,
+            "etag": digest,
+            "mimetype": mimetype,
+            "version": version,
+            "expires_at": time.monotonic() + ttl
+        }
+
+    def _respond(self, entry: Dict[str, Any]) -> Response:
+        use_gzip = entry["gzip_body"] is not None and 'gzip' in request.accept_encodings
+        # The compressed and plain bodies are different representations, so
+        # they get different strong ETags; either one revalidates
+        etag = entry["etag"] + ('-gz' if use_gzip else '')
+
+        if request.if_none_match.contains(entry["etag"]) or request.if_none_match.contains(entry["etag"] + '-gz'):
+            with self._lock:
+                self._not_modified += 1
+            response = Response(status=304)
+        else:
+            response = Response(entry["gzip_body"] if use_gzip else entry["body"], mimetype=entry["mimetype"])
+            if use_gzip:
+                response.headers['Content-Encoding'] = 'gzip'
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        if entry["gzip_body"] is not None:
+            response.vary.add('Accept-Encoding')
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "not_modified": self._not_modified
+            }
@@ -0,0 +1,96 @@
+"""
+Keyword intent classifier for GenZ Buddy fallback responses
+
+Used whenever the Llama model can't answer - when the integration isn't
+installed, when the model call fails, or when the circuit breaker is open.
+Keyword forms are expanded once at import, so classifying a message is a
+split and a set intersection.
+"""
+
+# Intents in priority order: when a message matches several, the earliest
+# wins. Specific intents (library, basketball) come before the broader ones
+# (study, event) that would otherwise swallow their keywords.
+INTENT_KEYWORDS = [
+    ("food", ['food', 'eat', 'hungry', 'lair', 'den', 'pizza', 'cstore', 'c-store']),
+    ("greek", ['greek', 'sorority', 'fraternity', 'rush', 'mixer']),
+    ("weekend", ['weekend', 'friday', 'saturday', 'sunday', 'tonight']),
+    ("library", ['library', 'hannon']),
+    ("study", ['study', 'quiet', 'homework', 'exam', 'uhall', 'u-hall']),
+    ("basketball", ['basketball', 'gersten']),
+    ("event", ['event', 'party', 'game']),
+    ("points", ['point', 'score', 'rank', 'leaderboard']),
+]
+
+DEFAULT_INTENT = "default"
+
+# Smart fallback responses with authentic GenZ LMU voice
+FALLBACK_RESPONSES = {
+    "food": "The Lair pizza hits different at 2am fr 🍕 fries are *chef's kiss* too. Den has fire chicken tenders if you're feeling that vibe. Pro tip: bring your student ID for the discount!",
+
+    "greek": "Greek life mixer this Friday at the Sunken Garden, should be lit 🔥 rush week in the spring is a whole vibe. each house has their own personality fr. my friend Sarah just joined Alpha Phi and she's living her best life. dm me if you want the tea on specific houses 👀",
+
+    "weekend": "This weekend gonna be LIT! 🔥 Friday basketball game vs USC (wear your LMU gear!), Saturday Greek mixer at the Sunken Garden, Sunday study session at the library for finals prep. plus there's a campus spirit challenge going on - you can earn points and prizes! you going to any of these?",
+
+    "study": "U-Hall 3rd floor has the best views and is usually quieter. Den has great vibes if you want background noise, new student center has these amazing pods perfect for group study sessions. my secret spot? rooftop of the business building - so aesthetic and peaceful! 📚",
+
+    "event": "Check the Events tab in the app! always something going on - basketball games, Greek mixers, study sessions. plus you can earn points for attending events and climb the leaderboard! what kind of vibe you looking for? 🎉",
+
+    "points": "You can earn points by attending events, completing daily challenges, checking in at game days, and participating in campus activities! more you engage, more points you get. use them to claim prizes like LMU merch and game tickets! 🏆",
+
+    "basketball": "Basketball games at Gersten are LIT! 🦁🔥 wear your LMU gear, the energy is unmatched. student section goes crazy fr. check the schedule on the athletics site or ASLMU Insta",
+
+    "library": "William H. Hannon Library is the classic choice, but here's the real tea: 🫖 3rd floor has the best views and is usually quieter. Den has great vibes if you want background noise, and the new student center has these amazing pods that are perfect for group study sessions. my secret spot? rooftop of the business building - so aesthetic and peaceful! 📚",
+
+    "default": "That's a great question! 🤔 honestly, I'm still learning about everything on campus, but I'd recommend checking the student activities page or asking around! LMU community is super helpful fr. what else can I help you with? 💫"
+}
+
+_PRIORITY = {word: index for index, (_, words) in enumerate(INTENT_KEYWORDS) for word in words}
+
+# Endings a keyword may carry and still count ("games", "eating", "ranked")
+_INFLECTIONS = ('', 's', 'es', 'ing', 'ings', 'ed', 'er', 'ers')
+
+# Punctuation that glues a keyword to its neighbours in chat ("pizza?",
+# "lair's"). Hyphens stay so "c-store" and "u-hall" remain single words.
+_PUNCTUATION = "?!.,'\u2019\"()"
+
+_KEYWORD_FORMS = {}
+for _word, _priority in _PRIORITY.items():
+    for _ending in _INFLECTIONS:
+        _KEYWORD_FORMS.setdefault(_word + _ending, _priority)
+del _word, _priority, _ending
+
+def classify_intent(message: str) -> str:
+    """
+    Classify a message into a fallback intent
+
+    The message is split into words and intersected with every accepted
+    keyword form, so "den" matches "den" and "dens" but not "student", and
+    "eat" doesn't fire on "great".
+
+    Args:
+        message: The user's message
+
+    Returns:
+        The highest-priority matching intent, or "default"
+    """
+    text = message.lower()
+    for char in _PUNCTUATION:
+        text = text.replace(char, ' ')
+
+    hits = _KEYWORD_FORMS.keys() & text.split()
+    if not hits:
+        return DEFAULT_INTENT
+
+    return INTENT_KEYWORDS[min(map(_KEYWORD_FORMS.__getitem__, hits))][0]
+
+def get_fallback_text(message: str) -> str:
+    """
+    Pick the fallback reply text for a message
+
+    Args:
+        message: The user's message
+
+    Returns:
+        Fallback response text
+    """
+    return FALLBACK_RESPONSES[classify_intent(message)]
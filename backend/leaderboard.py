@@ -0,0 +1,355 @@
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+MAX_LEVEL = 16
+LEVEL_PROBABILITY = 0.25
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, level: int):
+        self.key = key
+        self.next = [None] * level
+        # width[i] is how many bottom-level steps the level-i link skips
+        self.width = [1] * level
+
+class IndexableSkipList:
+    """
+    Sorted skip list that also answers "what position is this key" and
+    "what is at this position"
+
+    Each link stores how many elements it skips, so insert, remove, rank
+    and positional lookup are all O(log n) expected.
+    """
+
+    def __init__(self):
+        self._head = _Node(None, MAX_LEVEL)
+        self._size = 0
+        self._random = random.Random()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @classmethod
+    def from_sorted(cls, keys: Iterable[Any]) -> 'IndexableSkipList':
+        """
+        Build a skip list from keys already in ascending order in O(n)
+
+        Args:
+            keys: Unique keys in ascending order
+
+        Returns:
+            The populated skip list
+        """
+        skiplist = cls()
+        last = [skiplist._head] * MAX_LEVEL
+        last_position = [0] * MAX_LEVEL
+
+        position = 0
+        for position, key in enumerate(keys, start=1):
+            node = _Node(key, skiplist._random_level())
+            for level in range(len(node.next)):
+                last[level].next[level] = node
+                last[level].width[level] = position - last_position[level]
+                last[level] = node
+                last_position[level] = position
+
+        # Links off the end count the steps to one past the last element
+        for level in range(MAX_LEVEL):
+            last[level].width[level] = position + 1 - last_position[level]
+
+        skiplist._size = position
+        return skiplist
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < MAX_LEVEL and self._random.random() < LEVEL_PROBABILITY:
+            level += 1
+        return level
+
+    def _find_predecessors(self, key) -> Tuple[list, list]:
+        """Last node before key at every level, and the steps taken at each level"""
+        chain = [None] * MAX_LEVEL
+        steps_at_level = [0] * MAX_LEVEL
+        node = self._head
+        for level in reversed(range(MAX_LEVEL)):
+            while node.next[level] is not None and node.next[level].key < key:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+        return chain, steps_at_level
+
+    def insert(self, key):
+        """Insert a key; keys must be unique"""
+        chain, steps_at_level = self._find_predecessors(key)
+        level_count = self._random_level()
+        node = _Node(key, level_count)
+
+        steps = 0
+        for level in range(level_count):
+            previous = chain[level]
+            node.next[level] = previous.next[level]
+            previous.next[level] = node
+            node.width[level] = previous.width[level] - steps
+            previous.width[level] = steps + 1
+            steps += steps_at_level[level]
+
+        for level in range(level_count, MAX_LEVEL):
+            chain[level].width[level] += 1
+
+        self._size += 1
+
+    def remove(self, key):
+        """Remove a key, raising KeyError if it isn't present"""
+        chain, _ = self._find_predecessors(key)
+        node = chain[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+
+        for level in range(len(node.next)):
+            previous = chain[level]
+            previous.width[level] += node.width[level] - 1
+            previous.next[level] = node.next[level]
+
+        for level in range(len(node.next), MAX_LEVEL):
+            chain[level].width[level] -= 1
+
+        self._size -= 1
+
+    def rank(self, key) -> Optional[int]:
+        """Zero-based position of a key, or None if it isn't present"""
+        chain, steps_at_level = self._find_predecessors(key)
+        node = chain[0].next[0]
+        if node is None or node.key != key:
+            return None
+        return sum(steps_at_level)
+
+    def slice(self, offset: int, limit: int) -> List[Any]:
+        """Up to limit keys starting at a zero-based position"""
+        if offset < 0 or limit <= 0 or offset >= self._size:
+            return []
+
+        # Walk down to the element at position offset + 1 (the head is position 0)
+        target = offset + 1
+        position = 0
+        node = self._head
+        for level in reversed(range(MAX_LEVEL)):
+            while node.next[level] is not None and position + node.width[level] <= target:
+                position += node.width[level]
+                node = node.next[level]
+
+        keys = []
+        while node is not None and len(keys) < limit:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+class Leaderboard:
+    """
+    Points leaderboard kept up to date incrementally
+
+    Users are ordered by points (highest first), ties broken by user id. A
+    skip list per board - one overall and one per organization - makes each
+    point change, rank lookup and page an O(log n) operation instead of a
+    sort over every student.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._board = IndexableSkipList()
+        self._org_boards = {}
+        self._built_at = None
+        # When each user was last changed through update() or remove(), so a
+        # rebuild from an older snapshot doesn't undo those changes
+        self._touched = {}
+
+    def __len__(self) -> int:
+        return len(self._board)
+
+    def rebuild(self, users: Iterable[Dict[str, Any]], started_at: Optional[float] = None):
+        """
+        Replace the board contents with the given users
+
+        Args:
+            users: User records with id, name, avatar, points and orgs
+            started_at: time.monotonic() taken before the users were read;
+                users changed on this board since then keep their current
+                entry instead of the snapshot's
+        """
+        entries = {}
+        for user in users:
+            entry = _entry(user)
+            entries[entry["id"]] = entry
+
+        with self._lock:
+            if started_at is not None:
+                for user_id, touched_at in self._touched.items():
+                    if touched_at < started_at:
+                        continue
+                    current = self._entries.get(user_id)
+                    if current is None:
+                        entries.pop(user_id, None)
+                    else:
+                        entries[user_id] = current
+
+            keys = sorted(_key(entry) for entry in entries.values())
+            org_keys = {}
+            for key in keys:
+                for org in entries[key[1]]["orgs"]:
+                    org_keys.setdefault(org, []).append(key)
+
+            self._entries = entries
+            self._board = IndexableSkipList.from_sorted(keys)
+            self._org_boards = {org: IndexableSkipList.from_sorted(org_list) for org, org_list in org_keys.items()}
+            self._touched = {}
+            self._built_at = time.monotonic()
+
+    def age(self) -> Optional[float]:
+        """Seconds since the last rebuild, or None if it was never built"""
+        with self._lock:
+            return None if self._built_at is None else time.monotonic() - self._built_at
+
+    def update(self, user: Dict[str, Any]):
+        """
+        Add a user or apply a change to their points, orgs or profile
+
+        Args:
+            user: User record with id, name, avatar, points and orgs
+        """
+        entry = _entry(user)
+
+        with self._lock:
+            self._touched[entry["id"]] = time.monotonic()
+            previous = self._entries.get(entry["id"])
+            if previous is not None and _key(previous) == _key(entry) and previous["orgs"] == entry["orgs"]:
+                self._entries[entry["id"]] = entry
+                return
+
+            if previous is not None:
+                self._unlink(previous)
+
+            self._entries[entry["id"]] = entry
+            key = _key(entry)
+            self._board.insert(key)
+            for org in entry["orgs"]:
+                self._org_boards.setdefault(org, IndexableSkipList()).insert(key)
+
+    def remove(self, user_id: int):
+        """Drop a user from every board"""
+        with self._lock:
+            self._touched[user_id] = time.monotonic()
+            entry = self._entries.pop(user_id, None)
+            if entry is not None:
+                self._unlink(entry)
+
+    def _unlink(self, entry: Dict[str, Any]):
+        key = _key(entry)
+        self._board.remove(key)
+        for org in entry["orgs"]:
+            board = self._org_boards[org]
+            board.remove(key)
+            if not len(board):
+                del self._org_boards[org]
+
+    def _get_board(self, org: Optional[str]) -> Optional[IndexableSkipList]:
+        return self._board if org is None else self._org_boards.get(org)
+
+    def size(self, org: Optional[str] = None) -> int:
+        """Number of users on the overall board or an org's board"""
+        with self._lock:
+            board = self._get_board(org)
+            return len(board) if board else 0
+
+    def rank(self, user_id: int, org: Optional[str] = None) -> Optional[int]:
+        """
+        One-based rank of a user
+
+        Args:
+            user_id: User to look up
+            org: Rank within this organization instead of overall
+
+        Returns:
+            The rank, or None if the user isn't on that board
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            board = self._get_board(org)
+            if entry is None or board is None:
+                return None
+            position = board.rank(_key(entry))
+            return None if position is None else position + 1
+
+    def top(self, offset: int = 0, limit: int = 10, org: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        A page of the leaderboard
+
+        Args:
+            offset: Number of leading ranks to skip
+            limit: Maximum number of rows
+            org: Only users in this organization
+
+        Returns:
+            Rows with rank, id, name, points and avatar
+        """
+        with self._lock:
+            board = self._get_board(org)
+            if board is None:
+                return []
+            return self._rows(board.slice(offset, limit), offset)
+
+    def around(self, user_id: int, radius: int = 2, org: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        A user's rank with the users directly above and below
+
+        Args:
+            user_id: User to center on
+            radius: Number of neighbors on each side
+            org: Rank within this organization instead of overall
+
+        Returns:
+            Dictionary with rank, total and neighbors rows, or None if the
+            user isn't on that board
+        """
+        with self._lock:
+            rank = self.rank(user_id, org)
+            if rank is None:
+                return None
+
+            board = self._get_board(org)
+            offset = max(0, rank - 1 - radius)
+            return {
+                "id": user_id,
+                "rank": rank,
+                "points": self._entries[user_id]["points"],
+                "total": len(board),
+                "neighbors": self._rows(board.slice(offset, rank - offset + radius), offset)
+            }
+
+    def _rows(self, keys: list, offset: int) -> List[Dict[str, Any]]:
+        rows = []
+        for position, (_, user_id) in enumerate(keys, start=offset + 1):
+            entry = self._entries[user_id]
+            rows.append({
+                "rank": position,
+                "id": user_id,
+                "name": entry["name"],
+                "points": entry["points"],
+                "avatar": entry["avatar"]
+            })
+        return rows
+
+def _entry(user: Dict[str, Any]) -> Dict[str, Any]:
+    """The fields of a user record the leaderboard keeps"""
+    return {
+        "id": user["id"],
+        "name": user.get("name"),
+        "avatar": user.get("avatar"),
+        "points": user.get("points") or 0,
+        "orgs": tuple(dict.fromkeys(user.get("orgs") or ()))
+    }
+
+def _key(entry: Dict[str, Any]) -> tuple:
+    return (-entry["points"], entry["id"])
@@ -1,8 +1,23 @@
 import requests
 import json
 import os
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, Iterator, List, Optional
+from concurrent.futures import ThreadPoolExecutor
 import logging
+from urllib.parse import urlsplit, urlunsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from batching import MicroBatcher
+from context_builder import ContextBuilder, estimate_tokens
+from circuit_breaker import CircuitBreaker, CircuitOpenError, OPEN
+from health_prober import HealthProber
+from metrics import MODEL_CALLS, MODEL_FIRST_TOKEN, MODEL_IN_FLIGHT, MODEL_LATENCY, MODEL_TOKENS
+from ollama_context import OllamaContextCache
+from response_cache import ResponseCache, make_cache_key
+from singleflight import SingleFlight
+from intents import get_fallback_text
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -24,6 +39,49 @@ class LlamaIntegration:
         self.api_key = os.getenv('LLAMA_API_KEY')
         self.timeout = int(os.getenv('LLAMA_TIMEOUT', '30'))
         
+        # Connection pool sizing - one keep-alive connection per Flask thread (FLASK_THREADS in asgi.py)
+        self.pool_maxsize = int(os.getenv('LLAMA_POOL_MAXSIZE', os.getenv('FLASK_THREADS', '10')))
+        self.max_retries = int(os.getenv('LLAMA_MAX_RETRIES', '2'))
+        self.retry_backoff = float(os.getenv('LLAMA_RETRY_BACKOFF', '0.3'))
+        self.session = self._create_session()
+        
+        # Circuit breaker - fail fast to the fallback while the model is down
+        self.circuit_breaker = CircuitBreaker(
+            'llama-model',
+            probe=self._probe_model,
+            window_size=int(os.getenv('LLAMA_BREAKER_WINDOW', '20')),
+            min_calls=int(os.getenv('LLAMA_BREAKER_MIN_CALLS', '5')),
+            error_rate_threshold=float(os.getenv('LLAMA_BREAKER_ERROR_RATE', '0.5')),
+            slow_call_seconds=float(os.getenv('LLAMA_BREAKER_SLOW_SECONDS', '10')),
+            slow_call_rate_threshold=float(os.getenv('LLAMA_BREAKER_SLOW_RATE', '0.8')),
+            open_seconds=float(os.getenv('LLAMA_BREAKER_OPEN_SECONDS', '15'))
+        )
+        
+        # Response cache - repeated questions skip the model entirely
+        self.cache_enabled = os.getenv('LLAMA_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+        self.response_cache = ResponseCache(
+            max_entries=int(os.getenv('LLAMA_CACHE_MAX_ENTRIES', '1000')),
+            max_bytes=int(os.getenv('LLAMA_CACHE_MAX_BYTES', str(2 * 1024 * 1024))),
+            ttl_seconds=float(os.getenv('LLAMA_CACHE_TTL', '600'))
+        )
+        
+        # Background liveness probe, so status checks don't call the model
+        self.health_probe_mode = os.getenv('LLAMA_HEALTH_PROBE', 'models').lower()
+        self.health_prober = HealthProber(
+            self._health_check,
+            interval=float(os.getenv('LLAMA_HEALTH_INTERVAL', '15')),
+            window=int(os.getenv('LLAMA_HEALTH_WINDOW', '20')),
+            name='llama-model'
+        )
+        
+        # Request coalescing - identical questions in flight share one model call
+        self.singleflight = SingleFlight()
+        
+        # Optional micro-batching of model calls: "pipelined" or "batched"
+        self.batching_mode = os.getenv('LLAMA_BATCHING', 'off').lower()
+        self.batch_endpoint = os.getenv('LLAMA_BATCH_ENDPOINT')
+        self.batcher = self._create_batcher()
+        
         # GenZ Buddy system prompt - Authentic LMU student voice
         self.system_prompt = """You are LMU Buddy, a 2025 LMU student. Use GenZ slang naturally: "fr", "bet", "lowkey", "vibes", "idk tbh". Be casual and concise. Match user's energy.
 
@@ -37,14 +95,145 @@ Examples:
 - "idk tbh, lemme check the ASLMU Insta"
 
 You're a real student helping other students. Keep it authentic and LMU-specific."""
+        
+        # Ollama keeps the model loaded this long between calls, and returns
+        # a context per turn that lets the next turn skip the shared prefix
+        self.ollama_keep_alive = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+        self.ollama_contexts = OllamaContextCache(
+            max_entries=int(os.getenv('OLLAMA_CONTEXT_MAX_ENTRIES', '500')),
+            max_context_tokens=int(os.getenv('OLLAMA_CONTEXT_MAX_TOKENS', '3072')),
+            idle_ttl=float(os.getenv('OLLAMA_CONTEXT_IDLE_TTL', '900'))
+        )
+        
+        # Conversation history is fitted to a prompt token budget
+        self.context_builder = ContextBuilder(
+            self.system_prompt,
+            max_prompt_tokens=int(os.getenv('LLAMA_CONTEXT_MAX_TOKENS', '1536')),
+            max_message_tokens=int(os.getenv('LLAMA_CONTEXT_MAX_MESSAGE_TOKENS', '400'))
+        )
+    
+    def _create_session(self) -> requests.Session:
+        """
+        Create the pooled keep-alive session used for every model call
+        
+        Retries only cover failures where the model never started generating:
+        connection errors and 429/503 rejections. Read errors are not retried
+        since the server may already be working on the prompt.
+        
+        Returns:
+            Configured requests session
+        """
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=0,
+            status=self.max_retries,
+            status_forcelist=(429, 503),
+            allowed_methods=frozenset(['GET', 'POST']),
+            backoff_factor=self.retry_backoff,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        
+        adapter = HTTPAdapter(
+            pool_connections=2,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retry
+        )
+        
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def _create_batcher(self) -> Optional[MicroBatcher]:
+        """
+        Create the micro-batcher for model calls, if batching is enabled
+        
+        "pipelined" sends each collected call as its own request, all at once
+        over the pooled session, for servers that batch internally.
+        "batched" sends the collected prompts as one completions request with
+        a list of prompts to LLAMA_BATCH_ENDPOINT. It needs that set to a
+        completions (not chat completions) endpoint, and falls back to
+        pipelined without one. Ollama has no batched endpoint, so it is
+        always pipelined.
+        
+        Returns:
+            The batcher, or None when batching is off
+        """
+        if self.batching_mode not in ('pipelined', 'batched'):
+            return None
+        
+        if self.batching_mode == 'batched' and self._is_ollama():
+            logger.warning("Ollama has no batched endpoint - pipelining model calls instead")
+            self.batching_mode = 'pipelined'
+        elif self.batching_mode == 'batched' and not self.batch_endpoint:
+            logger.warning("LLAMA_BATCH_ENDPOINT is not set - pipelining model calls instead")
+            self.batching_mode = 'pipelined'
+        
+        max_batch_size = int(os.getenv('LLAMA_BATCH_MAX_SIZE', '8'))
+        max_concurrent_batches = int(os.getenv('LLAMA_BATCH_CONCURRENCY', '4'))
+        
+        # Pipelined calls run side by side, so the pool needs a connection for each
+        pipeline_width = max_batch_size * max_concurrent_batches
+        if self.batching_mode == 'pipelined' and self.pool_maxsize < pipeline_width:
+            self.pool_maxsize = pipeline_width
+            self.session = self._create_session()
+        
+        self._pipeline_executor = ThreadPoolExecutor(
+            max_workers=pipeline_width,
+            thread_name_prefix='llama-pipeline'
+        )
+        
+        return MicroBatcher(
+            self._dispatch_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=float(os.getenv('LLAMA_BATCH_MAX_WAIT_MS', '10')),
+            max_concurrent_batches=max_concurrent_batches,
+            name='llama-batcher'
+        )
     
-    def generate_response(self, user_message: str, conversation_history: list = None) -> Dict[str, Any]:
+    def get_connection_stats(self) -> Dict[str, Any]:
+        """
+        Report how often pooled connections are reused
+        
+        Returns:
+            Dictionary with request, connection and reuse counts
+        """
+        total_requests = 0
+        total_connections = 0
+        adapters = {id(adapter): adapter for adapter in self.session.adapters.values()}
+        
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                total_requests += pool.num_requests
+                total_connections += pool.num_connections
+        
+        reused = max(total_requests - total_connections, 0)
+        
+        return {
+            'pool_maxsize': self.pool_maxsize,
+            'max_retries': self.max_retries,
+            'requests': total_requests,
+            'connections_opened': total_connections,
+            'connections_reused': reused,
+            'reuse_ratio': round(reused / total_requests, 3) if total_requests else 0.0
+        }
+    
+    def generate_response(self, user_message: str, conversation_history: list = None,
+                          use_cache: bool = True, conversation_id: str = None) -> Dict[str, Any]:
         """
         Generate a response using the Llama model
         
         Args:
             user_message: The user's input message
             conversation_history: List of previous messages for context
+            use_cache: Set to False to bypass the response cache
+            conversation_id: Identifies the conversation, for Ollama context reuse
             
         Returns:
             Dictionary containing the response and metadata
@@ -53,24 +242,237 @@ You're a real student helping other students. Keep it authentic and LMU-specific
             # Prepare the conversation context
             messages = self._prepare_messages(user_message, conversation_history)
             
-            # Make request to Llama model
-            response = self._call_llama_model(messages)
+            # Serve repeated questions from the response cache
+            cache_key = self._get_cache_key(user_message, messages) if use_cache else None
+            if cache_key:
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    return {
+                        'success': True,
+                        'response': cached,
+                        'model': 'llama-genz-buddy',
+                        'timestamp': self._get_timestamp(),
+                        'cached': True
+                    }
+            
+            # Make request to Llama model, or join the identical one in flight
+            response, _ = self.singleflight.do(
+                self._get_flight_key(user_message, messages, conversation_id),
+                lambda: self._call_if_allowed(messages, conversation_id)
+            )
+            
+            if cache_key and response:
+                self.response_cache.set(cache_key, response)
             
             return {
                 'success': True,
                 'response': response,
                 'model': 'llama-genz-buddy',
-                'timestamp': self._get_timestamp()
+                'timestamp': self._get_timestamp(),
+                'cached': False
             }
             
+        except CircuitOpenError:
+            return self._get_fallback_response(user_message)
         except Exception as e:
             logger.error(f"Error generating Llama response: {str(e)}")
             return self._get_fallback_response(user_message)
     
+    def stream_response(self, user_message: str, conversation_history: list = None,
+                        use_cache: bool = True, conversation_id: str = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a response from the Llama model as tokens arrive
+        
+        Yields 'token' events while the model generates. If the model fails
+        before or during the stream, a single 'fallback' event carrying the
+        full fallback response is yielded so the client can replace whatever
+        partial text it has shown. The stream always ends with a 'done' event.
+        
+        Args:
+            user_message: The user's input message
+            conversation_history: List of previous messages for context
+            use_cache: Set to False to bypass the response cache
+            conversation_id: Identifies the conversation, for Ollama context reuse
+            
+        Yields:
+            Event dictionaries with an 'event' key of 'token', 'fallback' or 'done'
+        """
+        model = 'llama-genz-buddy'
+        
+        try:
+            messages = self._prepare_messages(user_message, conversation_history)
+            
+            cache_key = self._get_cache_key(user_message, messages) if use_cache else None
+            cached = self.response_cache.get(cache_key) if cache_key else None
+            
+            if cached is not None:
+                yield {'event': 'token', 'token': cached}
+            else:
+                tokens = []
+                stream = self.singleflight.stream(
+                    self._get_flight_key(user_message, messages, conversation_id),
+                    lambda: self._stream_if_allowed(messages, conversation_id)
+                )
+                for token in stream:
+                    tokens.append(token)
+                    yield {'event': 'token', 'token': token}
+                
+                if cache_key and tokens:
+                    self.response_cache.set(cache_key, ''.join(tokens))
+                    
+        except CircuitOpenError:
+            fallback = self._get_fallback_response(user_message)
+            model = fallback['model']
+            yield {'event': 'fallback', 'response': fallback['response']}
+        except Exception as e:
+            logger.error(f"Error streaming Llama response: {str(e)}")
+            fallback = self._get_fallback_response(user_message)
+            model = fallback['model']
+            yield {'event': 'fallback', 'response': fallback['response']}
+        
+        yield {
+            'event': 'done',
+            'success': True,
+            'model': model,
+            'timestamp': self._get_timestamp()
+        }
+    
+    def _get_cache_key(self, user_message: str, messages: list) -> Optional[str]:
+        """
+        Build the response cache key for a prepared conversation
+        
+        Args:
+            user_message: The user's input message
+            messages: Prepared messages, system prompt first and user message last
+            
+        Returns:
+            Cache key, or None when caching is disabled
+        """
+        if not self.cache_enabled:
+            return None
+        return make_cache_key(user_message, messages[1:-1])
+    
+    def _get_flight_key(self, user_message: str, messages: list, conversation_id: str = None) -> str:
+        """
+        Key under which identical in-flight model calls are coalesced
+        
+        Same normalization as the cache key, but used even when caching is
+        disabled or bypassed. With Ollama, a conversation's calls only join
+        flights from the same conversation: the Ollama context is stored for
+        the caller that made the call, so a follower from another
+        conversation would lose its context and resend the full prompt on
+        its next turn.
+        """
+        key = make_cache_key(user_message, messages[1:-1])
+        if conversation_id and self._is_ollama():
+            key = f"{key}:{conversation_id}"
+        return key
+    
+    def _call_if_allowed(self, messages: list, conversation_id: str = None) -> str:
+        """
+        Call the model unless the circuit breaker is open
+        
+        Raises:
+            CircuitOpenError: The breaker refused the call
+        """
+        if not self.circuit_breaker.allow_request():
+            raise CircuitOpenError(self.circuit_breaker.name)
+        return self._call_with_breaker(messages, conversation_id)
+    
+    def _stream_if_allowed(self, messages: list, conversation_id: str = None) -> Iterator[str]:
+        """
+        Stream from the model unless the circuit breaker is open
+        
+        Raises:
+            CircuitOpenError: The breaker refused the call
+        """
+        if not self.circuit_breaker.allow_request():
+            raise CircuitOpenError(self.circuit_breaker.name)
+        yield from self._stream_with_breaker(messages, conversation_id)
+    
+    def _call_with_breaker(self, messages: list, conversation_id: str = None) -> str:
+        """
+        Call the model and report the outcome to the circuit breaker
+        
+        Args:
+            messages: Formatted messages for the model
+            conversation_id: Conversation the call belongs to, if known
+            
+        Returns:
+            Generated response text
+        """
+        start_time = time.monotonic()
+        MODEL_IN_FLIGHT.inc()
+        
+        try:
+            response = self._call_llama_model(messages, conversation_id)
+        except Exception as e:
+            self.circuit_breaker.record_failure(time.monotonic() - start_time, e)
+            MODEL_CALLS.inc(kind='call', outcome='error')
+            raise
+        finally:
+            MODEL_IN_FLIGHT.dec()
+            MODEL_LATENCY.observe(time.monotonic() - start_time, kind='call')
+        
+        self.circuit_breaker.record_success(time.monotonic() - start_time)
+        MODEL_CALLS.inc(kind='call', outcome='ok')
+        return response
+    
+    def _stream_with_breaker(self, messages: list, conversation_id: str = None) -> Iterator[str]:
+        """
+        Stream from the model and report the outcome to the circuit breaker
+        
+        Latency for a streamed call is measured to the first token, since a
+        long reply that starts promptly is a healthy model.
+        
+        Args:
+            messages: Formatted messages for the model
+            conversation_id: Conversation the call belongs to, if known
+            
+        Yields:
+            Non-empty generated text fragments in order
+        """
+        start_time = time.monotonic()
+        first_token_latency = None
+        MODEL_IN_FLIGHT.inc()
+        
+        try:
+            for token in self._stream_llama_model(messages, conversation_id):
+                if not token:
+                    continue
+                if first_token_latency is None:
+                    first_token_latency = time.monotonic() - start_time
+                    MODEL_FIRST_TOKEN.observe(first_token_latency)
+                yield token
+        except GeneratorExit:
+            # The client went away. Once tokens were flowing the model was healthy;
+            # before that, the call says nothing either way
+            if first_token_latency is not None:
+                self.circuit_breaker.record_success(first_token_latency)
+            else:
+                self.circuit_breaker.record_cancelled()
+            MODEL_CALLS.inc(kind='stream', outcome='abandoned')
+            raise
+        except Exception as e:
+            self.circuit_breaker.record_failure(time.monotonic() - start_time, e)
+            MODEL_CALLS.inc(kind='stream', outcome='error')
+            raise
+        finally:
+            MODEL_IN_FLIGHT.dec()
+            MODEL_LATENCY.observe(time.monotonic() - start_time, kind='stream')
+        
+        if first_token_latency is None:
+            first_token_latency = time.monotonic() - start_time
+        self.circuit_breaker.record_success(first_token_latency)
+        MODEL_CALLS.inc(kind='stream', outcome='ok')
+    
     def _prepare_messages(self, user_message: str, conversation_history: list = None) -> list:
         """
         Prepare messages for the Llama model API
         
+        History is kept newest-first within the context builder's token
+        budget, with oversized messages truncated.
+        
         Args:
             user_message: Current user message
             conversation_history: Previous conversation messages
@@ -78,62 +480,156 @@ You're a real student helping other students. Keep it authentic and LMU-specific
         Returns:
             List of formatted messages
         """
-        messages = [
-            {
-                "role": "system",
-                "content": self.system_prompt
-            }
-        ]
-        
-        # Add conversation history if provided
-        if conversation_history:
-            for msg in conversation_history[-5:]:  # Keep last 5 messages for context
-                messages.append({
-                    "role": "user" if msg["type"] == "user" else "assistant",
-                    "content": msg["content"]
-                })
-        
-        # Add current user message
-        messages.append({
-            "role": "user",
-            "content": user_message
-        })
+        return self.context_builder.build(user_message, conversation_history)
+    
+    def _call_llama_model(self, messages: list, conversation_id: str = None) -> str:
+        """
+        Make API call to the Llama model, through the micro-batcher if enabled
         
-        return messages
+        Args:
+            messages: Formatted messages for the model
+            conversation_id: Conversation the call belongs to, if known
+            
+        Returns:
+            Generated response text
+        """
+        if self.batcher:
+            return self.batcher.submit((messages, conversation_id), timeout=self.timeout * 2)
+        return self._send_model_request(messages, conversation_id)
     
-    def _call_llama_model(self, messages: list) -> str:
+    def _send_model_request(self, messages: list, conversation_id: str = None) -> str:
         """
-        Make API call to the Llama model
+        Send one generation request to the model
         
         Args:
             messages: Formatted messages for the model
+            conversation_id: Conversation the call belongs to, if known
             
         Returns:
             Generated response text
         """
         # Check if we're using Ollama (port 11434)
-        if "11434" in self.model_endpoint:
-            return self._call_ollama_model(messages)
+        if self._is_ollama():
+            return self._call_ollama_model(messages, conversation_id)
         else:
             return self._call_standard_model(messages)
     
-    def _call_ollama_model(self, messages: list) -> str:
+    def _dispatch_batch(self, batch: List[tuple]) -> list:
         """
-        Make API call to Ollama model
+        Send a batch of collected model calls
+        
+        Args:
+            batch: (messages, conversation_id) for each call
+            
+        Returns:
+            Response text or the Exception for each call, in order
+        """
+        if self.batching_mode == 'batched':
+            return self._call_batched_model([messages for messages, _ in batch])
+        
+        futures = [
+            self._pipeline_executor.submit(self._send_model_request, messages, conversation_id)
+            for messages, conversation_id in batch
+        ]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+    
+    def _call_batched_model(self, batch: List[list]) -> list:
+        """
+        Send several prompts as one completions request
+        
+        The server is expected to answer with one choice per prompt, matched
+        back up by choice index.
+        
+        Args:
+            batch: Formatted messages for each call
+            
+        Returns:
+            Response text or an Exception for each call, in order
+        """
+        _, headers = self._build_standard_request(batch[0], stream=False)
+        payload = {
+            "prompt": [self._convert_messages_to_prompt(messages) for messages in batch],
+            "max_tokens": 300,
+            "temperature": 0.8,
+            "top_p": 0.9
+        }
+        
+        response = self.session.post(
+            self.batch_endpoint,
+            json=payload,
+            headers=headers,
+            timeout=self.timeout
+        )
+        
+        if response.status_code != 200:
+            raise Exception(f"Model API error: {response.status_code} - {response.text}")
+        
+        result = response.json()
+        usage = result.get('usage') or {}
+        self._record_token_usage(usage.get('prompt_tokens'), usage.get('completion_tokens'))
+        
+        texts = [None] * len(batch)
+        for choice in result.get('choices') or []:
+            index = choice.get('index')
+            if isinstance(index, int) and 0 <= index < len(batch):
+                texts[index] = choice.get('text', '')
+        
+        return [text if text is not None else Exception("Missing completion in batch response") for text in texts]
+    
+    def _stream_llama_model(self, messages: list, conversation_id: str = None) -> Iterator[str]:
+        """
+        Make a streaming API call to the Llama model
         
         Args:
             messages: Formatted messages for the model
+            conversation_id: Conversation the call belongs to, if known
+            
+        Yields:
+            Generated text fragments in order
+        """
+        if self._is_ollama():
+            return self._stream_ollama_model(messages, conversation_id)
+        else:
+            return self._stream_standard_model(messages)
+    
+    def _is_ollama(self) -> bool:
+        """Whether the configured endpoint is an Ollama server (port 11434)"""
+        return "11434" in self.model_endpoint
+    
+    def _record_token_usage(self, prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+        """Add the token counts a model response reported to the metrics"""
+        if prompt_tokens:
+            MODEL_TOKENS.inc(prompt_tokens, kind='prompt')
+        if completion_tokens:
+            MODEL_TOKENS.inc(completion_tokens, kind='completion')
+    
+    def _build_ollama_request(self, messages: list, stream: bool, context: List[int] = None) -> tuple:
+        """
+        Build the payload and headers for an Ollama generate call
+        
+        Args:
+            messages: Formatted messages for the model
+            stream: Whether Ollama should stream NDJSON chunks
+            context: Context from the conversation's previous turn; when
+                given, only the new user message is sent as the prompt
             
         Returns:
-            Generated response text
+            Tuple of (payload, headers)
         """
         # Convert chat format to Ollama format
-        prompt = self._convert_messages_to_prompt(messages)
+        prompt = self._convert_messages_to_prompt(messages[-1:] if context else messages)
         
         payload = {
             "model": "llama2:7b",
             "prompt": prompt,
-            "stream": False,
+            "stream": stream,
+            "keep_alive": self.ollama_keep_alive,
             "options": {
                 "temperature": 0.8,
                 "top_p": 0.9,
@@ -141,39 +637,32 @@ You're a real student helping other students. Keep it authentic and LMU-specific
             }
         }
         
+        if context:
+            payload["context"] = context
+        
         headers = {
             "Content-Type": "application/json"
         }
         
-        response = requests.post(
-            self.model_endpoint,
-            json=payload,
-            headers=headers,
-            timeout=self.timeout
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            return result.get('response', '')
-        else:
-            raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
+        return payload, headers
     
-    def _call_standard_model(self, messages: list) -> str:
+    def _build_standard_request(self, messages: list, stream: bool) -> tuple:
         """
-        Make API call to standard chat completions model
+        Build the payload and headers for a chat completions call
         
         Args:
             messages: Formatted messages for the model
+            stream: Whether the server should stream SSE chunks
             
         Returns:
-            Generated response text
+            Tuple of (payload, headers)
         """
         payload = {
             "messages": messages,
             "max_tokens": 300,
             "temperature": 0.8,
             "top_p": 0.9,
-            "stream": False
+            "stream": stream
         }
         
         headers = {
@@ -183,7 +672,103 @@ You're a real student helping other students. Keep it authentic and LMU-specific
         if self.api_key:
             headers["Authorization"] = f"Bearer {self.api_key}"
         
-        response = requests.post(
+        return payload, headers
+    
+    def _call_ollama_model(self, messages: list, conversation_id: str = None) -> str:
+        """
+        Make API call to Ollama model
+        
+        With a conversation_id, the conversation's previous context is sent
+        when it still matches the history, and the new one is kept.
+        
+        Args:
+            messages: Formatted messages for the model
+            conversation_id: Conversation the call belongs to, if known
+            
+        Returns:
+            Generated response text
+        """
+        context = self.ollama_contexts.get(conversation_id, messages) if conversation_id else None
+        payload, headers = self._build_ollama_request(messages, stream=False, context=context)
+        
+        response = self.session.post(
+            self.model_endpoint,
+            json=payload,
+            headers=headers,
+            timeout=self.timeout
+        )
+        
+        if response.status_code == 200:
+            result = response.json()
+            text = result.get('response', '')
+            self._record_token_usage(result.get('prompt_eval_count'), result.get('eval_count'))
+            if conversation_id:
+                self.ollama_contexts.store(conversation_id, messages, text, result.get('context'))
+            return text
+        else:
+            raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
+    
+    def _stream_ollama_model(self, messages: list, conversation_id: str = None) -> Iterator[str]:
+        """
+        Make a streaming API call to Ollama model
+        
+        Ollama streams newline-delimited JSON objects, each carrying the next
+        piece of text in 'response' until one arrives with 'done' set. The
+        final object carries the context kept for the conversation's next turn.
+        
+        Args:
+            messages: Formatted messages for the model
+            conversation_id: Conversation the call belongs to, if known
+            
+        Yields:
+            Generated text fragments in order
+        """
+        context = self.ollama_contexts.get(conversation_id, messages) if conversation_id else None
+        payload, headers = self._build_ollama_request(messages, stream=True, context=context)
+        tokens = []
+        
+        response = self.session.post(
+            self.model_endpoint,
+            json=payload,
+            headers=headers,
+            timeout=self.timeout,
+            stream=True
+        )
+        
+        with response:
+            if response.status_code != 200:
+                raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
+            
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                
+                chunk = json.loads(line)
+                if chunk.get('error'):
+                    raise Exception(f"Ollama API error: {chunk['error']}")
+                
+                tokens.append(chunk.get('response', ''))
+                yield tokens[-1]
+                
+                if chunk.get('done'):
+                    self._record_token_usage(chunk.get('prompt_eval_count'), chunk.get('eval_count'))
+                    if conversation_id:
+                        self.ollama_contexts.store(conversation_id, messages, ''.join(tokens), chunk.get('context'))
+                    break
+    
+    def _call_standard_model(self, messages: list) -> str:
+        """
+        Make API call to standard chat completions model
+        
+        Args:
+            messages: Formatted messages for the model
+            
+        Returns:
+            Generated response text
+        """
+        payload, headers = self._build_standard_request(messages, stream=False)
+        
+        response = self.session.post(
             self.model_endpoint,
             json=payload,
             headers=headers,
@@ -192,10 +777,150 @@ You're a real student helping other students. Keep it authentic and LMU-specific
         
         if response.status_code == 200:
             result = response.json()
+            usage = result.get('usage') or {}
+            self._record_token_usage(usage.get('prompt_tokens'), usage.get('completion_tokens'))
             return result.get('choices', [{}])[0].get('message', {}).get('content', '')
         else:
             raise Exception(f"Model API error: {response.status_code} - {response.text}")
     
+    def _stream_standard_model(self, messages: list) -> Iterator[str]:
+        """
+        Make a streaming API call to standard chat completions model
+        
+        OpenAI-style servers stream Server-Sent Events whose data lines hold
+        a chunk with the next text in choices[0].delta.content, terminated by
+        a literal [DONE].
+        
+        Args:
+            messages: Formatted messages for the model
+            
+        Yields:
+            Generated text fragments in order
+        """
+        payload, headers = self._build_standard_request(messages, stream=True)
+        
+        response = self.session.post(
+            self.model_endpoint,
+            json=payload,
+            headers=headers,
+            timeout=self.timeout,
+            stream=True
+        )
+        
+        with response:
+            if response.status_code != 200:
+                raise Exception(f"Model API error: {response.status_code} - {response.text}")
+            
+            # SSE is always UTF-8; don't let requests guess ISO-8859-1 for text/*
+            response.encoding = 'utf-8'
+            tokens = []
+            usage = None
+            
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                
+                chunk = json.loads(data)
+                usage = chunk.get('usage') or usage
+                choices = chunk.get('choices') or [{}]
+                tokens.append(choices[0].get('delta', {}).get('content') or '')
+                yield tokens[-1]
+        
+        # Most servers only report usage in a stream when asked to; estimate it otherwise
+        if usage:
+            self._record_token_usage(usage.get('prompt_tokens'), usage.get('completion_tokens'))
+        else:
+            self._record_token_usage(
+                sum(estimate_tokens(message['content']) for message in messages),
+                estimate_tokens(''.join(tokens))
+            )
+    
+    def _probe_model(self):
+        """
+        Send a minimal 1-token request to check the model is serving
+        
+        Raises:
+            Exception: If the model endpoint does not answer successfully
+        """
+        messages = [{"role": "user", "content": "hi"}]
+        
+        if self._is_ollama():
+            payload, headers = self._build_ollama_request(messages, stream=False)
+            payload["options"]["num_predict"] = 1
+        else:
+            payload, headers = self._build_standard_request(messages, stream=False)
+            payload["max_tokens"] = 1
+        
+        response = self.session.post(
+            self.model_endpoint,
+            json=payload,
+            headers=headers,
+            timeout=min(self.timeout, 10)
+        )
+        
+        if response.status_code != 200:
+            raise Exception(f"Model probe error: {response.status_code} - {response.text}")
+    
+    def _get_models_url(self) -> Optional[str]:
+        """
+        URL of the server's model list, derived from the model endpoint
+        
+        Returns:
+            Ollama's /api/tags, the /models route next to an OpenAI-style
+            completions endpoint, or None if neither applies
+        """
+        parts = urlsplit(self.model_endpoint)
+        if self._is_ollama():
+            path = '/api/tags'
+        elif parts.path.endswith('/chat/completions'):
+            path = parts.path[:-len('/chat/completions')] + '/models'
+        elif parts.path.endswith('/completions'):
+            path = parts.path[:-len('/completions')] + '/models'
+        else:
+            return None
+        return urlunsplit((parts.scheme, parts.netloc, path, '', ''))
+    
+    def _health_check(self):
+        """
+        Cheap liveness check run by the health prober
+        
+        Lists the server's models by default (LLAMA_HEALTH_PROBE=models),
+        which answers without touching the GPU. LLAMA_HEALTH_PROBE=generate,
+        or an endpoint with no model list, uses the 1-token probe instead.
+        
+        Raises:
+            Exception: If the model server does not answer successfully
+        """
+        models_url = self._get_models_url() if self.health_probe_mode == 'models' else None
+        if models_url is None:
+            self._probe_model()
+            return
+        
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key and not self._is_ollama() else {}
+        response = self.session.get(models_url, headers=headers, timeout=min(self.timeout, 5))
+        
+        if response.status_code != 200:
+            raise Exception(f"Model list error: {response.status_code} - {response.text[:200]}")
+    
+    def get_health(self) -> Dict[str, Any]:
+        """
+        Model health from the last background probe, without calling the model
+        
+        Returns:
+            Probe status, latency and recent error rate, with status
+            'circuit_open' while the circuit breaker is refusing calls
+        """
+        health = self.health_prober.get_status()
+        health['model_endpoint'] = self.model_endpoint
+        if self.circuit_breaker.state == OPEN:
+            health['status'] = 'circuit_open'
+            health['error'] = 'Circuit breaker open - serving fallback responses'
+        return health
+    
     def _convert_messages_to_prompt(self, messages: list) -> str:
         """
         Convert chat messages to Ollama prompt format
@@ -234,48 +959,7 @@ You're a real student helping other students. Keep it authentic and LMU-specific
         Returns:
             Fallback response dictionary
         """
-        # Smart fallback responses with authentic GenZ LMU voice
-        fallback_responses = {
-            "food": "The Lair pizza hits different at 2am fr 🍕 fries are *chef's kiss* too. Den has fire chicken tenders if you're feeling that vibe. Pro tip: bring your student ID for the discount!",
-            
-            "greek": "Greek life mixer this Friday at the Sunken Garden, should be lit 🔥 rush week in the spring is a whole vibe. each house has their own personality fr. my friend Sarah just joined Alpha Phi and she's living her best life. dm me if you want the tea on specific houses 👀",
-            
-            "weekend": "This weekend gonna be LIT! 🔥 Friday basketball game vs USC (wear your LMU gear!), Saturday Greek mixer at the Sunken Garden, Sunday study session at the library for finals prep. plus there's a campus spirit challenge going on - you can earn points and prizes! you going to any of these?",
-            
-            "study": "U-Hall 3rd floor has the best views and is usually quieter. Den has great vibes if you want background noise, new student center has these amazing pods perfect for group study sessions. my secret spot? rooftop of the business building - so aesthetic and peaceful! 📚",
-            
-            "event": "Check the Events tab in the app! always something going on - basketball games, Greek mixers, study sessions. plus you can earn points for attending events and climb the leaderboard! what kind of vibe you looking for? 🎉",
-            
-            "points": "You can earn points by attending events, completing daily challenges, checking in at game days, and participating in campus activities! more you engage, more points you get. use them to claim prizes like LMU merch and game tickets! 🏆",
-            
-            "basketball": "Basketball games at Gersten are LIT! 🦁🔥 wear your LMU gear, the energy is unmatched. student section goes crazy fr. check the schedule on the athletics site or ASLMU Insta",
-            
-            "library": "William H. Hannon Library is the classic choice, but here's the real tea: 🫖 3rd floor has the best views and is usually quieter. Den has great vibes if you want background noise, and the new student center has these amazing pods that are perfect for group study sessions. my secret spot? rooftop of the business building - so aesthetic and peaceful! 📚",
-            
-            "default": "That's a great question! 🤔 honestly, I'm still learning about everything on campus, but I'd recommend checking the student activities page or asking around! LMU community is super helpful fr. what else can I help you with? 💫"
-        }
-        
-        # Determine which fallback to use based on keywords
-        message_lower = user_message.lower()
-        
-        if any(word in message_lower for word in ['food', 'eat', 'hungry', 'lair', 'den', 'pizza', 'cstore', 'c-store']):
-            response = fallback_responses["food"]
-        elif any(word in message_lower for word in ['greek', 'sorority', 'fraternity', 'rush', 'mixer']):
-            response = fallback_responses["greek"]
-        elif any(word in message_lower for word in ['weekend', 'friday', 'saturday', 'sunday', 'tonight']):
-            response = fallback_responses["weekend"]
-        elif any(word in message_lower for word in ['study', 'library', 'quiet', 'homework', 'exam', 'uhall', 'u-hall']):
-            response = fallback_responses["study"]
-        elif any(word in message_lower for word in ['event', 'party', 'game', 'basketball', 'gersten']):
-            response = fallback_responses["event"]
-        elif any(word in message_lower for word in ['point', 'score', 'rank', 'leaderboard']):
-            response = fallback_responses["points"]
-        elif any(word in message_lower for word in ['basketball', 'gersten', 'game']):
-            response = fallback_responses["basketball"]
-        elif any(word in message_lower for word in ['library', 'hannon', 'study']):
-            response = fallback_responses["library"]
-        else:
-            response = fallback_responses["default"]
+        response = get_fallback_text(user_message)
         
         return {
             'success': True,
@@ -297,6 +981,14 @@ You're a real student helping other students. Keep it authentic and LMU-specific
         Returns:
             Connection test results
         """
+        if self.circuit_breaker.state == OPEN:
+            return {
+                'success': False,
+                'model_endpoint': self.model_endpoint,
+                'status': 'circuit_open',
+                'error': 'Circuit breaker open - serving fallback responses'
+            }
+        
         try:
             test_message = "Hi! Can you tell me about LMU?"
             result = self.generate_response(test_message)
@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test and benchmark for the backend API
+
+Drives the chat, events, check-in and waitlist routes at a fixed
+concurrency and request mix, then reports throughput and p50/p95/p99
+latency per route as JSON, so runs can be compared between commits.
+
+By default asgi.application, the app as production serves it, is loaded
+in-process against local stubs: a model server that answers after
+--model-latency seconds, and a Supabase REST stub for the waitlist signups
+and count. Requests go through httpx's ASGI transport on one event loop, as
+in a uvicorn worker. --wsgi drives the Flask app through its test client
+instead. Events and check-ins use the in-memory repository, seeded with
+--users users. With --url, requests go to an already running server (e.g.
+under gunicorn) and no stubs are started.
+
+Usage:
+    python load_test.py [--concurrency 32] [--duration 15] [--mix chat=1,events=6,checkin=2,waitlist=1]
+                        [--model-latency 0.2] [--wsgi] [--url http://localhost:5000] [--output results.json]
+    python load_test.py --compare baseline.json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIX = 'chat=1,events=6,checkin=2,waitlist=1'
+
+CHAT_PROMPTS = [
+    "what's the best late night food on campus?",
+    "how do i join greek life?",
+    "what's happening this weekend?",
+    "where's the best study spot?",
+    "when's the next basketball game?",
+    "is the lair open on sundays?",
+    "how do lion dollars work?",
+    "what should i do first week as a freshman?"
+]
+
+class StubModelHandler(BaseHTTPRequestHandler):
+    """OpenAI-style model server that answers after a fixed latency"""
+
+    protocol_version = 'HTTP/1.1'
+    latency = 0.2
+    reply = ["no cap ", "the lair ", "hits different ", "at 2am ", "fr 🍕"]
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: Any, status: int = 200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        # Model list, used by the health prober
+        self._send_json({"object": "list", "data": [{"id": "llama-stub", "object": "model"}]})
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        time.sleep(self.latency)
+
+        if not request.get('stream'):
+            self._send_json({
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": ''.join(self.reply)}}],
+                "usage": {"prompt_tokens": 250, "completion_tokens": len(self.reply)}
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for piece in self.reply:
+            self._write_chunk(f"data: {json.dumps({'choices': [{'delta': {'content': piece}}]})}\n\n")
+        self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, text: str):
+        data = text.encode('utf-8')
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+class StubSupabaseHandler(BaseHTTPRequestHandler):
+    """
+    Just enough of Supabase's REST API for the benchmarked routes
+
+    Answers the join_waitlist RPC (rejecting repeated emails) and waitlist
+    counts; anything else gets an empty result.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    lock = threading.Lock()
+    emails = set()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: Any, status: int = 200, headers: Dict[str, str] = None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith('/rest/v1/waitlist'):
+            with self.lock:
+                count = len(self.emails)
+            self._send_json([], headers={'Content-Range': f'0-0/{count}'})
+            return
+        self._send_json([])
+
+    do_HEAD = do_GET
+
+    def do_POST(self):
+        params = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+
+        if self.path.startswith('/rest/v1/rpc/join_waitlist'):
+            with self.lock:
+                conflict = 'email' if params.get('p_email') in self.emails else None
+                if not conflict:
+                    self.emails.add(params.get('p_email'))
+                position = len(self.emails)
+            self._send_json([{
+                "waitlist_id": None if conflict else position,
+                "waitlist_position": None if conflict else position,
+                "conflict_field": conflict
+            }])
+            return
+
+        self._send_json([], status=201)
+
+def start_stub(handler: type) -> ThreadingHTTPServer:
+    """Serve a stub handler on a free local port in a background thread"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """
+    Parse a request mix like "chat=1,events=6"
+
+    Returns:
+        Scenario name to relative weight
+    """
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+def chat_request(rng: random.Random, seq: int, args) -> Tuple[str, str, Optional[dict], Tuple[int, ...]]:
+    # Numbered so every request reaches the model instead of the response cache
+    message = f"{rng.choice(CHAT_PROMPTS)} ({seq})"
+    return 'POST', '/api/genz-buddy', {"message": message, "no_cache": not args.chat_cache}, (200,)
+
+def events_request(rng: random.Random, seq: int, args) -> Tuple[str, str, Optional[dict], Tuple[int, ...]]:
+    return 'GET', '/api/events?limit=20', None, (200,)
+
+def checkin_request(rng: random.Random, seq: int, args) -> Tuple[str, str, Optional[dict], Tuple[int, ...]]:
+    # Repeat check-ins are answered with 400, which is expected under load
+    event_id = rng.choice([1, 2])
+    return 'POST', f'/api/events/{event_id}/checkin', {"user_id": rng.randint(1, args.users)}, (200, 400)
+
+def waitlist_request(rng: random.Random, seq: int, args) -> Tuple[str, str, Optional[dict], Tuple[int, ...]]:
+    token = f"{args.seed}-{seq}-{rng.randrange(10 ** 9)}"
+    return 'POST', '/api/waitlist', {
+        "email": f"load-{token}@lion.lmu.edu",
+        "name": "Load Test",
+        "student_id": f"{rng.randrange(10 ** 8):08d}"
+    }, (200, 409)
+
+SCENARIOS: Dict[str, Callable] = {
+    'chat': chat_request,
+    'events': events_request,
+    'checkin': checkin_request,
+    'waitlist': waitlist_request
+}
+
+def load_app(args):
+    """Start the stubs, point the app at them and import it in-process"""
+    model = start_stub(StubModelHandler)
+    StubModelHandler.latency = args.model_latency
+    supabase = start_stub(StubSupabaseHandler)
+
+    os.environ['LLAMA_MODEL_ENDPOINT'] = f"http://127.0.0.1:{model.server_port}/v1/chat/completions"
+    os.environ['SUPABASE_URL'] = f"http://127.0.0.1:{supabase.server_port}"
+    os.environ['SUPABASE_ANON_KEY'] = 'load.test'
+    os.environ.setdefault('LLAMA_POOL_MAXSIZE', str(args.concurrency))
+
+    import app as api
+    import asgi
+
+    # Seed enough users for check-ins to mostly succeed
+    template = api.mock_users[0]
+    api.repository.save_users([
+        {**template, "id": user_id, "name": f"Load User {user_id}", "email": f"user{user_id}@lion.lmu.edu", "points": 0}
+        for user_id in range(len(api.mock_users) + 1, args.users + 1)
+    ])
+    api.leaderboard.rebuild(api.repository.list_users())
+    return api.app if args.wsgi else asgi.application
+
+class ASGIClient:
+    """
+    Sends requests straight to an ASGI application on one event loop
+
+    The loop runs in a background thread and is shared by every load
+    worker, so the async chat route and the Flask thread pool behind the
+    other routes see the same concurrency as in a uvicorn worker.
+    """
+
+    def __init__(self, application, timeout: float):
+        self.timeout = timeout
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name='asgi-loop', daemon=True).start()
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=application), base_url='http://load.test', timeout=timeout
+        )
+
+    def send(self, method: str, path: str, body: Optional[dict]) -> int:
+        future = asyncio.run_coroutine_threadsafe(self.client.request(method, path, json=body), self.loop)
+        return future.result(self.timeout).status_code
+
+class WSGIClient:
+    """Sends requests straight to the Flask app through its test client"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def send(self, method: str, path: str, body: Optional[dict]) -> int:
+        response = self.client.open(path, method=method, json=body)
+        response.get_data()
+        return response.status_code
+
+class HTTPClient:
+    """Sends requests to a running server over a keep-alive session"""
+
+    def __init__(self, base_url: str, timeout: float):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def send(self, method: str, path: str, body: Optional[dict]) -> int:
+        response = self.session.request(method, self.base_url + path, json=body, timeout=self.timeout)
+        return response.status_code
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def summarize(samples: List[Tuple[float, int, bool]], elapsed: float) -> Dict[str, Any]:
+    """Throughput, error count and latency percentiles for (latency, status, ok) samples"""
+    latencies = sorted(latency for latency, _, _ in samples)
+    statuses = {}
+    for _, status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    def ms(value: float) -> float:
+        return round(value * 1000, 3)
+
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, _, ok in samples if not ok),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "statuses": statuses,
+        "latency_ms": {
+            "min": ms(latencies[0]) if latencies else 0.0,
+            "mean": ms(sum(latencies) / len(latencies)) if latencies else 0.0,
+            "p50": ms(percentile(latencies, 0.50)),
+            "p95": ms(percentile(latencies, 0.95)),
+            "p99": ms(percentile(latencies, 0.99)),
+            "max": ms(latencies[-1]) if latencies else 0.0
+        }
+    }
+
+def run(args) -> Dict[str, Any]:
+    """
+    Run the load test
+
+    Returns:
+        Report with the run configuration, an overall summary and one
+        summary per scenario
+    """
+    weights = parse_mix(args.mix)
+    names = list(weights)
+    cumulative = [sum(list(weights.values())[:i + 1]) for i in range(len(names))]
+
+    if args.url:
+        make_client = lambda: HTTPClient(args.url, args.timeout)
+    elif args.wsgi:
+        app = load_app(args)
+        make_client = lambda: WSGIClient(app)
+    else:
+        client = ASGIClient(load_app(args), args.timeout)
+        make_client = lambda: client
+
+    lock = threading.Lock()
+    samples = {name: [] for name in names}
+    counter = {'seq': 0}
+    start_barrier = threading.Barrier(args.concurrency + 1)
+    timing = {}
+
+    def next_seq() -> Optional[int]:
+        with lock:
+            if args.requests and counter['seq'] >= args.requests:
+                return None
+            counter['seq'] += 1
+            return counter['seq']
+
+    def worker(index: int):
+        rng = random.Random(args.seed * 1000 + index)
+        client = make_client()
+        local = {name: [] for name in names}
+        start_barrier.wait()
+
+        while True:
+            now = time.perf_counter()
+            if not args.requests and now >= timing['end']:
+                break
+            seq = next_seq()
+            if seq is None:
+                break
+
+            name = names[next(i for i, bound in enumerate(cumulative) if rng.random() * cumulative[-1] < bound)]
+            method, path, body, expected = SCENARIOS[name](rng, seq, args)
+
+            start_time = time.perf_counter()
+            try:
+                status = client.send(method, path, body)
+            except Exception as e:
+                logger.debug(f"{name} request failed: {str(e)}")
+                status = 0
+            finished = time.perf_counter()
+
+            if finished >= timing['measure_from']:
+                local[name].append((finished - start_time, status, status in expected))
+
+        with lock:
+            for name in names:
+                samples[name].extend(local[name])
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+
+    # A fixed request count is measured in full, without a warm-up
+    warmup = 0 if args.requests else args.warmup
+    started = time.perf_counter()
+    timing['measure_from'] = started + warmup
+    timing['end'] = started + warmup + args.duration
+    start_barrier.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - timing['measure_from']
+
+    all_samples = [sample for name in names for sample in samples[name]]
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "target": args.url or ("in-process-wsgi" if args.wsgi else "in-process-asgi"),
+            "concurrency": args.concurrency,
+            "duration_seconds": round(elapsed, 3),
+            "warmup_seconds": warmup,
+            "mix": weights,
+            "model_latency_seconds": None if args.url else args.model_latency,
+            "seed": args.seed
+        },
+        "summary": summarize(all_samples, elapsed),
+        "scenarios": {name: summarize(samples[name], elapsed) for name in names}
+    }
+
+def git_commit() -> Optional[str]:
+    """Commit the working tree is on, if this is a git checkout"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, timeout=5, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+def compare(baseline_path: str, current_path: str) -> str:
+    """Side-by-side throughput and latency of two reports, with percentage changes"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(current_path) as f:
+        current = json.load(f)
+
+    def change(old: float, new: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    lines = [f"{'scenario':<10} {'metric':<15} {baseline['meta'].get('commit') or 'baseline':>12} "
+             f"{current['meta'].get('commit') or 'current':>12} {'change':>9}"]
+    rows = [('all', baseline['summary'], current['summary'])]
+    rows += [(name, baseline['scenarios'][name], current['scenarios'][name])
+             for name in current['scenarios'] if name in baseline['scenarios']]
+    for name, old, new in rows:
+        metrics = [('throughput_rps', old['throughput_rps'], new['throughput_rps'])]
+        metrics += [(f"{key}_ms", old['latency_ms'][key], new['latency_ms'][key]) for key in ('p50', 'p95', 'p99')]
+        metrics.append(('errors', old['errors'], new['errors']))
+        for metric, old_value, new_value in metrics:
+            lines.append(f"{name:<10} {metric:<15} {old_value:>12} {new_value:>12} {change(old_value, new_value):>9}")
+    return '\n'.join(lines)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent load test for the backend API")
+    parser.add_argument('--concurrency', type=int, default=32, help="Concurrent clients (default 32)")
+    parser.add_argument('--duration', type=float, default=15.0, help="Seconds to measure for (default 15)")
+    parser.add_argument('--warmup', type=float, default=2.0, help="Seconds of unmeasured warm-up (default 2)")
+    parser.add_argument('--requests', type=int, default=0, help="Send exactly this many requests instead of running for --duration")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Relative weights of each scenario (default {DEFAULT_MIX})")
+    parser.add_argument('--model-latency', type=float, default=0.2, help="Seconds the stub model takes per reply (default 0.2)")
+    parser.add_argument('--users', type=int, default=2000, help="Users seeded and checked in (default 2000)")
+    parser.add_argument('--chat-cache', action='store_true', help="Let chat requests use the response cache")
+    parser.add_argument('--wsgi', action='store_true', help="Drive the Flask app's WSGI test client instead of asgi.application")
+    parser.add_argument('--url', help="Base URL of a running server; stubs are not started")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Per-request timeout (default 60)")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed for the request sequence (default 1)")
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help="Compare two JSON reports and exit")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.compare:
+        print(compare(*args.compare))
+        return 0
+
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    report = run(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        summary = report['summary']
+        print(f"{summary['requests']} requests, {summary['throughput_rps']} req/s, "
+              f"p50 {summary['latency_ms']['p50']} ms, p95 {summary['latency_ms']['p95']} ms, "
+              f"p99 {summary['latency_ms']['p99']} ms, {summary['errors']} errors -> {args.output}",
+              file=sys.stderr)
+    else:
+        print(output)
+
+    return 1 if report['summary']['errors'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import threading
+from typing import Iterable, Iterator, List, Optional
+
+class MemberSet:
+    """
+    Set of user ids for event attendees and check-ins
+
+    Membership checks, adds, removes and size are O(1), unlike the plain
+    lists the events used to carry. Serializes back to a sorted list so the
+    API keeps returning the same JSON shape.
+    """
+
+    __slots__ = ('_ids', '_lock')
+
+    def __init__(self, ids: Iterable[int] = ()):
+        """
+        Initialize the set
+
+        Args:
+            ids: Initial member ids
+        """
+        self._ids = set(ids)
+        self._lock = threading.Lock()
+
+    def __contains__(self, user_id) -> bool:
+        return user_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.to_list())
+
+    def __repr__(self) -> str:
+        return f"MemberSet({self.to_list()!r})"
+
+    def add(self, user_id, limit: Optional[int] = None) -> bool:
+        """
+        Add a member
+
+        Args:
+            user_id: Id to add
+            limit: Refuse to grow past this many members
+
+        Returns:
+            True if added, False if already a member or the set is full
+        """
+        with self._lock:
+            if user_id in self._ids:
+                return False
+            if limit is not None and len(self._ids) >= limit:
+                return False
+            self._ids.add(user_id)
+            return True
+
+    def discard(self, user_id) -> bool:
+        """
+        Remove a member if present
+
+        Args:
+            user_id: Id to remove
+
+        Returns:
+            True if the id was a member
+        """
+        with self._lock:
+            if user_id not in self._ids:
+                return False
+            self._ids.discard(user_id)
+            return True
+
+    def to_list(self) -> List[int]:
+        """Members as a sorted list, the shape the API returns"""
+        return sorted(self._ids, key=_sort_key)
+
+def _sort_key(user_id):
+    """Order ids numerically, tolerating stray non-integer ids from old data"""
+    return (0, user_id, '') if isinstance(user_id, int) else (1, 0, str(user_id))
@@ -0,0 +1,261 @@
+"""
+In-process metrics in the Prometheus text format
+
+Counters, gauges and histograms are plain locked dicts keyed by label
+values, cheap enough to stay on in production: an update is one lock and a
+dict lookup, plus a bisect for histograms. GET /metrics renders them for a
+Prometheus scrape. Like the caches, metrics are per process; scrape each
+worker, or aggregate on the Prometheus side.
+
+The shared metrics for HTTP requests, model calls, chat replies and
+Supabase calls are defined at the bottom of this module.
+"""
+
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from flask import Flask, g, request
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+MODEL_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class Metric:
+    """Base for a named metric with a fixed set of label names"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: Dict[str, str]) -> tuple:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}')
+        return lines
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    """Value that goes up and down, e.g. requests in flight"""
+
+    kind = 'gauge'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (last one is +Inf), sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}')
+            labels = _format_labels(self.label_names, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+class MetricsRegistry:
+    """Named metrics, rendered together for /metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """Add a metric, or return the one already registered under its name"""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+registry = MetricsRegistry()
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Set by timed() so code deep in a call can mark it failed without raising
+_current_call = contextvars.ContextVar('metrics_current_call', default=None)
+
+def timed(latency: Histogram, calls: Counter):
+    """
+    Decorator recording each call's latency and outcome by function name
+
+    A call's outcome is 'error' if it raises, or if it calls
+    record_call_error() - for functions that log and swallow failures.
+
+    Args:
+        latency: Histogram with a 'function' label
+        calls: Counter with 'function' and 'outcome' labels
+    """
+    def decorator(fn: Callable):
+        name = fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            failed = [False]
+            token = _current_call.set(failed)
+            start_time = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                failed[0] = True
+                raise
+            finally:
+                latency.observe(time.perf_counter() - start_time, function=name)
+                calls.inc(function=name, outcome='error' if failed[0] else 'ok')
+                _current_call.reset(token)
+        return wrapper
+    return decorator
+
+def record_call_error():
+    """Mark the innermost timed() call in progress as failed"""
+    failed = _current_call.get()
+    if failed is not None:
+        failed[0] = True
+
+# HTTP requests, by route template so ids in paths don't explode the label set
+HTTP_REQUESTS = registry.register(Counter(
+    'http_requests_total', 'HTTP requests by method, route and status', ('method', 'route', 'status')
+))
+HTTP_LATENCY = registry.register(Histogram(
+    'http_request_duration_seconds', 'Time to produce an HTTP response, by method and route', ('method', 'route')
+))
+HTTP_IN_FLIGHT = registry.register(Gauge(
+    'http_requests_in_flight', 'HTTP requests being handled'
+))
+
+# Model calls made by LlamaIntegration and AsyncLlamaIntegration
+MODEL_CALLS = registry.register(Counter(
+    'model_calls_total', 'Model calls by kind (call or stream) and outcome', ('kind', 'outcome')
+))
+MODEL_LATENCY = registry.register(Histogram(
+    'model_call_duration_seconds', 'Model call latency by kind, to the end of the reply', ('kind',), MODEL_BUCKETS
+))
+MODEL_FIRST_TOKEN = registry.register(Histogram(
+    'model_first_token_seconds', 'Time to the first streamed token', (), MODEL_BUCKETS
+))
+MODEL_TOKENS = registry.register(Counter(
+    'model_tokens_total', 'Tokens processed by the model, by kind (prompt or completion)', ('kind',)
+))
+MODEL_IN_FLIGHT = registry.register(Gauge(
+    'model_calls_in_flight', 'Model calls waiting on the model'
+))
+
+# Chat replies by the model that produced them; 'fallback' ones over the total is the fallback rate
+CHAT_REPLIES = registry.register(Counter(
+    'chat_replies_total', 'GenZ Buddy replies by model', ('model',)
+))
+
+# Supabase calls from database.py and SupabaseRepository
+SUPABASE_CALLS = registry.register(Counter(
+    'supabase_calls_total', 'Supabase calls by function and outcome', ('function', 'outcome')
+))
+SUPABASE_LATENCY = registry.register(Histogram(
+    'supabase_call_duration_seconds', 'Supabase call latency by function', ('function',)
+))
+
+supabase_call = timed(SUPABASE_LATENCY, SUPABASE_CALLS)
+
+def observe_request(method: str, route: str, status: int, duration: float):
+    """Record one finished HTTP request"""
+    HTTP_REQUESTS.inc(method=method, route=route, status=status)
+    HTTP_LATENCY.observe(duration, method=method, route=route)
+
+def instrument_app(app: Flask):
+    """Record latency, status and in-flight count for every Flask request"""
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+
+    @app.after_request
+    def _record_request(response):
+        start_time = g.get('metrics_start')
+        if start_time is not None:
+            route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+            observe_request(request.method, route, response.status_code, time.perf_counter() - start_time)
+        return response
+
+    # Teardown runs even when a response was never produced
+    @app.teardown_request
+    def _end_request(error=None):
+        if g.pop('metrics_start', None) is not None:
+            HTTP_IN_FLIGHT.dec()
@@ -0,0 +1,117 @@
+import hashlib
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+class OllamaContextCache:
+    """
+    Per-conversation store of the context arrays Ollama returns
+
+    Ollama's generate API returns `context`, the token state of the prompt
+    plus reply it just produced. Sending it back with the next prompt lets
+    the model skip re-processing the whole conversation, so a follow-up turn
+    only needs the new user message.
+
+    A stored context is only reused when the request's history still ends
+    with the exchange that produced it - the same user message and reply -
+    so an edited or reset conversation falls back to a full prompt.
+    Contexts are kept as compact int arrays, bounded by entry count and
+    token length, and dropped after idle_ttl seconds without a turn.
+    """
+
+    def __init__(self, max_entries: int = 500, max_context_tokens: int = 3072, idle_ttl: float = 900.0):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Most conversations kept (least recently used go first)
+            max_context_tokens: Longer contexts are not kept, so the next
+                turn starts over from the token-budgeted prompt
+            idle_ttl: Seconds a conversation's context is kept without a turn
+        """
+        self.max_entries = max_entries
+        self.max_context_tokens = max_context_tokens
+        self.idle_ttl = idle_ttl
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def _fingerprint(user_content: str, reply: str) -> str:
+        return hashlib.sha1(f"{user_content}\x00{reply}".encode('utf-8')).hexdigest()
+
+    def get(self, conversation_id: str, messages: list) -> Optional[List[int]]:
+        """
+        Look up the context to continue a conversation from
+
+        Args:
+            conversation_id: Conversation the messages belong to
+            messages: Prepared messages, ending with the new user message
+
+        Returns:
+            The stored context, or None if there is none or the history
+            doesn't end with the exchange it was stored for
+        """
+        fingerprint = None
+        if len(messages) >= 3 and messages[-3]["role"] == "user" and messages[-2]["role"] == "assistant":
+            fingerprint = self._fingerprint(messages[-3]["content"], messages[-2]["content"])
+
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is not None and time.monotonic() - entry["used_at"] >= self.idle_ttl:
+                del self._entries[conversation_id]
+                self._evictions += 1
+                entry = None
+
+            if entry is None or entry["fingerprint"] != fingerprint:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            entry["used_at"] = time.monotonic()
+            self._entries.move_to_end(conversation_id)
+            return entry["context"].tolist()
+
+    def store(self, conversation_id: str, messages: list, reply: str, context: List[int]):
+        """
+        Keep the context Ollama returned for a conversation's latest turn
+
+        Args:
+            conversation_id: Conversation the turn belongs to
+            messages: Prepared messages the reply answered
+            reply: The model's full reply
+            context: Context array from the final Ollama response
+        """
+        with self._lock:
+            if not context or len(context) > self.max_context_tokens:
+                self._entries.pop(conversation_id, None)
+                return
+
+            self._entries[conversation_id] = {
+                "context": array('i', context),
+                "fingerprint": self._fingerprint(messages[-1]["content"], reply),
+                "used_at": time.monotonic()
+            }
+            self._entries.move_to_end(conversation_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache counters"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "context_tokens": sum(len(entry["context"]) for entry in self._entries.values()),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions
+            }
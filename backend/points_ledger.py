@@ -0,0 +1,373 @@
+import atexit
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LOCK_STRIPES = int(os.environ.get('LEDGER_LOCK_STRIPES', '64'))
+HISTORY_SIZE = int(os.environ.get('LEDGER_HISTORY_SIZE', '10000'))
+BATCH_SIZE = int(os.environ.get('LEDGER_BATCH_SIZE', '200'))
+FLUSH_INTERVAL = float(os.environ.get('LEDGER_FLUSH_INTERVAL', '1.0'))
+MAX_PENDING = int(os.environ.get('LEDGER_MAX_PENDING', '50000'))
+MAX_BACKOFF = float(os.environ.get('LEDGER_MAX_BACKOFF', '60'))
+DEAD_LETTER_SIZE = int(os.environ.get('LEDGER_DEAD_LETTER_SIZE', '1000'))
+
+class EntriesRejected(Exception):
+    """Raised by a ledger sink when the entries themselves were refused, so sending them again would fail too"""
+
+class LedgerError(Exception):
+    """A points change that was refused; the message is safe to return to clients"""
+    status_code = 400
+
+class UserNotFound(LedgerError):
+    status_code = 404
+
+    def __init__(self):
+        super().__init__("User not found")
+
+class PrizeNotFound(LedgerError):
+    status_code = 404
+
+    def __init__(self):
+        super().__init__("Prize not found")
+
+class PrizeUnavailable(LedgerError):
+    def __init__(self):
+        super().__init__("Prize already claimed")
+
+class InsufficientPoints(LedgerError):
+    def __init__(self):
+        super().__init__("Insufficient points")
+
+class LedgerWriter:
+    """
+    Write-behind buffer that persists ledger entries in batches
+
+    Entries are queued in memory and a background thread hands them to the
+    sink in batches of up to batch_size, at least every flush_interval
+    seconds. When the sink fails (an outage, a timeout, a server error) the
+    batch stays at the front of the queue and the thread waits before trying
+    again, doubling the wait up to max_backoff. When the sink raises
+    EntriesRejected (e.g. a foreign key violation) the batch is split in half
+    and each half tried again, so the entries it refuses are narrowed down
+    and moved to a bounded dead-letter list instead of holding up everything
+    queued behind them. Past max_pending the oldest queued entries are
+    dropped so an outage can't exhaust memory.
+    """
+
+    def __init__(self, sink: Callable[[List[Dict[str, Any]]], bool], batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL, max_pending: int = MAX_PENDING,
+                 max_backoff: float = MAX_BACKOFF, dead_letter_size: int = DEAD_LETTER_SIZE):
+        """
+        Initialize the writer
+
+        Args:
+            sink: Persists a list of entries, returning True on success, False
+                if it may work later, or raising EntriesRejected
+            batch_size: Maximum entries per sink call
+            flush_interval: Seconds between flushes of a partial batch
+            max_pending: Maximum entries held while the sink is failing
+            max_backoff: Longest wait between attempts while the sink is failing
+            dead_letter_size: Most entries kept after the sink rejected them alone
+        """
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_backoff = max_backoff
+
+        self._pending = deque()
+        # Batches taken off the queue that failed, retried before new entries
+        self._retrying = deque()
+        self._backoff = 0.0
+        self._dead_letters = deque(maxlen=dead_letter_size)
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread_pid = None
+
+        self._written = 0
+        self._failed_batches = 0
+        self._dropped = 0
+        self._dead_lettered = 0
+
+        atexit.register(self.flush)
+
+    def submit(self, entry: Dict[str, Any]):
+        """Queue an entry for writing"""
+        with self._condition:
+            self._ensure_thread()
+            self._pending.append(entry)
+            if len(self._pending) > self.max_pending:
+                self._pending.popleft()
+                self._dropped += 1
+                if self._dropped % 1000 == 1:
+                    logger.warning(f"Ledger write-behind queue full, dropped {self._dropped} entries")
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def _ensure_thread(self):
+        """Start the flush thread, again in a forked worker that didn't inherit it"""
+        if self._thread_pid == os.getpid():
+            return
+        self._thread_pid = os.getpid()
+        threading.Thread(target=self._run, name='ledger-writer', daemon=True).start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if len(self._pending) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+            if not self.flush():
+                time.sleep(self._backoff)
+
+    def flush(self) -> bool:
+        """
+        Write everything queued so far
+
+        Returns:
+            False if a batch failed and is waiting to be retried
+        """
+        with self._flush_lock:
+            while True:
+                if self._retrying:
+                    batch = self._retrying.popleft()
+                else:
+                    with self._condition:
+                        batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                if not batch:
+                    return True
+
+                try:
+                    written = self.sink(batch)
+                except EntriesRejected as e:
+                    self._failed_batches += 1
+                    if len(batch) > 1:
+                        # Retry each half to isolate the entries the sink refuses
+                        middle = len(batch) // 2
+                        self._retrying.appendleft(batch[middle:])
+                        self._retrying.appendleft(batch[:middle])
+                        continue
+
+                    self._dead_letters.append(batch[0])
+                    self._dead_lettered += 1
+                    logger.error(f"Ledger entry {batch[0]['entry_id']} was rejected, moved to dead letters: {str(e)}")
+                    continue
+
+                if written:
+                    self._written += len(batch)
+                    self._backoff = 0.0
+                    continue
+
+                self._failed_batches += 1
+                self._retrying.appendleft(batch)
+                self._backoff = min(self._backoff * 2 or self.flush_interval, self.max_backoff)
+                return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Write-behind counters"""
+        return {
+            "pending": len(self._pending) + sum(len(batch) for batch in list(self._retrying)),
+            "written": self._written,
+            "failed_batches": self._failed_batches,
+            "dropped": self._dropped,
+            "dead_lettered": self._dead_lettered
+        }
+
+    def dead_letters(self) -> List[Dict[str, Any]]:
+        """Most recent entries the sink rejected on their own, oldest first"""
+        return list(self._dead_letters)
+
+class PointsLedger:
+    """
+    Append-only record of point changes with per-user locking
+
+    Every change to a user's balance goes through apply(), apply_batch() or
+    claim_prize(), each a single atomic repository call (a conditional
+    update in the database), so changes from other workers can't be lost.
+    A lock for the user is held around the call so this worker records
+    entries and calls on_change in the order the changes were applied.
+    Locks are striped by id, so changes for different users run in
+    parallel and only collide when two ids share a stripe. Claims take the
+    prize's lock before the user's, and nothing takes them the other way
+    round, so the two can't deadlock.
+    """
+
+    def __init__(self, repository, writer: Optional[LedgerWriter] = None,
+                 on_change: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 stripes: int = LOCK_STRIPES, history_size: int = HISTORY_SIZE):
+        """
+        Initialize the ledger
+
+        Args:
+            repository: Repository holding the users and prizes
+            writer: Write-behind writer for persisting entries
+            on_change: Called with the user record after each balance change
+            stripes: Number of user and prize locks
+            history_size: Number of recent entries kept in memory
+        """
+        self.repository = repository
+        self.writer = writer
+        self.on_change = on_change
+
+        self._user_locks = [threading.Lock() for _ in range(stripes)]
+        self._prize_locks = [threading.Lock() for _ in range(stripes)]
+        self._history = deque(maxlen=history_size)
+
+    def _user_lock(self, user_id) -> threading.Lock:
+        return self._user_locks[hash(user_id) % len(self._user_locks)]
+
+    def _prize_lock(self, prize_id) -> threading.Lock:
+        return self._prize_locks[hash(prize_id) % len(self._prize_locks)]
+
+    def apply(self, user_id: int, points: int, reason: str = 'adjustment',
+              event_id: Optional[int] = None, min_balance: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Add (or with a negative value, deduct) points for a user
+
+        Args:
+            user_id: User whose balance changes
+            points: Points to add
+            reason: What the change is for, e.g. 'check_in'
+            event_id: Event the points were earned at
+            min_balance: Refuse the change if it would leave less than this
+
+        Returns:
+            The ledger entry, including the new balance
+
+        Raises:
+            UserNotFound: The user doesn't exist
+            InsufficientPoints: The change would go below min_balance
+        """
+        with self._user_lock(user_id):
+            user = self.repository.add_points(user_id, points, min_balance)
+            if user is None:
+                raise UserNotFound() if not self.repository.get_user(user_id) else InsufficientPoints()
+            return self._record_change(user, points, reason, event_id)
+
+    def apply_batch(self, user_ids: List[int], points: int, reason: str = 'adjustment',
+                    event_id: Optional[int] = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Add the same points to many users with one atomic write
+
+        The users' lock stripes are taken in a fixed order, so a batch can't
+        deadlock with another batch, and single-user changes to any of the
+        users wait for it.
+
+        Args:
+            user_ids: Users whose balances change
+            points: Points to add to each
+            reason: What the change is for, e.g. 'check_in'
+            event_id: Event the points were earned at
+
+        Returns:
+            Ledger entries keyed by user id; unknown users are left out
+        """
+        stripes = sorted({hash(user_id) % len(self._user_locks) for user_id in user_ids})
+        locks = [self._user_locks[stripe] for stripe in stripes]
+        for lock in locks:
+            lock.acquire()
+        try:
+            users = self.repository.add_points_to_users(user_ids, points)
+            entries = {}
+            for user_id in user_ids:
+                if user_id in users and user_id not in entries:
+                    entries[user_id] = self._record(users[user_id], points, reason, event_id)
+
+            if self.on_change:
+                for user_id in entries:
+                    self.on_change(users[user_id])
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+        return entries
+
+    def claim_prize(self, prize_id: int, user_id: int) -> Dict[str, Any]:
+        """
+        Claim a prize, deducting its cost, as one atomic step
+
+        Args:
+            prize_id: Prize to claim
+            user_id: User claiming it
+
+        Returns:
+            The ledger entry for the deduction
+
+        Raises:
+            PrizeNotFound, UserNotFound, PrizeUnavailable, InsufficientPoints
+        """
+        with self._prize_lock(prize_id):
+            prize = self.repository.get_prize(prize_id)
+            if not prize:
+                raise PrizeNotFound()
+            if prize["claimedBy"]:
+                raise PrizeUnavailable()
+
+            with self._user_lock(user_id):
+                user = self.repository.claim_prize(prize_id, user_id)
+                if user is None:
+                    if not self.repository.get_user(user_id):
+                        raise UserNotFound()
+                    prize = self.repository.get_prize(prize_id)
+                    if not prize or prize["claimedBy"]:
+                        raise PrizeUnavailable()
+                    raise InsufficientPoints()
+                return self._record_change(user, -prize["pointCost"], 'prize_claim', None)
+
+    def _record_change(self, user: Dict[str, Any], points: int, reason: str,
+                       event_id: Optional[int]) -> Dict[str, Any]:
+        """Record a change already applied to the user, with the user's lock held"""
+        entry = self._record(user, points, reason, event_id)
+        if self.on_change:
+            self.on_change(user)
+        return entry
+
+    def _record(self, user: Dict[str, Any], points: int, reason: str, event_id: Optional[int]) -> Dict[str, Any]:
+        """Append the entry for a change already applied to the user record"""
+        entry = {
+            "entry_id": uuid.uuid4().hex,
+            "user_id": user["id"],
+            "event_id": event_id,
+            "points": points,
+            "balance": user["points"],
+            "reason": reason,
+            "timestamp": datetime.now().isoformat()
+        }
+        self._history.append(entry)
+        if self.writer:
+            self.writer.submit(entry)
+        return entry
+
+    def recent_entries(self, user_id: Optional[int] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Most recent entries, newest first
+
+        Args:
+            user_id: Only entries for this user
+            limit: Maximum number of entries
+
+        Returns:
+            Ledger entries
+        """
+        entries = []
+        for entry in reversed(list(self._history)):
+            if user_id is None or entry["user_id"] == user_id:
+                entries.append(entry)
+                if len(entries) >= limit:
+                    break
+        return entries
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Ledger and write-behind counters"""
+        stats = {
+            "lock_stripes": len(self._user_locks),
+            "recent_entries": len(self._history)
+        }
+        if self.writer:
+            stats["write_behind"] = self.writer.get_stats()
+        return stats
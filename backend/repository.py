@@ -0,0 +1,642 @@
+import bisect
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from membership import MemberSet
+from metrics import supabase_call
+
+try:
+    from database import get_supabase_client
+except ImportError:
+    get_supabase_client = None
+
+logger = logging.getLogger(__name__)
+
+# Rows per request when reading a whole table; PostgREST cuts unranged
+# selects off at its max-rows setting, 1000 by default
+PAGE_SIZE = 1000
+
+class Repository(ABC):
+    """
+    Data access interface used by the API routes
+
+    Records are plain dictionaries in the shape the API returns. Routes that
+    change a record pass it back to the matching save method so the backing
+    store and its indexes stay in sync.
+    """
+
+    @abstractmethod
+    def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def get_users(self, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Look up several users at once
+
+        Args:
+            user_ids: Ids to fetch
+
+        Returns:
+            The users that exist, keyed by id
+        """
+
+    @abstractmethod
+    def list_users(self) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def save_user(self, user: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def save_users(self, users: List[Dict[str, Any]]):
+        ...
+
+    @abstractmethod
+    def add_points(self, user_id: int, points: int, min_balance: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Add (or with a negative value, deduct) points as one atomic step
+
+        Args:
+            user_id: User whose balance changes
+            points: Points to add
+            min_balance: Refuse a deduction that would leave less than this
+
+        Returns:
+            The updated user, or None if there is no such user or the
+            deduction was refused
+        """
+
+    @abstractmethod
+    def add_points_to_users(self, user_ids: List[int], points: int) -> Dict[int, Dict[str, Any]]:
+        """
+        Add the same points to many users as one atomic step
+
+        Args:
+            user_ids: Users whose balances change; repeats count once
+            points: Points to add to each
+
+        Returns:
+            The updated users that exist, keyed by id
+        """
+
+    @abstractmethod
+    def get_event(self, event_id: int) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def list_events(self, event_type: Optional[str] = None, start: Optional[str] = None,
+                    end: Optional[str] = None, tags: Optional[List[str]] = None,
+                    after: Optional[Tuple[str, int]] = None, limit: Optional[int] = None,
+                    summary: bool = False) -> List[Dict[str, Any]]:
+        """
+        List events in date order
+
+        Args:
+            event_type: Only events of this type
+            start: Only events on or after this ISO date/time
+            end: Only events before this ISO date/time
+            tags: Only events carrying all of these tags
+            after: Only events after this (date, id) key, for cursor paging
+            limit: Maximum number of events
+            summary: Return summaries (see event_summary) instead of full records
+
+        Returns:
+            Matching events ordered by date, then id
+        """
+
+    @abstractmethod
+    def save_event(self, event: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def toggle_attendee(self, event_id: int, user_id: int) -> Optional[str]:
+        """
+        RSVP a user to an event, or cancel their RSVP, as one atomic step
+
+        Args:
+            event_id: Event to RSVP to
+            user_id: User RSVPing
+
+        Returns:
+            "added", "removed", "full" if the event is at capacity, or None
+            if there is no such event
+        """
+
+    @abstractmethod
+    def add_check_ins(self, event_id: int, user_ids: List[int]) -> List[int]:
+        """
+        Record check-ins to an event as one atomic step
+
+        Concurrent calls for the same event each add their users rather
+        than overwriting the other's, so a user is only ever reported as
+        newly checked in once.
+
+        Args:
+            event_id: Event being checked in to
+            user_ids: Users to check in
+
+        Returns:
+            The users that weren't checked in already
+        """
+
+    @abstractmethod
+    def remove_check_ins(self, event_id: int, user_ids: List[int]):
+        """
+        Undo check-ins, as one atomic step, e.g. when awarding their points failed
+
+        Args:
+            event_id: Event the users were checked in to
+            user_ids: Users to take off the check-in list
+        """
+
+    @abstractmethod
+    def get_prize(self, prize_id: int) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def list_prizes(self) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def save_prize(self, prize: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def claim_prize(self, prize_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Mark an unclaimed prize as claimed and deduct its cost as one atomic step
+
+        Args:
+            prize_id: Prize to claim
+            user_id: User claiming it
+
+        Returns:
+            The updated user, or None if the prize or user doesn't exist, the
+            prize is already claimed or the user can't afford it
+        """
+
+class InMemoryRepository(Repository):
+    """
+    Repository over in-process data with hash and date indexes
+
+    Users, events and prizes are keyed by id. Users are also indexed by
+    email, and events by date (overall and per type) as sorted lists of
+    (date, id) keys, so range queries are a bisect rather than a scan.
+    Event attendee and check-in lists are held as MemberSets.
+    """
+
+    def __init__(self, users: list = None, events: list = None, prizes: list = None):
+        """
+        Initialize the repository
+
+        Args:
+            users: Initial user records
+            events: Initial event records
+            prizes: Initial prize records
+        """
+        self._lock = threading.RLock()
+
+        self._users = {}
+        self._users_by_email = {}
+
+        self._events = {}
+        self._event_keys = {}
+        self._events_by_date = []
+        self._events_by_type = {}
+
+        self._prizes = {}
+
+        for user in users or []:
+            self.save_user(user)
+        for event in events or []:
+            self.save_event(event)
+        for prize in prizes or []:
+            self.save_prize(prize)
+
+    def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        return self._users.get(user_id)
+
+    def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        return self._users_by_email.get(email.lower())
+
+    def get_users(self, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        users = {}
+        for user_id in user_ids:
+            user = self._users.get(user_id)
+            if user is not None:
+                users[user_id] = user
+        return users
+
+    def list_users(self) -> List[Dict[str, Any]]:
+        return list(self._users.values())
+
+    def save_user(self, user: Dict[str, Any]):
+        with self._lock:
+            previous = self._users.get(user["id"])
+            if previous is not None and previous.get("email"):
+                self._users_by_email.pop(previous["email"].lower(), None)
+
+            self._users[user["id"]] = user
+            if user.get("email"):
+                self._users_by_email[user["email"].lower()] = user
+
+    def save_users(self, users: List[Dict[str, Any]]):
+        with self._lock:
+            for user in users:
+                self.save_user(user)
+
+    def add_points(self, user_id: int, points: int, min_balance: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return None
+            balance = (user.get("points") or 0) + points
+            if min_balance is not None and points < 0 and balance < min_balance:
+                return None
+            user["points"] = balance
+            return user
+
+    def add_points_to_users(self, user_ids: List[int], points: int) -> Dict[int, Dict[str, Any]]:
+        with self._lock:
+            users = {}
+            for user_id in user_ids:
+                user = self._users.get(user_id)
+                if user is not None and user_id not in users:
+                    user["points"] = (user.get("points") or 0) + points
+                    users[user_id] = user
+            return users
+
+    def get_event(self, event_id: int) -> Optional[Dict[str, Any]]:
+        return self._events.get(event_id)
+
+    def list_events(self, event_type: Optional[str] = None, start: Optional[str] = None,
+                    end: Optional[str] = None, tags: Optional[List[str]] = None,
+                    after: Optional[Tuple[str, int]] = None, limit: Optional[int] = None,
+                    summary: bool = False) -> List[Dict[str, Any]]:
+        with self._lock:
+            index = self._events_by_date if event_type is None else self._events_by_type.get(event_type, [])
+
+            low = bisect.bisect_left(index, (start,)) if start else 0
+            if after:
+                low = max(low, bisect.bisect_right(index, tuple(after)))
+            high = bisect.bisect_left(index, (end,)) if end else len(index)
+
+            events = []
+            for position in range(low, high):
+                event = self._events[index[position][1]]
+                if tags and not set(tags).issubset(event.get("tags") or ()):
+                    continue
+                events.append(event_summary(event) if summary else event)
+                if limit is not None and len(events) >= limit:
+                    break
+            return events
+
+    def save_event(self, event: Dict[str, Any]):
+        with self._lock:
+            _ensure_member_sets(event)
+
+            key = (event["date"], event["id"])
+            previous = self._event_keys.get(event["id"])
+
+            if previous != (event["type"], key):
+                if previous is not None:
+                    previous_type, previous_key = previous
+                    self._remove_key(self._events_by_date, previous_key)
+                    self._remove_key(self._events_by_type[previous_type], previous_key)
+
+                bisect.insort(self._events_by_date, key)
+                bisect.insort(self._events_by_type.setdefault(event["type"], []), key)
+                self._event_keys[event["id"]] = (event["type"], key)
+
+            self._events[event["id"]] = event
+
+    def toggle_attendee(self, event_id: int, user_id: int) -> Optional[str]:
+        with self._lock:
+            event = self._events.get(event_id)
+            if event is None:
+                return None
+            if event["attendees"].discard(user_id):
+                return "removed"
+            if event["attendees"].add(user_id, limit=event.get("maxCapacity")):
+                return "added"
+            return "full"
+
+    def add_check_ins(self, event_id: int, user_ids: List[int]) -> List[int]:
+        event = self._events.get(event_id)
+        if event is None:
+            return []
+        return [user_id for user_id in user_ids if event["checkedIn"].add(user_id)]
+
+    def remove_check_ins(self, event_id: int, user_ids: List[int]):
+        event = self._events.get(event_id)
+        if event is not None:
+            for user_id in user_ids:
+                event["checkedIn"].discard(user_id)
+
+    def get_prize(self, prize_id: int) -> Optional[Dict[str, Any]]:
+        return self._prizes.get(prize_id)
+
+    def list_prizes(self) -> List[Dict[str, Any]]:
+        return list(self._prizes.values())
+
+    def save_prize(self, prize: Dict[str, Any]):
+        with self._lock:
+            self._prizes[prize["id"]] = prize
+
+    def claim_prize(self, prize_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            prize = self._prizes.get(prize_id)
+            user = self._users.get(user_id)
+            if prize is None or user is None or prize.get("claimedBy"):
+                return None
+            if (user.get("points") or 0) < prize["pointCost"]:
+                return None
+            prize["claimedBy"] = user_id
+            prize["status"] = "claimed"
+            user["points"] -= prize["pointCost"]
+            return user
+
+    @staticmethod
+    def _remove_key(index: list, key: tuple):
+        """Remove a key from a sorted index"""
+        position = bisect.bisect_left(index, key)
+        if position < len(index) and index[position] == key:
+            del index[position]
+
+class SupabaseRepository(Repository):
+    """
+    Repository backed by the Supabase users, events and prizes tables
+
+    Column names are mapped to the camelCase keys the API returns. Lookups
+    go through the tables' primary key, email and date indexes. Attendee
+    and check-in arrays, point balances and prize claims are only changed
+    through database functions that update the rows in place, never by
+    writing back a value read earlier.
+    """
+
+    def __init__(self):
+        if get_supabase_client is None:
+            raise RuntimeError("Database integration not available")
+
+    def _table(self, name: str):
+        client = get_supabase_client()
+        if not client:
+            raise RuntimeError("Supabase client not available")
+        return client.table(name)
+
+    def _rpc(self, name: str, params: Dict[str, Any]):
+        client = get_supabase_client()
+        if not client:
+            raise RuntimeError("Supabase client not available")
+        return client.rpc(name, params).execute()
+
+    @supabase_call
+    def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        response = self._table('users').select('*').eq('id', user_id).limit(1).execute()
+        return _user_from_row(response.data[0]) if response.data else None
+
+    @supabase_call
+    def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        response = self._table('users').select('*').eq('email', email).limit(1).execute()
+        return _user_from_row(response.data[0]) if response.data else None
+
+    @supabase_call
+    def get_users(self, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        ids = [user_id for user_id in set(user_ids) if isinstance(user_id, int)]
+        if not ids:
+            return {}
+        response = self._table('users').select('*').in_('id', ids).execute()
+        return {row["id"]: _user_from_row(row) for row in response.data or []}
+
+    @supabase_call
+    def list_users(self) -> List[Dict[str, Any]]:
+        users = []
+        while True:
+            response = self._table('users').select('*').order('id').limit(PAGE_SIZE).offset(len(users)).execute()
+            rows = response.data or []
+            users.extend(_user_from_row(row) for row in rows)
+            if len(rows) < PAGE_SIZE:
+                return users
+
+    @supabase_call
+    def save_user(self, user: Dict[str, Any]):
+        self._table('users').update(_user_to_row(user)).eq('id', user["id"]).execute()
+
+    @supabase_call
+    def save_users(self, users: List[Dict[str, Any]]):
+        if users:
+            rows = [dict(_user_to_row(user), id=user["id"]) for user in users]
+            self._table('users').upsert(rows, returning='minimal').execute()
+
+    @supabase_call
+    def add_points(self, user_id: int, points: int, min_balance: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        if not isinstance(user_id, int):
+            return None
+        response = self._rpc('add_user_points', {'p_user_id': user_id, 'p_points': points, 'p_min_balance': min_balance})
+        return _user_from_row(response.data[0]) if response.data else None
+
+    @supabase_call
+    def add_points_to_users(self, user_ids: List[int], points: int) -> Dict[int, Dict[str, Any]]:
+        ids = [user_id for user_id in set(user_ids) if isinstance(user_id, int)]
+        if not ids:
+            return {}
+        response = self._rpc('add_points_to_users', {'p_user_ids': ids, 'p_points': points})
+        return {row["id"]: _user_from_row(row) for row in response.data or []}
+
+    @supabase_call
+    def get_event(self, event_id: int) -> Optional[Dict[str, Any]]:
+        response = self._table('events').select('*').eq('id', event_id).limit(1).execute()
+        return _event_from_row(response.data[0]) if response.data else None
+
+    @supabase_call
+    def list_events(self, event_type: Optional[str] = None, start: Optional[str] = None,
+                    end: Optional[str] = None, tags: Optional[List[str]] = None,
+                    after: Optional[Tuple[str, int]] = None, limit: Optional[int] = None,
+                    summary: bool = False) -> List[Dict[str, Any]]:
+        query = self._table('events').select(EVENT_SUMMARY_COLUMNS if summary else '*')
+        if event_type:
+            query = query.eq('type', event_type)
+        if start:
+            query = query.gte('date', start)
+        if end:
+            query = query.lt('date', end)
+        if tags:
+            query = query.contains('tags', list(tags))
+        if after:
+            after_date, after_id = after
+            query = query.or_(f'date.gt."{after_date}",and(date.eq."{after_date}",id.gt.{int(after_id)})')
+
+        query = query.order('date').order('id')
+        if limit is not None:
+            query = query.limit(limit)
+
+        response = query.execute()
+        from_row = _event_summary_from_row if summary else _event_from_row
+        return [from_row(row) for row in response.data or []]
+
+    @supabase_call
+    def save_event(self, event: Dict[str, Any]):
+        self._table('events').update(_event_to_row(event)).eq('id', event["id"]).execute()
+
+    @supabase_call
+    def toggle_attendee(self, event_id: int, user_id: int) -> Optional[str]:
+        response = self._rpc('toggle_event_rsvp', {'p_event_id': event_id, 'p_user_id': user_id})
+        return response.data or None
+
+    @supabase_call
+    def add_check_ins(self, event_id: int, user_ids: List[int]) -> List[int]:
+        if not user_ids:
+            return []
+        response = self._rpc('check_in_users', {'p_event_id': event_id, 'p_user_ids': list(user_ids)})
+        return [row["checked_in_user_id"] for row in response.data or []]
+
+    @supabase_call
+    def remove_check_ins(self, event_id: int, user_ids: List[int]):
+        if user_ids:
+            self._rpc('remove_check_ins', {'p_event_id': event_id, 'p_user_ids': list(user_ids)})
+
+    @supabase_call
+    def get_prize(self, prize_id: int) -> Optional[Dict[str, Any]]:
+        response = self._table('prizes').select('*').eq('id', prize_id).limit(1).execute()
+        return _prize_from_row(response.data[0]) if response.data else None
+
+    @supabase_call
+    def list_prizes(self) -> List[Dict[str, Any]]:
+        response = self._table('prizes').select('*').order('id').execute()
+        return [_prize_from_row(row) for row in response.data or []]
+
+    @supabase_call
+    def save_prize(self, prize: Dict[str, Any]):
+        self._table('prizes').update(_prize_to_row(prize)).eq('id', prize["id"]).execute()
+
+    @supabase_call
+    def claim_prize(self, prize_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+        if not isinstance(user_id, int):
+            return None
+        response = self._rpc('claim_prize', {'p_prize_id': prize_id, 'p_user_id': user_id})
+        return _user_from_row(response.data[0]) if response.data else None
+
+# Columns read for event summaries: everything but the attendee and check-in
+# arrays, whose sizes come from generated count columns instead
+EVENT_SUMMARY_COLUMNS = (
+    'id,title,type,date,location,image,host,description,max_capacity,points,tags,'
+    'attendee_count,checked_in_count'
+)
+
+def event_summary(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Lightweight view of an event for listings
+
+    Drops the attendee and check-in id lists, which grow with every RSVP,
+    and reports their sizes instead.
+    """
+    summary = {key: value for key, value in event.items() if key not in ("attendees", "checkedIn")}
+    summary["attendeeCount"] = len(event.get("attendees") or ())
+    summary["checkedInCount"] = len(event.get("checkedIn") or ())
+    return summary
+
+def _ensure_member_sets(event: Dict[str, Any]):
+    """Store attendee and check-in lists as MemberSets"""
+    for field in ("attendees", "checkedIn"):
+        if not isinstance(event.get(field), MemberSet):
+            event[field] = MemberSet(event.get(field) or [])
+
+def _user_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "name": row["name"],
+        "email": row["email"],
+        "avatar": row.get("avatar"),
+        "points": row.get("points") or 0,
+        "streak": row.get("streak") or 0,
+        "orgs": row.get("orgs") or [],
+        "badges": row.get("badges") or []
+    }
+
+def _user_to_row(user: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "name": user["name"],
+        "email": user["email"],
+        "avatar": user.get("avatar"),
+        "points": user.get("points", 0),
+        "streak": user.get("streak", 0),
+        "orgs": list(user.get("orgs") or []),
+        "badges": list(user.get("badges") or [])
+    }
+
+def _event_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "title": row["title"],
+        "type": row["type"],
+        "date": row["date"],
+        "location": row.get("location"),
+        "image": row.get("image"),
+        "host": row.get("host"),
+        "description": row.get("description"),
+        "attendees": MemberSet(row.get("attendees") or []),
+        "maxCapacity": row.get("max_capacity"),
+        "checkedIn": MemberSet(row.get("checked_in") or []),
+        "points": row.get("points") or 0,
+        "tags": row.get("tags") or []
+    }
+
+def _event_summary_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "title": row["title"],
+        "type": row["type"],
+        "date": row["date"],
+        "location": row.get("location"),
+        "image": row.get("image"),
+        "host": row.get("host"),
+        "description": row.get("description"),
+        "maxCapacity": row.get("max_capacity"),
+        "points": row.get("points") or 0,
+        "tags": row.get("tags") or [],
+        "attendeeCount": row.get("attendee_count") or 0,
+        "checkedInCount": row.get("checked_in_count") or 0
+    }
+
+def _event_to_row(event: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "title": event["title"],
+        "type": event["type"],
+        "date": event["date"],
+        "location": event.get("location"),
+        "image": event.get("image"),
+        "host": event.get("host"),
+        "description": event.get("description"),
+        "max_capacity": event.get("maxCapacity"),
+        "points": event.get("points", 0),
+        "tags": event.get("tags", [])
+    }
+
+def _prize_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "name": row["name"],
+        "description": row.get("description"),
+        "image": row.get("image"),
+        "pointCost": row["point_cost"],
+        "claimedBy": row.get("claimed_by"),
+        "status": row.get("status") or "available"
+    }
+
+def _prize_to_row(prize: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "name": prize["name"],
+        "description": prize.get("description"),
+        "image": prize.get("image"),
+        "point_cost": prize["pointCost"],
+        "claimed_by": prize.get("claimedBy"),
+        "status": prize.get("status", "available")
+    }
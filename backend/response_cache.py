@@ -0,0 +1,152 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+def normalize_message(message: str) -> str:
+    """
+    Normalize a chat message so trivially different phrasings share a key
+
+    Lowercases, turns punctuation into spaces and collapses whitespace, so
+    "Best late-night food?" and "best late night food" match.
+
+    Args:
+        message: Raw user message
+
+    Returns:
+        Normalized message text
+    """
+    return " ".join(_PUNCTUATION.sub(" ", message.lower()).split())
+
+def make_cache_key(message: str, context_messages: list) -> str:
+    """
+    Build a cache key from the message and the conversation context
+
+    Args:
+        message: Raw user message
+        context_messages: Prior chat messages sent to the model (no system prompt)
+
+    Returns:
+        Cache key string
+    """
+    context = [(m.get('role'), m.get('content')) for m in context_messages]
+    context_hash = hashlib.sha1(
+        json.dumps(context, ensure_ascii=False).encode('utf-8')
+    ).hexdigest()
+    return f"{normalize_message(message)}|{context_hash}"
+
+class ResponseCache:
+    """
+    Bounded LRU cache of model responses with a per-entry TTL
+
+    Entries are evicted least-recently-used first when either the entry
+    count or the total size of cached text goes over its limit.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 2 * 1024 * 1024,
+                 ttl_seconds: float = 600.0):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum number of cached responses
+            max_bytes: Maximum total UTF-8 size of cached responses
+            ttl_seconds: How long a response stays fresh
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response
+
+        Args:
+            key: Cache key from make_cache_key
+
+        Returns:
+            The cached response text, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            value, expires_at, size = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key: str, value: str):
+        """
+        Store a response, evicting old entries if over the limits
+
+        Args:
+            key: Cache key from make_cache_key
+            value: Response text
+        """
+        size = len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def clear(self):
+        """Drop every cached response"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Report cache size and hit/miss counters
+
+        Returns:
+            Dictionary of cache statistics
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 3) if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations
+            }
@@ -0,0 +1,155 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+# Rough per-message cost on top of its text, for the memory cap
+RECORD_OVERHEAD_BYTES = 64
+
+class ConversationStore:
+    """
+    Server-side chat history, keyed by conversation id
+
+    Clients send only the new message and their conversation id; the
+    history the model needs is kept here instead of being resent and
+    re-parsed on every turn. Each conversation holds its latest
+    max_messages messages as compact (type, content) records, with
+    oversized messages cut to max_message_chars.
+
+    Conversations are dropped least recently used first when there are more
+    than max_conversations or their text passes max_bytes, and after
+    idle_ttl seconds without a turn. The store is per process, so a client
+    whose conversation is unknown (expired, or served by another worker)
+    is given a new id and carries on without the earlier turns.
+    """
+
+    def __init__(self, max_conversations: int = 10000, max_messages: int = 20,
+                 max_message_chars: int = 4000, max_bytes: int = 32 * 1024 * 1024, idle_ttl: float = 1800.0):
+        """
+        Initialize the store
+
+        Args:
+            max_conversations: Most conversations kept
+            max_messages: Most recent messages kept per conversation
+            max_message_chars: Longer messages are stored truncated
+            max_bytes: Approximate cap on the memory held by message text
+            idle_ttl: Seconds a conversation is kept without a turn
+        """
+        self.max_conversations = max_conversations
+        self.max_messages = max_messages
+        self.max_message_chars = max_message_chars
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+
+        self._lock = threading.Lock()
+        self._conversations = OrderedDict()
+        self._bytes = 0
+
+        self._started = 0
+        self._resumed = 0
+        self._evictions = 0
+
+    def open(self, conversation_id: Optional[str], history: list = None) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Look up a conversation for a new turn, or start one
+
+        Args:
+            conversation_id: Id the client sent, if any
+            history: History the client sent, used to seed a new
+                conversation (for clients that still send it)
+
+        Returns:
+            Tuple of (conversation_id, history) with history as
+            {"type", "content"} dicts, oldest first
+        """
+        with self._lock:
+            self._expire()
+
+            conversation = self._conversations.get(conversation_id) if isinstance(conversation_id, str) else None
+            if conversation is not None:
+                self._resumed += 1
+                conversation["used_at"] = time.monotonic()
+                self._conversations.move_to_end(conversation_id)
+                return conversation_id, [{"type": kind, "content": content} for kind, content in conversation["messages"]]
+
+            conversation_id = uuid.uuid4().hex
+            conversation = self._conversations[conversation_id] = {
+                "messages": deque(),
+                "bytes": 0,
+                "used_at": time.monotonic()
+            }
+            self._started += 1
+
+            for msg in history if isinstance(history, list) else []:
+                if isinstance(msg, dict) and isinstance(msg.get("content"), str):
+                    self._add(conversation, "user" if msg.get("type") == "user" else "bot", msg["content"])
+            self._evict()
+
+            return conversation_id, [{"type": kind, "content": content} for kind, content in conversation["messages"]]
+
+    def append(self, conversation_id: str, user_message: str, reply: str):
+        """
+        Record a finished turn
+
+        Args:
+            conversation_id: Conversation from open()
+            user_message: What the user sent
+            reply: The reply they were shown
+        """
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None:
+                return
+
+            self._add(conversation, "user", user_message)
+            self._add(conversation, "bot", reply)
+            conversation["used_at"] = time.monotonic()
+            self._conversations.move_to_end(conversation_id)
+            self._evict()
+
+    def _add(self, conversation: Dict[str, Any], kind: str, content: str):
+        content = content[:self.max_message_chars]
+        size = len(content) + RECORD_OVERHEAD_BYTES
+        conversation["messages"].append((kind, content))
+        conversation["bytes"] += size
+        self._bytes += size
+
+        while len(conversation["messages"]) > self.max_messages:
+            _, dropped = conversation["messages"].popleft()
+            size = len(dropped) + RECORD_OVERHEAD_BYTES
+            conversation["bytes"] -= size
+            self._bytes -= size
+
+    def _expire(self):
+        # Least recently used come first, so stop at the first live one
+        now = time.monotonic()
+        while self._conversations:
+            conversation_id, conversation = next(iter(self._conversations.items()))
+            if now - conversation["used_at"] < self.idle_ttl:
+                break
+            self._drop(conversation_id)
+
+    def _evict(self):
+        # Never evict the conversation just used, even if it alone is over the cap
+        while len(self._conversations) > 1 and (
+            len(self._conversations) > self.max_conversations or self._bytes > self.max_bytes
+        ):
+            self._drop(next(iter(self._conversations)))
+
+    def _drop(self, conversation_id: str):
+        conversation = self._conversations.pop(conversation_id)
+        self._bytes -= conversation["bytes"]
+        self._evictions += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Store size and counters"""
+        with self._lock:
+            return {
+                "conversations": len(self._conversations),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "started": self._started,
+                "resumed": self._resumed,
+                "evictions": self._evictions
+            }
@@ -0,0 +1,323 @@
+"""
+Request coalescing for identical in-flight model calls
+
+When many people ask the same thing at once, the first request makes the
+model call and the rest wait for its result instead of making their own.
+Unlike the response cache this only covers calls still in flight; once a
+call finishes the next request for that key starts a new one.
+
+SingleFlight is for threads (the Flask routes) and AsyncSingleFlight for
+the event loop (the ASGI chat route). Both coalesce whole responses with
+do() and token streams with stream(), where every subscriber gets every
+token from the start.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+class FlightStats:
+    """Counters for upstream calls made and calls saved by coalescing"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def record(self, shared: bool):
+        with self._lock:
+            if shared:
+                self.coalesced += 1
+            else:
+                self.calls += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self.calls + self.coalesced
+            return {
+                'upstream_calls': self.calls,
+                'coalesced_requests': self.coalesced,
+                'saved_ratio': round(self.coalesced / requests, 3) if requests else 0.0
+            }
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key across threads"""
+
+    def __init__(self, stats: FlightStats = None):
+        self.stats = stats or FlightStats()
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn, or wait for the identical call already running
+
+        Args:
+            key: Identifies calls that produce the same result
+            fn: Makes the call
+
+        Returns:
+            Tuple of (result, shared) where shared is True if another
+            caller's call supplied the result
+
+        Raises:
+            Whatever the shared call raised
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self.stats.record(shared=not leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def stream(self, key: str, fn: Callable[[], Iterator[Any]]) -> Iterator[Any]:
+        """
+        Subscribe to a stream, starting it if no identical one is running
+
+        The stream is drained by a background thread, so one subscriber
+        going away doesn't cut the others off; it is closed early only if
+        every subscriber leaves. The thread notices that after the next item
+        arrives, as it can't interrupt a blocking read from the model.
+
+        Args:
+            key: Identifies streams that produce the same items
+            fn: Returns the iterator to drain
+
+        Returns:
+            Iterator over every item of the stream from the start
+        """
+        with self._lock:
+            flight = self._streams.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._streams[key] = _StreamFlight()
+            flight.subscribers += 1
+        self.stats.record(shared=not leader)
+
+        if leader:
+            threading.Thread(target=self._pump, args=(key, flight, fn), daemon=True).start()
+        return flight.subscribe()
+
+    def _pump(self, key: str, flight: '_StreamFlight', fn: Callable[[], Iterator[Any]]):
+        iterator = None
+        try:
+            iterator = fn()
+            for item in iterator:
+                flight.push(item)
+                if flight.abandoned():
+                    break
+            flight.finish()
+        except Exception as e:
+            flight.finish(e)
+        finally:
+            with self._lock:
+                if self._streams.get(key) is flight:
+                    del self._streams[key]
+            if hasattr(iterator, 'close'):
+                iterator.close()
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class _StreamFlight:
+    """Items of one in-flight stream, replayable by every subscriber"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self.items = []
+        self.finished = False
+        self.error = None
+        self.subscribers = 0
+
+    def push(self, item):
+        with self._condition:
+            self.items.append(item)
+            self._condition.notify_all()
+
+    def finish(self, error: Exception = None):
+        with self._condition:
+            self.finished = True
+            self.error = error
+            self._condition.notify_all()
+
+    def abandoned(self) -> bool:
+        with self._condition:
+            return self.subscribers == 0
+
+    def subscribe(self) -> Iterator[Any]:
+        index = 0
+        try:
+            while True:
+                with self._condition:
+                    while index >= len(self.items) and not self.finished:
+                        self._condition.wait()
+                    batch = self.items[index:]
+                    index += len(batch)
+                    error = self.error
+
+                if not batch:
+                    if error is not None:
+                        raise error
+                    return
+
+                yield from batch
+        finally:
+            with self._condition:
+                self.subscribers -= 1
+
+class AsyncSingleFlight:
+    """Coalesces concurrent calls with the same key on one event loop"""
+
+    def __init__(self, stats: FlightStats = None):
+        self.stats = stats or FlightStats()
+        self._calls = {}
+        self._streams = {}
+        # The event loop only holds weak references to tasks, so pumps are kept here
+        self._tasks = set()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Await fn(), or the identical call already running
+
+        The call runs as its own task, so cancelling the request that
+        started it doesn't cancel it for the others.
+
+        Args:
+            key: Identifies calls that produce the same result
+            fn: Returns the awaitable that makes the call
+
+        Returns:
+            Tuple of (result, shared)
+        """
+        task = self._calls.get(key)
+        leader = task is None
+        if leader:
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        self.stats.record(shared=not leader)
+
+        return await asyncio.shield(task), not leader
+
+    def stream(self, key: str, fn: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """
+        Subscribe to a stream, starting it if no identical one is running
+
+        The stream is drained by its own task. When the last subscriber
+        leaves, the task is cancelled right away rather than at the next
+        item, so an abandoned stream stops waiting on the model.
+
+        Args:
+            key: Identifies streams that produce the same items
+            fn: Returns the async iterator to drain
+
+        Returns:
+            Async iterator over every item of the stream from the start
+        """
+        flight = self._streams.get(key)
+        leader = flight is None
+        if leader:
+            flight = self._streams[key] = _AsyncStreamFlight()
+            task = asyncio.ensure_future(self._pump(key, flight, fn))
+            self._tasks.add(task)
+            task.add_done_callback(self._pump_done)
+            flight.on_abandoned = lambda: self._abandon(key, flight, task)
+        flight.subscribers += 1
+        self.stats.record(shared=not leader)
+        return flight.subscribe()
+
+    def _abandon(self, key: str, flight: '_AsyncStreamFlight', task: asyncio.Future):
+        # Stop new requests joining before the cancellation lands
+        if self._streams.get(key) is flight:
+            del self._streams[key]
+        task.cancel()
+
+    def _pump_done(self, task: asyncio.Future):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Coalesced stream failed: {str(task.exception())}")
+
+    async def _pump(self, key: str, flight: '_AsyncStreamFlight', fn: Callable[[], AsyncIterator[Any]]):
+        iterator = None
+        try:
+            iterator = fn()
+            async for item in iterator:
+                flight.push(item)
+                if flight.subscribers == 0:
+                    break
+            flight.finish()
+        except Exception as e:
+            flight.finish(e)
+        finally:
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+            if hasattr(iterator, 'aclose'):
+                await iterator.aclose()
+
+class _AsyncStreamFlight:
+    """Items of one in-flight async stream, replayable by every subscriber"""
+
+    def __init__(self):
+        self._changed = asyncio.Event()
+        self.items = []
+        self.finished = False
+        self.error = None
+        self.subscribers = 0
+        self.on_abandoned = None
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def push(self, item):
+        self.items.append(item)
+        self._notify()
+
+    def finish(self, error: Exception = None):
+        self.finished = True
+        self.error = error
+        self._notify()
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        index = 0
+        try:
+            while True:
+                if index < len(self.items):
+                    index += 1
+                    yield self.items[index - 1]
+                elif self.finished:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                else:
+                    await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.finished and self.on_abandoned:
+                self.on_abandoned()
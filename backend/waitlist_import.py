@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Bulk waitlist import for sign-up sheets collected at tabling events
+
+Streams a CSV or NDJSON file, validates each row with the same rules as the
+/api/waitlist endpoint, drops duplicates within the file and inserts the rest
+in batches, producing a per-row error report.
+
+Usage:
+    python waitlist_import.py signups.csv [--batch-size 500] [--dry-run] [--errors errors.json]
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import re
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+try:
+    from database import bulk_add_to_waitlist
+except ImportError:
+    bulk_add_to_waitlist = None
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ['email', 'name', 'student_id']
+STUDENT_ID_PATTERN = re.compile(r'^\d{8}$')
+DEFAULT_BATCH_SIZE = 500
+
+def validate_waitlist_entry(data: Dict[str, Any]) -> Optional[str]:
+    """
+    Validate a waitlist signup
+
+    Args:
+        data: Signup fields from a request body or an import row
+
+    Returns:
+        An error message, or None if the entry is valid
+    """
+    for field in REQUIRED_FIELDS:
+        if not data.get(field):
+            return f"Missing required field: {field}"
+
+    # Validate student ID format (8 digits)
+    if not STUDENT_ID_PATTERN.match(str(data['student_id']).strip()):
+        return "Student ID must be 8 digits"
+
+    return None
+
+def build_waitlist_record(data: Dict[str, Any], referral_source: str = 'website') -> Dict[str, Any]:
+    """
+    Build the waitlist row for a validated signup
+
+    Args:
+        data: Signup fields from a request body or an import row
+        referral_source: Source recorded when the signup doesn't give one
+
+    Returns:
+        Dictionary of waitlist table columns
+    """
+    return {
+        'email': str(data['email']).strip(),
+        'name': str(data['name']).strip(),
+        'student_id': str(data['student_id']).strip(),
+        'phone': data.get('phone') or '',
+        'graduation_year': _parse_year(data.get('graduation_year')),
+        'major': data.get('major') or '',
+        'interests': _parse_interests(data.get('interests')),
+        'referral_source': data.get('referral_source') or referral_source,
+        'status': 'pending'
+    }
+
+def _parse_year(value) -> Optional[int]:
+    """Graduation years arrive as strings from CSV and may be blank"""
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _parse_interests(value) -> list:
+    """Interests are a list in JSON and a ';' or ','-separated cell in CSV"""
+    if not value:
+        return []
+    if isinstance(value, list):
+        return value
+    return [part.strip() for part in re.split(r'[;,]', str(value)) if part.strip()]
+
+def iter_rows(stream: io.TextIOBase, file_format: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream rows from a CSV or NDJSON file without loading it all
+
+    Args:
+        stream: Text stream to read
+        file_format: 'csv' or 'ndjson'
+
+    Yields:
+        One dictionary per row; NDJSON lines that fail to parse yield an
+        '_error' entry so they show up in the report
+    """
+    if file_format == 'csv':
+        for row in csv.DictReader(stream):
+            yield {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+        return
+
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield {'_error': f"Invalid JSON: {str(e)}"}
+            continue
+        yield row if isinstance(row, dict) else {'_error': "Row is not a JSON object"}
+
+def detect_format(filename: str, content_type: str = '') -> str:
+    """Pick 'csv' or 'ndjson' from a filename or content type"""
+    if 'ndjson' in content_type or 'jsonl' in content_type or 'json' in content_type:
+        return 'ndjson'
+    if filename.lower().endswith(('.ndjson', '.jsonl', '.json')):
+        return 'ndjson'
+    return 'csv'
+
+def import_waitlist(rows: Iterable[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE,
+                    dry_run: bool = False, referral_source: str = 'import') -> Dict[str, Any]:
+    """
+    Validate, de-duplicate and insert waitlist rows in batches
+
+    Args:
+        rows: Row dictionaries, e.g. from iter_rows
+        batch_size: Rows per insert call
+        dry_run: Validate and de-duplicate without inserting
+        referral_source: Source recorded for rows that don't give one
+
+    Returns:
+        Report with counts and a per-row list of errors
+    """
+    if not dry_run and bulk_add_to_waitlist is None:
+        raise RuntimeError("Database integration not available")
+
+    start_time = time.monotonic()
+    report = {
+        'rows': 0,
+        'inserted': 0,
+        'duplicates': 0,
+        'invalid': 0,
+        'failed': 0,
+        'errors': []
+    }
+    seen_emails = set()
+    seen_student_ids = set()
+    batch = []
+
+    def reject(row_number, record, kind, message):
+        report[kind] += 1
+        report['errors'].append({
+            'row': row_number,
+            'email': (record or {}).get('email'),
+            'error': message
+        })
+
+    def flush():
+        if not batch:
+            return
+        if dry_run:
+            report['inserted'] += len(batch)
+            batch.clear()
+            return
+
+        records = [record for _, record in batch]
+        inserted_emails = bulk_add_to_waitlist(records)
+        if inserted_emails is None:
+            for row_number, record in batch:
+                reject(row_number, record, 'failed', "Batch insert failed")
+        else:
+            inserted = {email.lower() for email in inserted_emails}
+            for row_number, record in batch:
+                if record['email'].lower() in inserted:
+                    report['inserted'] += 1
+                else:
+                    reject(row_number, record, 'duplicates', "Already on the waitlist")
+        batch.clear()
+
+    for row_number, row in enumerate(rows, start=1):
+        report['rows'] += 1
+
+        if '_error' in row:
+            reject(row_number, None, 'invalid', row['_error'])
+            continue
+
+        error = validate_waitlist_entry(row)
+        if error:
+            reject(row_number, row, 'invalid', error)
+            continue
+
+        record = build_waitlist_record(row, referral_source)
+        email_key = record['email'].lower()
+        if email_key in seen_emails:
+            reject(row_number, record, 'duplicates', "Duplicate email in file")
+            continue
+        if record['student_id'] in seen_student_ids:
+            reject(row_number, record, 'duplicates', "Duplicate student ID in file")
+            continue
+
+        seen_emails.add(email_key)
+        seen_student_ids.add(record['student_id'])
+        batch.append((row_number, record))
+
+        if len(batch) >= batch_size:
+            flush()
+
+    flush()
+
+    report['dry_run'] = dry_run
+    report['seconds'] = round(time.monotonic() - start_time, 3)
+    return report
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help="CSV or NDJSON file ('-' for stdin)")
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help="file format (default: from extension)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="rows per insert")
+    parser.add_argument('--referral-source', default='import', help="source recorded for rows without one")
+    parser.add_argument('--dry-run', action='store_true', help="validate without inserting")
+    parser.add_argument('--errors', help="write the per-row error report to this JSON file")
+    args = parser.parse_args(argv)
+
+    file_format = args.format or detect_format(args.path)
+    stream = sys.stdin if args.path == '-' else open(args.path, newline='', encoding='utf-8-sig')
+
+    with stream:
+        report = import_waitlist(
+            iter_rows(stream, file_format),
+            batch_size=args.batch_size,
+            dry_run=args.dry_run,
+            referral_source=args.referral_source
+        )
+
+    errors = report.pop('errors')
+    if args.errors:
+        with open(args.errors, 'w') as f:
+            json.dump(errors, f, indent=2)
+
+    print(json.dumps(report, indent=2))
+    if errors and not args.errors:
+        for error in errors[:20]:
+            print(f"row {error['row']}: {error['error']} ({error['email']})", file=sys.stderr)
+        if len(errors) > 20:
+            print(f"... {len(errors) - 20} more, use --errors to write them all", file=sys.stderr)
+
+    return 1 if report['failed'] else 0
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -10,6 +10,8 @@ const BuddyChat = () => {
   const [isLoading, setIsLoading] = useState(false);
   const [modelStatus, setModelStatus] = useState(null);
   const messagesEndRef = useRef(null);
+  // The server keeps the chat history; we only send back its conversation id
+  const conversationIdRef = useRef(null);
   const { user } = useUser();
 
   // GenZ prompt suggestions
@@ -80,21 +82,15 @@ const BuddyChat = () => {
     setIsLoading(true);
 
     try {
-      // Prepare conversation history for context
-      const conversationHistory = messages.map(msg => ({
-        type: msg.type,
-        content: msg.content
-      }));
-
-      // Make API call to Llama model
-      const response = await fetch('/api/genz-buddy', {
+      // Stream the reply from the Llama model so tokens show up as they arrive
+      const response = await fetch('/api/genz-buddy?stream=1', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({
           message: content.trim(),
-          conversation_history: conversationHistory
+          conversation_id: conversationIdRef.current
         })
       });
 
@@ -102,25 +98,57 @@ const BuddyChat = () => {
         throw new Error(`API error: ${response.status}`);
       }
 
-      const data = await response.json();
+      const botMessageId = Date.now() + 1;
+      const updateBotMessage = (changes) => {
+        setMessages(prev => prev.map(msg =>
+          msg.id === botMessageId ? { ...msg, ...changes(msg) } : msg
+        ));
+      };
 
-      if (data.success) {
-        const botMessage = {
-          id: Date.now() + 1,
-          type: 'bot',
-          content: data.response,
-          timestamp: new Date(),
-          model: data.model || 'unknown'
-        };
+      setMessages(prev => [...prev, {
+        id: botMessageId,
+        type: 'bot',
+        content: '',
+        timestamp: new Date(),
+        model: 'llama-genz-buddy'
+      }]);
+      setIsLoading(false);
 
-        setMessages(prev => [...prev, botMessage]);
-        
-        // Show model indicator if using fallback
-        if (data.model === 'fallback') {
-          console.log('Using fallback response - Llama model unavailable');
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+
+        for (const rawEvent of events) {
+          const eventLine = rawEvent.split('\n').find(line => line.startsWith('event:'));
+          const dataLine = rawEvent.split('\n').find(line => line.startsWith('data:'));
+          if (!eventLine || !dataLine) continue;
+
+          const eventName = eventLine.slice('event:'.length).trim();
+          const data = JSON.parse(dataLine.slice('data:'.length));
+
+          if (eventName === 'token') {
+            updateBotMessage(msg => ({ content: msg.content + data.token }));
+          } else if (eventName === 'fallback') {
+            // The model failed part way through; replace the partial reply
+            updateBotMessage(() => ({ content: data.response, model: 'fallback' }));
+          } else if (eventName === 'done') {
+            updateBotMessage(() => ({ model: data.model || 'unknown' }));
+            conversationIdRef.current = data.conversation_id || null;
+
+            // Show model indicator if using fallback
+            if (data.model === 'fallback') {
+              console.log('Using fallback response - Llama model unavailable');
+            }
+          }
         }
-      } else {
-        throw new Error(data.error || 'Failed to get response');
       }
 
     } catch (error) {